@@ -1,10 +1,79 @@
 import streamlit as st
-from main import generate_report
+from main import generate_report, generate_report_preview
+from helpers.api_calls import llm_response_stream
+from helpers.templates import preload_templates
+from catalog.catalog import app_settings, llm_settings
 
 # Set page title and icon before anything else and set the page layout to wide for better visibility of the app elements
 st.set_page_config(page_title="Report Automation", page_icon="🚀", layout="wide")
 
-#
+# Compile the report layouts when the app starts (once per process, reused across sessions):
+preload_templates()
+
+
+# Generate the reports and return the HTML of the SCR and validation reports:
+def generate_report_html(current_year, target_solvency_ratio, conclusion_wording,
+                         llm_flag, llm_provider, llm_nr_of_sentences, llm_use_cache, force_rebuild = False,
+                         llm_response_mode = None, llm_cache_only = False):
+
+    """Function to generate the reports and return their HTML (without reading the files back).
+
+    Args:
+        current_year (int): The current year for the report.
+        target_solvency_ratio (float): The target solvency ratio.
+        conclusion_wording (str): Text to be inserted at the end of the report.
+        llm_flag (str): Flag to indicate if LLM should be used.
+        llm_provider (str): The provider of the LLM.
+        llm_nr_of_sentences (int): The number of sentences to generate with the LLM.
+        llm_use_cache (bool): Flag to reuse cached LLM responses.
+        force_rebuild (bool): Flag to rebuild all outputs, also those whose inputs are unchanged.
+        llm_response_mode (str): 'structured' or 'sections' (defaults to the response mode in llm_settings).
+        llm_cache_only (bool): Flag to take the AI commentary from the LLM cache only, without asking the providers.
+    Returns:
+        tuple: HTML of the SCR report and of the validation report, the trace of the run (spans as dictionaries) and
+               a flag set if the AI commentary is provisional (from the failover provider or generated by code).
+    """
+
+    _, _, run_details = generate_report(current_year, target_solvency_ratio, conclusion_wording,
+                                        llm_flag, llm_provider, llm_nr_of_sentences,
+                                        llm_use_cache = llm_use_cache, force_rebuild = force_rebuild,
+                                        llm_response_mode = llm_response_mode, llm_cache_only = llm_cache_only)
+
+    return (run_details['html']['scr_report'], run_details['html']['validation_report'], run_details['trace'],
+            run_details['provisional'])
+
+
+# Same, with the results kept in memory by inputs and shared across sessions (least recently used results are evicted):
+cached_report_html = st.cache_data(max_entries = app_settings['cache_max_entries'], ttl = app_settings['cache_ttl_seconds'],
+                                   show_spinner = "Generating report...")(generate_report_html)
+
+
+# Show the spans of a trace as a table (duration in milliseconds, nested spans indented under their parent):
+def show_trace(trace):
+
+    """Function to show the trace of a report run in an expander.
+
+    Args:
+        trace (list): Spans as dictionaries (as returned in run_details['trace']).
+    """
+
+    parents = {span['span_id']: span['parent_id'] for span in trace}
+
+    def depth(span):
+        level, parent_id = 0, span['parent_id']
+        while parent_id in parents:
+            level, parent_id = level + 1, parents[parent_id]
+        return level
+
+    rows = [{'span':          '\u2003' * depth(span) + span['name'],
+             'duration (ms)': round((span['duration'] or 0) * 1000, 1),
+             'status':        span['status'],
+             'thread':        span['thread'],
+             'attributes':    ', '.join(f"{key}={value}" for key, value in span['attributes'].items())} for span in trace]
+
+    with st.expander("Trace of the report generation"):
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+
 
 # Streamlit App
 def run_app():
@@ -18,8 +87,12 @@ def run_app():
 
     # Move radio buttons to the sidebar
     llm_flag              = st.sidebar.radio("Use AI commentary (Background and Result trends)", ["Yes", "No"], index=1)
-    llm_provider          = st.sidebar.radio("AI model provider:", ["Gemini", "OpenAi"], index=0)
+    llm_provider          = st.sidebar.radio("AI model provider:", ["Gemini", "OpenAi", "Mock"], index=0)
     llm_nr_of_sentences   = st.sidebar.number_input("Nr of sentences in Background section", min_value=1, max_value=10, value=2)
+    llm_use_cache         = st.sidebar.checkbox("Reuse cached AI commentary", value=True)
+    llm_response_modes    = {"One request per section (streamed)": 'sections', "One request for all sections (JSON)": 'structured'}
+    llm_response_mode     = llm_response_modes[st.sidebar.radio("AI response mode", list(llm_response_modes),
+                                                                index=list(llm_response_modes.values()).index(llm_settings['response_mode']))]
     
     conclusion_wording    = st.sidebar.text_area("Conclusion (text inserted at the end)", value = '')
 
@@ -29,62 +102,83 @@ def run_app():
     # Add a button to trigger report generation
     if st.button("Generate Report"):
 
-        # Reset report_generated to False if LLM flag changes (or force generation)
-        if "report_generated" in st.session_state:
-            st.session_state.report_generated = False  # Allow report generation again
-
-        if "report_generated" not in st.session_state:
-            st.session_state.report_generated = False
-
-        # Check if the report has been generated already
-        if not st.session_state.report_generated:
-            # When the button is pressed, generate the report
-            report_paths, validation_report_html_path = generate_report(
-                current_year, target_solvency_ratio, conclusion_wording,
-                llm_flag, llm_provider, llm_nr_of_sentences
-            )
-
-            html_report = report_paths['html']
-            validation_html_report = validation_report_html_path
-
-            # Update session state to prevent multiple generations
-            st.session_state.report_generated = True  # Prevent multiple calls after first generation
-            #st.success("Report generated successfully!")
-
-
-            with tab1:
-                # Try embedding the HTML file using an iframe
-                try:
-                    with open(html_report, "r", encoding="utf-8") as file:
-                        html_content = file.read()
-
-                    # Use an iframe to display the full HTML document
-                    st.write(f"### Generated Report for {current_year}")
-                    st.components.v1.html(html_content, height=800, scrolling=True)
-
-                except FileNotFoundError:
-                    st.error(f"File not found: {html_report}")
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
-                
-            with tab2:
-                # Try embedding the HTML file using an iframe
-                try:
-                    with open(validation_html_report, "r", encoding="utf-8") as file:
-                        validation_html_content = file.read()
-
-                    # Use an iframe to display the full HTML document
-                    st.write(f"### Generated Validation Report for {current_year}")
-                    st.components.v1.html(validation_html_content, height=800, scrolling=True)
-
-                except FileNotFoundError:
-                    st.error(f"File not found: {validation_html_report}")
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
-
-        else:
-            
-            st.warning("Report already generated. You can only generate the report once in this session.")
+        with tab1:
+            st.write(f"### Generated Report for {current_year}")
+            commentary_area = st.empty()
+            report_area     = st.empty()
+
+        # A missing input table or a failure of the LLM or pdf conversion is shown as an error instead of a traceback:
+        try:
+            # With AI commentary, show the report with the wording generated by code straight away. If the AI sections are
+            # requested one by one, stream them as they are generated (the responses are saved in the LLM cache and reused by
+            # the reports below); a structured request returns all sections at once as JSON, so it is not streamed:
+            streamed       = False
+            stream_sources = set()
+            if llm_flag == "Yes":
+                preview_html, llm_prompts = generate_report_preview(current_year, target_solvency_ratio, conclusion_wording,
+                                                                    llm_nr_of_sentences, llm_response_mode = llm_response_mode)
+                with report_area.container():
+                    st.components.v1.html(preview_html, height=800, scrolling=True)
+
+                with commentary_area.container():
+                    st.info("Generating AI commentary - the report below is updated once it is complete.")
+                    if 'report' not in llm_prompts:
+                        for section, title in [('background', 'Background'), ('results_analysis', 'Results analysis')]:
+                            st.write(f"#### {title}")
+                            st.write_stream(llm_response_stream(llm_prompts[section], llm_flag, llm_provider, llm_use_cache,
+                                                                sources = stream_sources))
+                        streamed = True
+
+            # Generate the reports (including the pdf and Word exports), or take them from the results in memory if generated
+            # before with the same inputs (if fresh AI commentary was requested, the reports are rebuilt with the streamed commentary).
+            # If a stream got no complete answer, the providers have just failed within their time budget, so the reports take
+            # the streamed commentary from the LLM cache only and use the wording generated by code for the rest:
+            stream_fallback = 'fallback' in stream_sources
+            if streamed and (not llm_use_cache or stream_fallback):
+                with st.spinner("Generating report..."):
+                    html_content, validation_html_content, trace, provisional = generate_report_html(current_year, target_solvency_ratio, conclusion_wording,
+                                                                                                     llm_flag, llm_provider, llm_nr_of_sentences,
+                                                                                                     llm_use_cache = True, force_rebuild = not llm_use_cache,
+                                                                                                     llm_response_mode = llm_response_mode,
+                                                                                                     llm_cache_only = stream_fallback)
+            elif llm_flag == "Yes" and not llm_use_cache:
+                with st.spinner("Generating report..."):
+                    html_content, validation_html_content, trace, provisional = generate_report_html(current_year, target_solvency_ratio, conclusion_wording,
+                                                                                                     llm_flag, llm_provider, llm_nr_of_sentences,
+                                                                                                     llm_use_cache = False, llm_response_mode = llm_response_mode)
+            else:
+                html_content, validation_html_content, trace, provisional = cached_report_html(current_year, target_solvency_ratio, conclusion_wording,
+                                                                                               llm_flag, llm_provider, llm_nr_of_sentences, llm_use_cache,
+                                                                                               llm_response_mode = llm_response_mode)
+
+                # A result with provisional AI commentary is not kept for the other sessions (the cache cannot skip
+                # a single result, so it is cleared), so the selected provider is asked again next time:
+                if provisional:
+                    cached_report_html.clear()
+
+        except FileNotFoundError as e:
+            commentary_area.empty()
+            report_area.empty()
+            st.error(f"File not found: {e.filename or e}")
+            return
+        except Exception as e:
+            commentary_area.empty()
+            report_area.empty()
+            st.error(f"An error occurred: {e}")
+            return
+
+        commentary_area.empty()
+        with report_area.container():
+            # Use an iframe to display the full HTML document
+            st.components.v1.html(html_content, height=800, scrolling=True)
+
+        with tab1:
+            show_trace(trace)
+
+        with tab2:
+            # Use an iframe to display the full HTML document
+            st.write(f"### Generated Validation Report for {current_year}")
+            st.components.v1.html(validation_html_content, height=800, scrolling=True)
 
 
 # Run the Streamlit app
@@ -0,0 +1,402 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import contextlib
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# Root folder of the app (where main.py is), imported from the benchmark folder:
+root_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_folder)
+
+from catalog.catalog import folders, filenames
+from helpers import ingestion
+from helpers.ingestion import read_scr_table
+from helpers.formatting import format_scr_table
+from helpers.charts import render_pie_chart
+from helpers.utils import create_pie_charts, create_tornado_chart, perform_validation
+from helpers.create_reports import create_report_model, create_html_report, html2pdf, create_word_report, create_validation_report
+from helpers.stress import run_stress_tests
+from helpers.pdf_service import get_pdfkit_configuration
+from main import generate_report
+
+# Functions:
+#
+#   make_scr_table
+#   write_synthetic_inputs
+#   stub_llm_responses
+#   time_call
+#   benchmark_stages
+#   benchmark_end_to_end
+#   compare_with_baseline
+#   main
+#
+# Benchmark of the report pipeline on synthetic SCR tables (same layout as input/tables/scr_table_<year>YE.xlsx,
+# random but internally consistent values) for a number of entities and years. Each stage is timed in isolation
+# (Excel ingestion, charts, report content and HTML with a stubbed LLM, pdf, Word, validation and validation
+# report), as well as the whole pipeline end to end (cold, then again with unchanged inputs). The runs take
+# place in a temporary working folder, so the caches and outputs of the app are not touched.
+#
+# The results are saved as JSON. With --baseline, the median time of each stage is compared with a previous
+# results file and the script exits with status 1 if a stage is slower than the baseline by more than the tolerance.
+#
+# Usage:  python benchmarks/benchmark_pipeline.py [--entities 2] [--years 3] [--repeat 3] [--output results.json]
+#                                                 [--baseline baseline.json] [--tolerance 0.25]
+
+
+# Line items of the synthetic tables (BSCR modules, then the totals):
+synthetic_modules = ['Market Risk', 'Counterparty Default Risk', 'Life Risk', 'Health Risk']
+
+# Canned LLM wording used instead of API calls (by section, and all sections as a structured response):
+stub_llm_wording = {'background':       "The Solvency II Directive sets the capital requirements of insurance undertakings in the EU. "
+                                        "Undertakings report their solvency position to the supervisor annually and quarterly.",
+                    'results_analysis': "**SCR** The SCR increased, driven by Market Risk. "
+                                        "**Own Funds** Own Funds increased with the profit of the year. "
+                                        "**Solvency Ratio** The Solvency Ratio decreased slightly."}
+stub_llm_wording['report'] = json.dumps({'background':       stub_llm_wording['background'],
+                                         'results_analysis': [{'item': 'SCR',            'bullets': ["The SCR increased, driven by Market Risk."]},
+                                                              {'item': 'Own Funds',      'bullets': ["Own Funds increased with the profit of the year."]},
+                                                              {'item': 'Solvency Ratio', 'bullets': ["The Solvency Ratio decreased slightly."]}]})
+
+
+def make_scr_table(current_year, seed = 0):
+
+    """Function to create a synthetic SCR table with internally consistent values.
+
+    Args:
+        current_year (int): The current year (the previous year is the year before).
+        seed (int): Seed of the random values.
+    Returns:
+        pd.DataFrame: SCR table with the columns '€m', current year, previous year, 'Movement' and 'Movement %'.
+    """
+
+    rng    = np.random.default_rng(seed)
+    values = {}
+
+    for year in [current_year, current_year - 1]:
+        modules         = rng.uniform(50, 600, len(synthetic_modules)).round(1)
+        diversification = round(-0.25 * modules.sum(), 1)
+        basic_scr       = modules.sum() + diversification
+        operational     = round(rng.uniform(20, 80), 1)
+        deferred_tax    = round(-rng.uniform(10, 60), 1)
+        total_scr       = basic_scr + operational + deferred_tax
+        own_funds       = round(total_scr * rng.uniform(1.1, 2.2), 1)
+
+        values[year] = list(modules) + [diversification, basic_scr, operational, deferred_tax, total_scr, own_funds,
+                                        own_funds / total_scr]
+
+    df = pd.DataFrame({'€m':         synthetic_modules + ['Diversification Benefit', 'Basic SCR', 'Operational Risk',
+                                                          'Deferred Tax Adjustment', 'Total SCR', 'Own Funds', 'Solvency Ratio'],
+                       current_year:     values[current_year],
+                       current_year - 1: values[current_year - 1]})
+    df['Movement']   = df[current_year] - df[current_year - 1]
+    df['Movement %'] = df[current_year] / df[current_year - 1] - 1
+
+    return df
+
+
+def write_synthetic_inputs(input_folder, n_entities, years):
+
+    """Function to write synthetic SCR tables as Excel workbooks, one folder per entity.
+
+    Args:
+        input_folder (str): Folder of the entity folders.
+        n_entities (int): Number of entities.
+        years (list): Current years of the tables.
+    Returns:
+        list: Jobs as dictionaries with keys 'current_year', 'scr_table_path' and 'entity'.
+    """
+
+    jobs = []
+    for entity_nr in range(n_entities):
+        entity        = f'entity_{entity_nr + 1:03d}'
+        entity_folder = os.path.join(input_folder, entity)
+        os.makedirs(entity_folder, exist_ok = True)
+
+        for year in years:
+            path = os.path.join(entity_folder, filenames['scr_table'].format(year = year))
+            make_scr_table(year, seed = entity_nr * 10_000 + year).to_excel(path, index = False)
+            jobs.append({'current_year': year, 'scr_table_path': path, 'entity': entity})
+
+    return jobs
+
+
+def stub_llm_responses(prompts, llm_flag, provider = 'Gemini', use_cache = True, timeout = None, json_output = False,
+                       fallback = False):
+
+    """Stand-in for api_calls.llm_responses returning canned wording without calling an API."""
+
+    return {name: stub_llm_wording[name] for name in prompts}
+
+
+class _NoPdfService:
+
+    """Stand-in for the pdf service, so the validation report is timed without the pdf conversion."""
+
+    def submit(self, html_path, pdf_path):
+        pass
+
+    def wait(self, futures = None):
+        return []
+
+
+def time_call(func, repeat):
+
+    """Function to time a function call a number of times.
+
+    Args:
+        func (callable): Function called without arguments.
+        repeat (int): Number of calls.
+    Returns:
+        tuple: Runtimes in seconds and the result of the last call.
+    """
+
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result     = func()
+        times.append(time.perf_counter() - start_time)
+
+    return times, result
+
+
+def _summary(times):
+
+    """Summary statistics of runtimes in seconds."""
+
+    return {'runs':   len(times),
+            'min':    min(times),
+            'median': statistics.median(times),
+            'mean':   statistics.fmean(times),
+            'max':    max(times)}
+
+
+def benchmark_stages(jobs, repeat, pdf_available):
+
+    """Function to time each stage of the pipeline in isolation for every synthetic table.
+
+    Args:
+        jobs (list): Jobs as returned by write_synthetic_inputs.
+        repeat (int): Number of runs of each stage per table.
+        pdf_available (bool): Flag to time the pdf conversion (needs wkhtmltopdf).
+    Returns:
+        dict: Summary of the runtimes by stage name.
+    """
+
+    timings = {}
+    warmup  = True
+
+    def record(name, func):
+        if warmup:
+            return func()
+        times, result = time_call(func, repeat)
+        timings.setdefault(name, []).extend(times)
+        return result
+
+    with mock.patch('helpers.create_reports.llm_responses', stub_llm_responses), contextlib.redirect_stdout(io.StringIO()):
+
+        # The first table is run once without timing first (imports and setup on first use are not counted):
+        for job_nr, job in enumerate(jobs[:1] + jobs):
+            warmup = job_nr == 0
+            current_year  = job['current_year']
+            previous_year = current_year - 1
+            path          = job['scr_table_path']
+
+            report_folders = dict(folders)
+            report_folders['output_reports'] = folders['output_reports'] + job['entity'] + '/'
+            os.makedirs(report_folders['output_reports'] + str(current_year), exist_ok = True)
+
+            # Excel ingestion (parsing the workbook) and loading the snapshot of the table:
+            record('excel_ingestion', lambda: read_scr_table(path, use_snapshot = False))
+
+            def load_snapshot():
+                ingestion._loaded_tables.clear()
+                return read_scr_table(path)
+            record('snapshot_load', load_snapshot)
+
+            scr_table = format_scr_table(read_scr_table(path), previous_year, current_year)
+
+            # Charts: drawing a chart, and through the chart store as in the pipeline:
+            modules = scr_table.head(4)
+            record('render_pie_chart', lambda: render_pie_chart(modules.labels.tolist(), modules.column(current_year).tolist()))
+            charts = {'current':  record('create_pie_charts', lambda: create_pie_charts(scr_table, current_year)),
+                      'previous': create_pie_charts(scr_table, previous_year)}
+
+            # Stress tests (sensitivities and the stress grid) and the tornado chart:
+            stress_results    = record('stress_tests', lambda: run_stress_tests(scr_table, 1.25))
+            charts['tornado'] = create_tornado_chart(stress_results)
+
+            # Report content and HTML (with the stubbed LLM):
+            report = record('create_report_model', lambda: create_report_model(current_year, previous_year, scr_table, 'Yes', 'Gemini', 2,
+                                                                               1.25, '', charts = charts, stress = stress_results))
+            report_paths, _ = record('create_html_report', lambda: create_html_report(report_folders, filenames, current_year, previous_year,
+                                                                                       None, 'Yes', 'Gemini', 2, 1.25, '', report = report))
+
+            # Conversion to pdf:
+            if pdf_available:
+                pdf_path = report_paths['html'][:-len('.html')] + '.pdf'
+                record('html2pdf', lambda: html2pdf(report_paths['html'], pdf_path))
+
+            # Word report:
+            record('create_word_report', lambda: create_word_report(report_folders, {}, report, current_year))
+
+            # Validation and validation report (without the pdf conversion):
+            df_check = record('perform_validation', lambda: perform_validation(scr_table, current_year, previous_year))
+            record('create_validation_report', lambda: create_validation_report(df_check, report_folders, current_year, previous_year,
+                                                                                0.001, _NoPdfService()))
+
+    return {name: _summary(times) for name, times in timings.items()}
+
+
+def benchmark_end_to_end(jobs, output_formats):
+
+    """Function to time the whole pipeline for every synthetic table, first from scratch and then with unchanged inputs.
+
+    Args:
+        jobs (list): Jobs as returned by write_synthetic_inputs.
+        output_formats (list): Output formats of the reports.
+    Returns:
+        dict: Summary of the runtimes of the cold and warm runs, and of each pipeline stage.
+    """
+
+    timings = {'end_to_end_cold': [], 'end_to_end_warm': []}
+    stages  = {}
+
+    with mock.patch('helpers.create_reports.llm_responses', stub_llm_responses), contextlib.redirect_stdout(io.StringIO()):
+
+        for run in ['end_to_end_cold', 'end_to_end_warm']:
+            for job in jobs:
+                start_time = time.perf_counter()
+                _, _, run_details = generate_report(job['current_year'], llm_flag = 'Yes', output_formats = output_formats,
+                                                    scr_table_path = job['scr_table_path'], entity = job['entity'],
+                                                    force_rebuild = run == 'end_to_end_cold')
+                timings[run].append(time.perf_counter() - start_time)
+
+                if run == 'end_to_end_cold':
+                    for stage, stage_time in run_details['stage_timings'].items():
+                        stages.setdefault('pipeline_' + stage, []).append(stage_time)
+
+    timings.update(stages)
+
+    return {name: _summary(times) for name, times in timings.items()}
+
+
+def compare_with_baseline(results, baseline, tolerance):
+
+    """Function to compare the median runtimes of the stages with a baseline.
+
+    Args:
+        results (dict): Benchmark results.
+        baseline (dict): Benchmark results of the baseline.
+        tolerance (float): Allowed slowdown as a fraction of the baseline (e.g. 0.25 for 25%).
+    Returns:
+        list: Regressions as dictionaries with the stage name, baseline and current median and the ratio.
+    """
+
+    regressions = []
+    for name, summary in results['stages'].items():
+        baseline_summary = baseline.get('stages', {}).get(name)
+        if baseline_summary is None or baseline_summary['median'] <= 0:
+            continue
+
+        ratio = summary['median'] / baseline_summary['median']
+        if ratio > 1 + tolerance:
+            regressions.append({'stage': name, 'baseline': baseline_summary['median'], 'current': summary['median'], 'ratio': ratio})
+
+    return regressions
+
+
+def main(argv = None):
+
+    """Command line entry point: run the benchmark, save the results and compare them with a baseline.
+
+    Args:
+        argv (list): Command line arguments (defaults to sys.argv).
+    Returns:
+        int: Exit status (1 if a stage is slower than the baseline by more than the tolerance, 0 otherwise).
+    """
+
+    parser = argparse.ArgumentParser(description = "Benchmark the report pipeline on synthetic SCR tables.")
+    parser.add_argument('--entities',  type = int,   default = 2,    help = "Number of synthetic entities.")
+    parser.add_argument('--years',     type = int,   default = 3,    help = "Number of years per entity.")
+    parser.add_argument('--repeat',    type = int,   default = 3,    help = "Number of runs of each stage per table.")
+    parser.add_argument('--output',    default = 'benchmark_results.json', help = "Path of the JSON results file.")
+    parser.add_argument('--baseline',  default = None, help = "Path of a previous results file to compare with.")
+    parser.add_argument('--tolerance', type = float, default = 0.25, help = "Allowed slowdown compared to the baseline (0.25 = 25%%).")
+    args = parser.parse_args(argv)
+
+    output_path   = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    years         = list(range(2024, 2024 + args.years))
+
+    # The pdf conversion is only timed if wkhtmltopdf is installed:
+    try:
+        get_pdfkit_configuration()
+        pdf_available = True
+    except OSError:
+        pdf_available = False
+
+    # Run in a temporary working folder with a copy of the layouts:
+    working_folder = tempfile.mkdtemp(prefix = 'scr_benchmark_')
+    current_folder = os.getcwd()
+    try:
+        shutil.copytree(os.path.join(root_folder, folders['layout']), os.path.join(working_folder, folders['layout']))
+        os.chdir(working_folder)
+
+        jobs = write_synthetic_inputs(folders['input_tables'], args.entities, years)
+        print(f"Benchmark on {len(jobs)} synthetic tables ({args.entities} entities x {args.years} years)...")
+
+        stages = benchmark_stages(jobs, args.repeat, pdf_available)
+
+        # The pipeline always converts the validation report to pdf, so it needs wkhtmltopdf:
+        if pdf_available:
+            stages.update(benchmark_end_to_end(jobs, ['html', 'pdf', 'docx']))
+        else:
+            print("wkhtmltopdf not found: the pdf conversion and end to end runs are skipped.")
+    finally:
+        os.chdir(current_folder)
+        shutil.rmtree(working_folder, ignore_errors = True)
+
+    results = {'meta':   {'timestamp':     time.strftime('%Y-%m-%dT%H:%M:%S'),
+                          'python':        platform.python_version(),
+                          'platform':      platform.platform(),
+                          'entities':      args.entities,
+                          'years':         years,
+                          'repeat':        args.repeat,
+                          'pdf_available': pdf_available},
+               'stages': stages}
+
+    # Print and save the results:
+    for name, summary in stages.items():
+        print(f"  {name:<38} median {summary['median'] * 1000:9.2f} ms   min {summary['min'] * 1000:9.2f} ms   ({summary['runs']} runs)")
+
+    with open(output_path, 'w', encoding = 'utf-8') as results_file:
+        json.dump(results, results_file, indent = 2)
+    print(f"✅Benchmark results saved at: {output_path}")
+
+    # Compare with the baseline:
+    if baseline_path:
+        with open(baseline_path, 'r', encoding = 'utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"❌{regression['stage']}: median {regression['current'] * 1000:.2f} ms vs baseline "
+                  f"{regression['baseline'] * 1000:.2f} ms ({regression['ratio']:.2f}x)")
+        if regressions:
+            return 1
+        print(f"✅No stage slower than the baseline by more than {args.tolerance:.0%}.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
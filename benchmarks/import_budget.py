@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Functions:
+#
+#   measure_cold_import
+#   main
+#
+# Check of the cold start time of the app and of the batch workers: 'import main' is timed in fresh
+# Python processes (best of a few runs) and must stay within the import budget. The heavy optional
+# dependencies (LLM clients, pdfkit, python-docx, matplotlib) are loaded on first use only, so they
+# must not be imported by 'import main' either. Exits with status 1 if the budget is exceeded.
+#
+# Usage:  python benchmarks/import_budget.py [--budget 1.0] [--runs 3]
+
+
+# Maximum time of a cold 'import main' in seconds:
+import_budget_seconds = 1.0
+
+# Root folder of the app (where main.py is):
+root_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules which must only be imported on first use:
+lazy_modules = ['openai', 'google.generativeai', 'pdfkit', 'docx', 'matplotlib']
+
+# Code run in a fresh process to time the import:
+_measure_code = """
+import sys, time, json
+start_time = time.perf_counter()
+import main
+import_time = time.perf_counter() - start_time
+print(json.dumps({'import_time': import_time, 'loaded': [m for m in %r if m in sys.modules]}))
+"""
+
+
+def measure_cold_import(module_names = None):
+
+    """Function to time a cold 'import main' in a fresh Python process.
+
+    Args:
+        module_names (list): Modules to check for (defaults to lazy_modules).
+    Returns:
+        dict: Import time in seconds ('import_time') and the modules of module_names loaded by the import ('loaded').
+    """
+
+    code   = _measure_code % (module_names or lazy_modules)
+    result = subprocess.run([sys.executable, '-c', code], cwd = root_folder,
+                            capture_output = True, text = True, check = True)
+
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv = None):
+
+    """Command line entry point: check the cold import time of main against the budget.
+
+    Args:
+        argv (list): Command line arguments (defaults to sys.argv).
+    Returns:
+        int: Exit status (0 if within budget, 1 otherwise).
+    """
+
+    parser = argparse.ArgumentParser(description = "Check the cold import time of main against a budget.")
+    parser.add_argument('--budget', type = float, default = import_budget_seconds, help = "Import budget in seconds.")
+    parser.add_argument('--runs',   type = int,   default = 3, help = "Number of fresh processes (the fastest run is used).")
+    args = parser.parse_args(argv)
+
+    measurements = [measure_cold_import() for _ in range(args.runs)]
+    import_time  = min(measurement['import_time'] for measurement in measurements)
+    loaded       = sorted(set(module for measurement in measurements for module in measurement['loaded']))
+
+    print(f"Cold import of main: {import_time:.3f} seconds (budget {args.budget:.3f} seconds).")
+
+    failed = False
+    if import_time > args.budget:
+        print(f"❌Import budget exceeded by {import_time - args.budget:.3f} seconds.")
+        failed = True
+    if loaded:
+        print(f"❌Modules which should be imported on first use are loaded by 'import main': {', '.join(loaded)}.")
+        failed = True
+    if not failed:
+        print("✅Import budget met.")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
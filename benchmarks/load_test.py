@@ -0,0 +1,332 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import contextlib
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Root folder of the app (where main.py is), imported from the benchmark folder:
+root_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_folder)
+
+from catalog.catalog import folders, llm_settings, mock_llm_settings
+from helpers.llm_clients import get_llm_client
+from main import generate_report
+
+# Functions:
+#
+#   percentiles
+#   run_report
+#   llm_span_stats
+#   run_load_test
+#   main
+#
+# Load test of the LLM path against the local mock LLM provider (no network): N reports are generated with
+# AI commentary by concurrent generate_report calls (at most --concurrency at the same time), with fresh LLM
+# requests for every report. The latency distribution, error rate and token throughput of the mock provider
+# are set from the command line (see mock_llm_settings in catalog/catalog.py), as well as the timeouts and
+# retries of the LLM calls (see llm_settings), so the worker pools and timeouts can be sized for the real
+# providers.
+#
+# The results are the throughput (reports and LLM requests per second), the p50/p95/p99 latencies of the
+# reports and of the LLM calls, and the queueing: the time reports wait for a free worker, the time LLM calls
+# wait before their request is sent, the peak number of requests in flight at the mock provider and the
+# failed requests (retried) and fallbacks to the wording generated by code. They are printed and saved as JSON.
+#
+# The runs take place in a temporary working folder (with a copy of the layouts and input tables), so the
+# caches and outputs of the app are not touched. The pdf conversion is left out unless --with-pdf is set.
+#
+# Usage:  python benchmarks/load_test.py [--requests 20] [--concurrency 20] [--latency-median 1.0]
+#                                        [--error-rate 0.05] [--tokens-per-second 100] [--output load_test_results.json]
+
+
+class _NoPdfService:
+
+    """Stand-in for the pdf service, so the load test measures the report generation without the pdf conversion."""
+
+    def submit(self, html_path, pdf_path):
+        pass
+
+    def wait(self, futures = None):
+        return []
+
+
+def percentiles(values):
+
+    """Function to summarise durations in seconds with their percentiles.
+
+    Args:
+        values (list): Durations in seconds.
+    Returns:
+        dict: Number of values, mean, p50, p95, p99 and max (None if there are no values).
+    """
+
+    if not values:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+
+    return {'count': len(values),
+            'mean':  float(np.mean(values)),
+            'p50':   float(p50),
+            'p95':   float(p95),
+            'p99':   float(p99),
+            'max':   float(max(values))}
+
+
+def run_report(request_nr, submitted, report_args):
+
+    """Function to generate one report of the load test and time it.
+
+    Args:
+        request_nr (int): Number of the request (each request has its own entity output folder).
+        submitted (float): Time the request was submitted (time.perf_counter() value).
+        report_args (dict): Keyword arguments of generate_report.
+    Returns:
+        dict: Queue wait, runtime and latency in seconds, status, error and the trace of the run.
+    """
+
+    started = time.perf_counter()
+    result  = {'request': request_nr, 'queue_wait': started - submitted}
+
+    try:
+        _, _, run_details = generate_report(entity = f'load_{request_nr:04d}', **report_args)
+        result.update(status = 'ok', error = None, trace = run_details['trace'])
+    except Exception as e:
+        result.update(status = 'error', error = f"{type(e).__name__}: {e}", trace = [])
+
+    finished = time.perf_counter()
+    result.update(runtime = finished - started, latency = finished - submitted)
+
+    return result
+
+
+def llm_span_stats(traces):
+
+    """Function to collect the LLM calls and requests from the traces of the reports.
+
+    Args:
+        traces (list): Traces of the reports (lists of spans as dictionaries).
+    Returns:
+        dict: Durations of the LLM calls and requests, wait of each call before its first request is sent,
+              number of requests per call, failed requests and fallbacks.
+    """
+
+    stats = {'call_durations': [], 'request_durations': [], 'call_waits': [], 'requests_per_call': [],
+             'failed_requests': 0, 'fallbacks': 0}
+
+    for trace in traces:
+        requests_by_call = {}
+        for span in trace:
+            if span['name'] == 'llm.request':
+                requests_by_call.setdefault(span['parent_id'], []).append(span)
+                stats['request_durations'].append(span['duration'])
+                stats['failed_requests'] += span['status'] != 'ok'
+
+        for span in trace:
+            if span['name'] != 'llm.call' or span['attributes'].get('cache_hit'):
+                continue
+            stats['call_durations'].append(span['duration'])
+            stats['fallbacks'] += bool(span['attributes'].get('fallback'))
+
+            requests = requests_by_call.get(span['span_id'], [])
+            stats['requests_per_call'].append(len(requests))
+            if requests:
+                stats['call_waits'].append(min(request['start_time'] for request in requests) - span['start_time'])
+
+    return stats
+
+
+def run_load_test(n_requests, concurrency, report_args):
+
+    """Function to fire concurrent generate_report calls against the mock provider and summarise them.
+
+    Args:
+        n_requests (int): Number of reports generated.
+        concurrency (int): Maximum number of reports generated at the same time.
+        report_args (dict): Keyword arguments of generate_report (the same for all reports).
+    Returns:
+        dict: Throughput, latency percentiles and queueing of the reports and of the LLM calls.
+    """
+
+    mock_client = get_llm_client('Mock')
+    before      = mock_client.stats()
+
+    # Track the number of reports in progress (sampled when each report starts):
+    in_progress      = [0]
+    in_progress_peak = [0]
+    lock             = threading.Lock()
+
+    def tracked(request_nr, submitted):
+        with lock:
+            in_progress[0]     += 1
+            in_progress_peak[0] = max(in_progress_peak[0], in_progress[0])
+        try:
+            return run_report(request_nr, submitted, report_args)
+        finally:
+            with lock:
+                in_progress[0] -= 1
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers = concurrency, thread_name_prefix = 'load') as executor:
+        futures = [executor.submit(tracked, request_nr, time.perf_counter()) for request_nr in range(n_requests)]
+        results = [future.result() for future in futures]
+    wall_time = time.perf_counter() - start_time
+
+    after   = mock_client.stats()
+    ok      = [result for result in results if result['status'] == 'ok']
+    llm     = llm_span_stats([result['trace'] for result in results])
+    n_calls = len(llm['call_durations'])
+
+    return {'wall_time':  wall_time,
+            'throughput': {'reports_per_second':      len(ok) / wall_time,
+                           'llm_requests_per_second': (after['requests'] - before['requests']) / wall_time},
+            'reports':    {'requests':    n_requests,
+                           'succeeded':   len(ok),
+                           'failed':      n_requests - len(ok),
+                           'errors':      sorted({result['error'] for result in results if result['error']}),
+                           'latency':     percentiles([result['latency'] for result in ok]),
+                           'runtime':     percentiles([result['runtime'] for result in ok]),
+                           'queue_wait':  percentiles([result['queue_wait'] for result in results]),
+                           'peak_in_progress': in_progress_peak[0]},
+            'llm':        {'calls':                 n_calls,
+                           'call_latency':          percentiles(llm['call_durations']),
+                           'request_latency':       percentiles(llm['request_durations']),
+                           'call_queue_wait':       percentiles(llm['call_waits']),
+                           'requests_per_call':     float(np.mean(llm['requests_per_call'])) if n_calls else None,
+                           'failed_requests':       llm['failed_requests'],
+                           'fallbacks':             llm['fallbacks'],
+                           'mock_requests':         after['requests'] - before['requests'],
+                           'mock_errors':           after['errors'] - before['errors'],
+                           'peak_in_flight':        after['peak_in_flight']}}
+
+
+def _print_latency(name, summary):
+
+    """Print the percentiles of a latency summary in ms."""
+
+    if summary['count']:
+        print(f"  {name:<24} p50 {summary['p50'] * 1000:9.1f} ms   p95 {summary['p95'] * 1000:9.1f} ms   "
+              f"p99 {summary['p99'] * 1000:9.1f} ms   ({summary['count']})")
+
+
+def main(argv = None):
+
+    """Command line entry point: run the load test against the mock provider and save the results.
+
+    Args:
+        argv (list): Command line arguments (defaults to sys.argv).
+    Returns:
+        int: Exit status (1 if a report failed, 0 otherwise).
+    """
+
+    parser = argparse.ArgumentParser(description = "Load test of the LLM path against the local mock LLM provider.")
+    parser.add_argument('--requests',             type = int,   default = 20,   help = "Number of reports generated.")
+    parser.add_argument('--concurrency',          type = int,   default = None, help = "Maximum number of reports at the same time (default: all).")
+    parser.add_argument('--year',                 type = int,   default = 2025, help = "Current year of the reports.")
+    parser.add_argument('--llm-response-mode',    choices = ['structured', 'sections'], default = None)
+    parser.add_argument('--latency-distribution', choices = ['fixed', 'uniform', 'exponential', 'lognormal'],
+                        default = mock_llm_settings['latency_distribution'])
+    parser.add_argument('--latency-median',       type = float, default = mock_llm_settings['latency_median_seconds'],
+                        help = "Median latency of the mock requests before the first token in seconds.")
+    parser.add_argument('--latency-spread',       type = float, default = mock_llm_settings['latency_spread'],
+                        help = "Spread of the latency (half width in seconds for uniform, sigma of the log for lognormal).")
+    parser.add_argument('--tokens-per-second',    type = float, default = mock_llm_settings['tokens_per_second'])
+    parser.add_argument('--error-rate',           type = float, default = mock_llm_settings['error_rate'],
+                        help = "Share of the mock requests failing with a transient error.")
+    parser.add_argument('--seed',                 type = int,   default = mock_llm_settings['seed'])
+    parser.add_argument('--timeout',              type = float, default = llm_settings['timeout_seconds'],
+                        help = "Timeout of each LLM request in seconds.")
+    parser.add_argument('--latency-budget',       type = float, default = llm_settings['latency_budget_seconds'],
+                        help = "Latency budget of each LLM call in seconds.")
+    parser.add_argument('--max-retries',          type = int,   default = llm_settings['max_retries'])
+    parser.add_argument('--with-pdf',             action = 'store_true', help = "Also convert the reports to pdf (needs wkhtmltopdf).")
+    parser.add_argument('--output',               default = 'load_test_results.json', help = "Path of the JSON results file.")
+    args = parser.parse_args(argv)
+
+    output_path = os.path.abspath(args.output)
+    concurrency = args.concurrency or args.requests
+
+    # Settings of the mock provider and of the LLM calls (read by the clients at each request):
+    mock_llm_settings.update({'latency_distribution':   args.latency_distribution,
+                              'latency_median_seconds': args.latency_median,
+                              'latency_spread':         args.latency_spread,
+                              'tokens_per_second':      args.tokens_per_second,
+                              'error_rate':             args.error_rate,
+                              'seed':                   args.seed})
+    llm_settings.update({'timeout_seconds':        args.timeout,
+                         'latency_budget_seconds': args.latency_budget,
+                         'max_retries':            args.max_retries})
+
+    report_args = {'current_year':      args.year,
+                   'llm_flag':          'Yes',
+                   'llm_provider':      'Mock',
+                   'llm_use_cache':     False,
+                   'llm_response_mode': args.llm_response_mode,
+                   'output_formats':    ['html', 'pdf'] if args.with_pdf else ['html'],
+                   'force_rebuild':     True,
+                   'export_images':     False,
+                   'export_trace':      False}
+
+    # Run in a temporary working folder with a copy of the layouts and input tables:
+    working_folder = tempfile.mkdtemp(prefix = 'scr_load_test_')
+    current_folder = os.getcwd()
+    try:
+        for folder in [folders['layout'], folders['input_tables']]:
+            shutil.copytree(os.path.join(root_folder, folder), os.path.join(working_folder, folder))
+        os.chdir(working_folder)
+
+        print(f"Load test: {args.requests} reports, {concurrency} at the same time, mock latency "
+              f"{args.latency_distribution} (median {args.latency_median} s), error rate {args.error_rate:.0%}...")
+
+        pdf_patch = contextlib.nullcontext() if args.with_pdf else mock.patch('main.get_pdf_service', _NoPdfService)
+        with pdf_patch, contextlib.redirect_stdout(io.StringIO()):
+            load = run_load_test(args.requests, concurrency, report_args)
+    finally:
+        os.chdir(current_folder)
+        shutil.rmtree(working_folder, ignore_errors = True)
+
+    results = {'meta':     {'timestamp':   time.strftime('%Y-%m-%dT%H:%M:%S'),
+                            'python':      platform.python_version(),
+                            'platform':    platform.platform(),
+                            'requests':    args.requests,
+                            'concurrency': concurrency,
+                            'year':        args.year,
+                            'mock':        dict(mock_llm_settings),
+                            'llm':         dict(llm_settings),
+                            'with_pdf':    args.with_pdf},
+               'results':  load}
+
+    # Print and save the results:
+    print(f"  {'throughput':<24} {load['throughput']['reports_per_second']:.2f} reports/s, "
+          f"{load['throughput']['llm_requests_per_second']:.2f} LLM requests/s ({load['wall_time']:.1f} s)")
+    _print_latency('report latency', load['reports']['latency'])
+    _print_latency('report queue wait', load['reports']['queue_wait'])
+    _print_latency('LLM call latency', load['llm']['call_latency'])
+    _print_latency('LLM request latency', load['llm']['request_latency'])
+    _print_latency('LLM call queue wait', load['llm']['call_queue_wait'])
+    print(f"  {'queueing':<24} peak {load['reports']['peak_in_progress']} reports in progress, peak "
+          f"{load['llm']['peak_in_flight']} LLM requests in flight, {load['llm']['mock_errors']} mock errors (retried), "
+          f"{load['llm']['failed_requests']} LLM requests failed after retries, {load['llm']['fallbacks']} fallbacks "
+          f"to the wording generated by code")
+
+    with open(output_path, 'w', encoding = 'utf-8') as results_file:
+        json.dump(results, results_file, indent = 2)
+    print(f"✅Load test results saved at: {output_path}")
+
+    for error in load['reports']['errors']:
+        print(f"❌{error}")
+
+    return 1 if load['reports']['failed'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,6 @@
 # Set user-specific inputs
 # See ReadMe file for instructions on how to obtain API keys
-root_folder     = 'C:\Users\deore\Documents\anaconda_projects\streamlit_pdf'
+root_folder     = r'C:\Users\deore\Documents\anaconda_projects\streamlit_pdf'
 api_key_gemini  = 'GEMINI_API_KEY'
 api_key_openai  = 'your_openai_api_key_here'
 
@@ -10,12 +10,102 @@ folders = {  'root':                               root_folder,
              'input_tables':                      'input/tables/',
              'layout':                            'layout/',
              'output_reports':                    'output/reports/',
-             'output_images':                     'output/images/'}
+             'output_images':                     'output/images/',
+             'llm_cache':                         'output/cache/llm/',
+             'table_cache':                       'output/cache/tables/',
+             'chart_store':                       'output/cache/charts/',
+             'template_cache':                    'output/cache/templates/',
+             'history':                           'output/cache/history/'}
 
-filenames = {'bscr_current_chart':                'composition_basic_scr_current.png', 
+filenames = {'scr_table':                         'scr_table_{year}YE.xlsx',
+             'bscr_current_chart':                'composition_basic_scr_current.png', 
              'bscr_previous_chart':               'composition_basic_scr_previous.png',
              'scr_report_layout':                 'layout_scr_report.html',
-             'validation_report_layout_filename': 'layout_validation_report.html'}
+             'validation_report_layout_filename': 'layout_validation_report.html',
+             'batch_manifest':                    'batch_manifest.json',
+             'build_manifest':                    'build_manifest.json',
+             'trace':                             'trace_{year}.jsonl',
+             'metrics':                           'metrics_{year}.prom',
+             'history_store':                     'scr_history.sqlite'}
 
 api_keys =  {'gemini':                            api_key_gemini,
-             'openai':                            api_key_openai}   
+             'openai':                            api_key_openai,
+             'mock':                              'local'}   
+
+# Placeholder values of the API keys above (a provider whose key is a placeholder is not asked on failover):
+api_key_placeholders = {'GEMINI_API_KEY', 'your_openai_api_key_here'}
+
+llm_models = {'gemini':                           'models/gemini-2.5-pro',
+              'openai':                           'gpt-3.5-turbo',
+              'mock':                             'mock-llm'}
+
+# Names used in the reports (entity of the input tables if no other name is given, and group of the consolidated reports)
+# and subfolder of the output folders for the group reports:
+report_settings = {'entity_name':                 'Smart Insurance Ltd',
+                   'group_name':                  'Smart Insurance Group',
+                   'group_folder':                'group'}
+
+# Stress and sensitivity analysis of the solvency ratio: risk modules shocked, correlations between them (Solvency II
+# standard formula, used to recalculate the diversification benefit), shock of the sensitivity table (relative change of
+# each risk module and of Own Funds, down and up) and grid of the stress scenarios (shock levels per factor between the
+# minimum and maximum shock, for all combinations of the risk modules and Own Funds: 7 levels give 7**5 = 16,807 scenarios):
+stress_settings = {'risk_modules':                ['Market Risk', 'Counterparty Default Risk', 'Life Risk', 'Health Risk'],
+                   'module_correlations':         [[1.00, 0.25, 0.25, 0.25],
+                                                   [0.25, 1.00, 0.25, 0.25],
+                                                   [0.25, 0.25, 1.00, 0.00],
+                                                   [0.25, 0.25, 0.00, 1.00]],
+                   'sensitivity_shock':           0.10,
+                   'grid_levels':                 7,
+                   'grid_min_shock':              -0.25,
+                   'grid_max_shock':              0.25}
+
+# Report pipeline (maximum number of stages running at the same time):
+pipeline_settings = {'max_workers':               4}
+
+# Conversion to pdf (path to wkhtmltopdf, found automatically if empty, and maximum number of conversions at the same time):
+pdf_settings = {'wkhtmltopdf_path':               '',
+                'max_workers':                    2}
+
+# LLM calls (timeout per request in seconds, maximum number of calls sent at the same time and response mode:
+# 'sections' for one request per section, streamed in the app, or 'structured' for one request returning all sections
+# as JSON, not streamed).
+# Failed requests are retried with jittered exponential backoff (delays in seconds) within the latency budget
+# of the call; if the provider has not answered after the hedge delay, the other provider is asked as well
+# (if failover is on and its API key is set) and the first answer is used. An answer of the other provider is cached
+# under the selected provider for a short time only (failover_cache_seconds, 0 to not cache it under the selected
+# provider). Without answer within the budget, the wording generated by code is used:
+llm_settings = {'timeout_seconds':                120,
+                'max_concurrent_calls':           4,
+                'response_mode':                  'sections',
+                'max_retries':                    3,
+                'backoff_base_seconds':           1.0,
+                'backoff_max_seconds':            20.0,
+                'latency_budget_seconds':         180,
+                'hedge_after_seconds':            60,
+                'failover':                       True,
+                'failover_cache_seconds':         600}
+
+# Local mock LLM provider ('Mock', no network, used for load tests): latency of each request before the first token
+# drawn from a distribution ('fixed', 'uniform', 'exponential' or 'lognormal') with its median in seconds and spread
+# (half width in seconds for 'uniform', sigma of the log for 'lognormal', not used otherwise),
+# token throughput of the response (tokens per second), share of the requests failing with a transient error and
+# seed of the random draws (the responses themselves are deterministic for a prompt):
+mock_llm_settings = {'latency_distribution':      'lognormal',
+                     'latency_median_seconds':    1.0,
+                     'latency_spread':            0.5,
+                     'tokens_per_second':         100,
+                     'error_rate':                0.0,
+                     'seed':                      0}
+
+# Cache of LLM responses (time to live in seconds, maximum number of responses and total size in bytes):
+llm_cache_settings = {'ttl_seconds':              7 * 24 * 3600,
+                      'max_entries':              500,
+                      'max_bytes':                20_000_000}
+
+# Store of rendered charts (maximum number of charts kept in memory and saved on disk, least recently used are removed):
+chart_store_settings = {'max_memory_charts':      64,
+                        'max_stored_charts':      500}
+
+# Streamlit app (generated reports kept in memory across sessions: maximum number of results and time to live in seconds):
+app_settings = {'cache_max_entries':              32,
+                'cache_ttl_seconds':              3600}
@@ -1,3 +1,6 @@
+import json
+
+
 
 
 def set_llm_prompts(nr_of_sentences, previous_year, results_table):
@@ -41,4 +44,41 @@ def set_llm_prompts(nr_of_sentences, previous_year, results_table):
     return prompts
 
 
+# JSON schema of the structured response (all sections of the report in one request):
+structured_response_schema = {'type':       'object',
+                              'required':   ['background', 'results_analysis'],
+                              'properties': {'background':       {'type': 'string', 'minLength': 1},
+                                             'results_analysis': {'type': 'array', 'minItems': 1,
+                                                                  'items': {'type':       'object',
+                                                                            'required':   ['item', 'bullets'],
+                                                                            'properties': {'item':    {'type': 'string', 'minLength': 1},
+                                                                                           'bullets': {'type': 'array', 'minItems': 1,
+                                                                                                       'items': {'type': 'string', 'minLength': 1}}}}}}}
+
+
+def set_structured_llm_prompt(nr_of_sentences, previous_year, results_table):
+
+    """Function to set the LLM prompt asking for all sections of the report in one JSON response.
+
+    Args:
+        nr_of_sentences (int): Number of sentences for background description.
+        previous_year (int): Previous year for analysis.
+        results_table (str): The results table for analysis.
+    Returns:
+        str: The prompt.
+    """
+
+    prompts = set_llm_prompts(nr_of_sentences, previous_year, results_table)
+
+    prompt = f"Write two sections of a report on the solvency position of an insurance undertaking and return them \
+               as a single JSON object. \
+               Section 'background': {prompts['background']} \
+               Section 'results_analysis': {prompts['results_analysis']} Return the results analysis as a list with \
+               one object per item (SCR, Own Funds and Solvency Ratio) with the name of the item in 'item' and the \
+               sentences about it in 'bullets'. \
+               Return only the JSON object, without markdown, matching this JSON schema: {json.dumps(structured_response_schema)}"
+
+    return prompt
+
+
 default_llm_response = {'background':   "The capital regime for an insurance undertaking in the EU is governed by the Solvency II Directive. This directive requires insurance undertakings to report their solvency to the supervisory authorities on a regular basis, typically quarterly or annually."}
\ No newline at end of file
@@ -0,0 +1,31 @@
+# Validation rules for the SCR table - identities between line items checked by the validation report.
+#
+# Rules refer to line items by name (see line_item_aliases for other names used in the input tables):
+#
+#   sum_of:                the item is the sum of the listed items (current and previous year)
+#   ratio_of:              the item is the numerator item divided by the denominator item (current and previous year)
+#   movement:              the Movement column is the current year minus the previous year (all items)
+#   percentage_movement:   the Movement % column is the current year divided by the previous year minus 1 (all items)
+#
+# Items which are the result of a sum_of or ratio_of rule are checked, all other items are raw inputs.
+
+validation_rules = [{'rule': 'sum_of',              'item': 'Basic SCR',
+                     'items': ['Market Risk', 'Counterparty Default Risk', 'Life Risk', 'Health Risk', 'Diversification Benefit']},
+
+                    {'rule': 'sum_of',              'item': 'Total SCR',
+                     'items': ['Basic SCR', 'Operational Risk', 'Deferred Tax Adjustment']},
+
+                    {'rule': 'ratio_of',            'item': 'Solvency Ratio',
+                     'numerator': 'Own Funds', 'denominator': 'Total SCR'},
+
+                    {'rule': 'movement',            'column': 'Movement'},
+
+                    {'rule': 'percentage_movement', 'column': 'Movement %'}]
+
+
+# Other names of line items used in the input tables:
+line_item_aliases = {'Market':                  'Market Risk',
+                     'Counterparty Default':    'Counterparty Default Risk',
+                     'Life':                    'Life Risk',
+                     'Health':                  'Health Risk',
+                     'Diversification':         'Diversification Benefit'}
@@ -1,64 +1,291 @@
-import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from catalog.llm_prompts import default_llm_response
-import openai
-import google.generativeai as genai
 
-# Import catalog:
-from catalog.catalog import api_keys
+# Import catalog and helpers:
+from catalog.catalog import llm_models, llm_settings
+from helpers.llm_cache import get_llm_cache
+from helpers.llm_clients import LLMUnavailableError, provider_settings, provider_configured, get_llm_client, call_with_retries
+from helpers.tracing import span, submit_in_context
+from helpers.structured_output import parse_json_response
 
-# Generate LLM response (ChatGPT or Gemini) if llm_flag = True, otherwise return default prompt.
-def llm_response(prompt, llm_flag, provider='Gemini'):
+# Providers asked for a response: the selected provider, then the other providers with an API key set if failover
+# is on (the mock provider is never mixed with the real providers, so a load test does not call the APIs):
+def _provider_chain(prov):
+
+    """Return the providers to ask for a response, in order (the other providers only if failover is on)."""
+
+    if not llm_settings['failover'] or prov == 'mock':
+        return [prov]
+
+    return [prov] + [other for other in llm_models if other not in (prov, 'mock') and provider_configured(other)]
+
+
+# Record the source of a response (the set is shared by the calls of a report, which may run in several threads):
+_sources_lock = threading.Lock()
+
+
+def _add_source(sources, source):
+    if sources is not None:
+        with _sources_lock:
+            sources.add(source)
+
+
+# Ask the providers for a response, the next provider if the previous one failed or is slow:
+def _hedged_response(prompt, providers, timeout, json_output=False, deadline=None):
+
+    """Send the prompt to the first provider, with retries on transient errors. If it fails or has not answered
+    after the hedge delay, the next provider is asked as well and the first response is used. The call ends at
+    the end of the latency budget, or at the given deadline (time.monotonic() value) if it is earlier.
+
+    Returns:
+        tuple: The client of the provider which answered and the response text.
+    Raises:
+        LLMUnavailableError: If no provider answered within the latency budget.
+    """
+
+    budget   = llm_settings['latency_budget_seconds']
+    deadline = min(time.monotonic() + budget, deadline if deadline is not None else float('inf'))
+    waiting  = list(providers)
+    futures  = {}
+    errors   = {}
+    executor = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix='llm-provider')
+
+    def ask(client):
+        with span('llm.request', provider=client.provider, model=client.model):
+            return call_with_retries(lambda request_timeout: client.complete(prompt, request_timeout, json_output),
+                                     deadline, timeout)
+
+    # Start the request of the next provider and return the time to ask the one after it:
+    def start_next():
+        while waiting:
+            prov = waiting.pop(0)
+            try:
+                client = get_llm_client(prov)
+            except Exception as e:
+                errors[prov] = e
+                continue
+            futures[submit_in_context(executor, ask, client)] = client
+            return time.monotonic() + llm_settings['hedge_after_seconds']
+        return None
+
+    try:
+        hedge_at = start_next()
+        while futures:
+            wait_until = min(deadline, hedge_at) if waiting and hedge_at is not None else deadline
+            done, _    = wait(futures, timeout=max(0, wait_until - time.monotonic()), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                client = futures.pop(future)
+                try:
+                    return client, future.result()
+                except Exception as e:
+                    errors[client.provider] = e
+
+            if time.monotonic() >= deadline:
+                break
+
+            # Ask the next provider if the running requests failed or are slower than the hedge delay:
+            if waiting and (not futures or time.monotonic() >= hedge_at):
+                hedge_at = start_next()
+
+    finally:
+        # Do not wait for requests which are still running:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    details = '; '.join(f"{prov}: {type(e).__name__}: {e}" for prov, e in errors.items()) or 'no response in time'
+    raise LLMUnavailableError(f"No LLM response from {', '.join(providers)} within the latency budget ({details}).")
+
+
+# Generate LLM response (ChatGPT, Gemini or the local mock provider) if llm_flag = True, otherwise return default prompt.
+def llm_response(prompt, llm_flag, provider='Gemini', use_cache=True, timeout=None, json_output=False, fallback=False,
+                 deadline=None, sources=None, cache_only=False):
 
     """Function to get LLM response based on the selected provider and flag.
 
+    Responses are cached on disk by provider, model and normalised prompt, so a repeated prompt
+    does not call the API again. Requests are retried on transient errors, and the other provider
+    is asked if the selected one fails or is slow (see llm_settings).
+
     Args:
         prompt (str): The prompt to send to the LLM.
         llm_flag (str): Flag indicating whether to use the LLM or not.
-        provider (str): The LLM provider to use (e.g., 'OpenAI' or 'Gemini').
+        provider (str): The LLM provider to use (e.g., 'OpenAI', 'Gemini' or 'Mock').
+        use_cache (bool): Set to False to bypass the cache and get a fresh response (which then replaces the cached one).
+        timeout (float): Timeout of each API request in seconds (defaults to the timeout in llm_settings).
+        json_output (bool): Flag to request a JSON object as response (a response which is not a JSON object is not cached).
+        fallback (bool): Flag to return None instead of raising LLMUnavailableError if no provider answers in time
+                         (the caller then uses the wording generated by code).
+        deadline (float): Deadline of the call (time.monotonic() value), if earlier than the end of the latency budget.
+        sources (set): If given, the source of the response is added to it: 'provider' (the selected provider),
+                       'failover' (another provider, also if its answer is taken from the cache) or 'fallback'
+                       (no answer, the caller uses the wording generated by code).
+        cache_only (bool): Flag to take the response from the cache only, without asking the providers (e.g. when they
+                           have just failed to answer the same prompt); a response not cached is handled as no answer.
     Returns:
-        str: The response from the LLM or the default response.
+        str: The response from the LLM or the default response (None if no provider answered and fallback is set).
+    Raises:
+        LLMUnavailableError: If no provider answered within the latency budget (and fallback is not set).
     """
 
 
     if llm_flag != 'Yes':
         return default_llm_response['background']
 
-    prov = (provider or '').strip().lower()
-
-    if prov == 'openai':
-        api_key = api_keys.get('openai')
-    elif prov == 'gemini':
-        api_key = api_keys.get('gemini')
-    else:
-        raise ValueError(f"Unknown provider: {provider}")
-
-    if not api_key:
-        raise RuntimeError(f"API key for {provider} not found or empty.")
-
-    # Use the OpenAI or Gemini API to get the response
-    # OpenAI
-    if prov == 'openai':                 
-        # REQUIRED for openai==0.28
-        openai.api_key = api_key
-
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Your system message here."},
-                {"role": "user", "content": prompt},
-            ],
-            max_tokens=500,
-        )
-        response_text = response['choices'][0]['message']['content']
-
-    # Google Gemini
-    else:  
-        genai.configure(api_key=api_key)
-
-        # Use the latest high-quality Gemini model
-        model = genai.GenerativeModel("models/gemini-2.5-pro")
-
-        response = model.generate_content(prompt)
-        response_text = response.text
-
-    return response_text
\ No newline at end of file
+    if timeout is None:
+        timeout = llm_settings['timeout_seconds']
+
+    # Return cached response if available:
+    prov, _, model = provider_settings(provider)
+    cache          = get_llm_cache()
+    cache_key      = cache.make_key(prov, model, prompt)
+
+    with span('llm.call', provider=prov, model=model, prompt_chars=len(prompt), json_output=json_output) as llm_span:
+
+        if use_cache:
+            cached_entry = cache.get_entry(cache_key)
+            if cached_entry is not None:
+                llm_span.set_attribute('cache_hit', True)
+                llm_span.set_attribute('bytes', len(cached_entry['response'].encode('utf-8')))
+                _add_source(sources, 'failover' if cached_entry.get('requested_provider') else 'provider')
+                return cached_entry['response']
+
+        llm_span.set_attribute('cache_hit', False)
+        try:
+            if cache_only:
+                raise LLMUnavailableError(f"No cached LLM response from {prov} (the providers are not asked again).")
+            client, response_text = _hedged_response(prompt, _provider_chain(prov), timeout, json_output, deadline)
+        except LLMUnavailableError as e:
+            if not fallback:
+                raise
+            llm_span.set_attribute('fallback', True)
+            print(f"❌{e} The wording generated by code is used instead.")
+            _add_source(sources, 'fallback')
+            return None
+
+        llm_span.set_attribute('answered_by', client.provider)
+        _add_source(sources, 'failover' if client.provider != prov else 'provider')
+        llm_span.set_attribute('bytes', len(response_text.encode('utf-8')))
+
+    # Save response in the cache under the provider which answered. If another provider answered, it is also saved
+    # under the selected provider for a short time only, so the next calls do not wait for the failing provider while
+    # it is down, and the selected provider is asked again (and its response replaces this one) once it has expired.
+    # A response of the selected provider already cached (e.g. when the cache was bypassed) is not replaced by it:
+    if not json_output or parse_json_response(response_text) is not None:
+        cache.set(cache.make_key(client.provider, client.model, prompt), response_text,
+                  provider=client.provider, model=client.model)
+        if client.provider != prov and llm_settings['failover_cache_seconds'] and not cache.contains(cache_key):
+            cache.set(cache_key, response_text, provider=client.provider, model=client.model, requested_provider=prov,
+                      ttl_seconds=llm_settings['failover_cache_seconds'])
+
+    return response_text
+
+
+# Generate LLM responses for several prompts at the same time:
+def llm_responses(prompts, llm_flag, provider='Gemini', use_cache=True, timeout=None, json_output=False, fallback=False,
+                  sources=None, cache_only=False):
+
+    """Function to get LLM responses for several prompts concurrently (one thread per prompt).
+
+    The wall-clock time is roughly that of the slowest call instead of the sum of all calls.
+
+    Args:
+        prompts (dict): Prompts to send to the LLM by name (e.g. {'background': ..., 'results_analysis': ...}).
+        llm_flag (str): Flag indicating whether to use the LLM or not.
+        provider (str): The LLM provider to use (e.g., 'OpenAI', 'Gemini' or 'Mock').
+        use_cache (bool): Set to False to bypass the cache and get fresh responses.
+        timeout (float): Timeout of each API request in seconds (defaults to the timeout in llm_settings).
+        json_output (bool): Flag to request JSON objects as responses.
+        fallback (bool): Flag to return None for the prompts no provider answered in time (instead of raising LLMUnavailableError).
+        sources (set): If given, the sources of the responses are added to it (see llm_response).
+        cache_only (bool): Flag to take the responses from the cache only, without asking the providers (see llm_response).
+    Returns:
+        dict: The responses by prompt name.
+    """
+
+    # No API calls needed, so no need for threads:
+    if llm_flag != 'Yes':
+        return {name: llm_response(prompt, llm_flag, provider, use_cache) for name, prompt in prompts.items()}
+
+    max_workers = max(1, min(len(prompts), llm_settings['max_concurrent_calls']))
+    executor    = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+
+    # Each call returns (or fails) within the latency budget in llm_settings:
+    try:
+        futures   = {name: submit_in_context(executor, llm_response, prompt, llm_flag, provider, use_cache, timeout,
+                                             json_output, fallback, None, sources, cache_only)
+                     for name, prompt in prompts.items()}
+        responses = {name: future.result() for name, future in futures.items()}
+
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return responses
+
+
+# Stream an LLM response (ChatGPT or Gemini) as it is generated:
+def llm_response_stream(prompt, llm_flag, provider='Gemini', use_cache=True, timeout=None, sources=None):
+
+    """Function to stream the LLM response, yielding the text in pieces as the provider generates it.
+
+    A cached response is yielded at once. The complete response is saved in the cache when the stream
+    is finished, so the report generated afterwards with the same prompt reuses it without calling the API.
+    The stream and, if it fails before the first piece, the call of the other providers together end
+    within the timeout.
+
+    Args:
+        prompt (str): The prompt to send to the LLM.
+        llm_flag (str): Flag indicating whether to use the LLM or not.
+        provider (str): The LLM provider to use (e.g., 'OpenAI', 'Gemini' or 'Mock').
+        use_cache (bool): Set to False to bypass the cache and get a fresh response (which then replaces the cached one).
+        timeout (float): Timeout of the API request in seconds (defaults to the timeout in llm_settings).
+        sources (set): If given, the source of the response is added to it (see llm_response): 'fallback' if no
+                       complete response was received (the report generated afterwards then need not ask the
+                       providers again, see cache_only in llm_response).
+
+    Yields:
+        str: Pieces of the response from the LLM (or the default response).
+    """
+
+    if llm_flag != 'Yes':
+        yield default_llm_response['background']
+        return
+
+    prov, _, model = provider_settings(provider)
+    cache          = get_llm_cache()
+    cache_key      = cache.make_key(prov, model, prompt)
+
+    if use_cache:
+        cached_entry = cache.get_entry(cache_key)
+        if cached_entry is not None:
+            _add_source(sources, 'failover' if cached_entry.get('requested_provider') else 'provider')
+            yield cached_entry['response']
+            return
+
+    if timeout is None:
+        timeout = llm_settings['timeout_seconds']
+    deadline = time.monotonic() + timeout
+
+    pieces = []
+    try:
+        for piece in get_llm_client(prov).stream(prompt, timeout):
+            pieces.append(piece)
+            yield piece
+
+    except Exception as e:
+        if pieces:
+            print(f"❌Streaming of the LLM response stopped ({type(e).__name__}: {e}).")
+            _add_source(sources, 'fallback')
+            return
+
+        # Nothing streamed yet: get the response with retries and failover instead (not streamed), in the time left:
+        response_text = llm_response(prompt, llm_flag, provider, use_cache=False, timeout=timeout, fallback=True,
+                                     deadline=deadline, sources=sources)
+        if response_text is not None:
+            yield response_text
+        return
+
+    # Save the complete response in the cache:
+    cache.set(cache_key, ''.join(pieces), provider=prov, model=model)
+    _add_source(sources, 'provider')
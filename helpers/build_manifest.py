@@ -0,0 +1,104 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+# Functions:
+#
+#   file_hash
+#   BuildManifest (class)
+#
+# The build manifest (build_manifest.json in each output/reports/<year>/ folder) records for every stage
+# of the pipeline a key which is a hash of the contents of its input files, its parameters and the keys of
+# the stages it depends on. A stage whose key is unchanged and whose output files still exist does not
+# need to be run again. Changes to the Python code are not tracked, use force_rebuild in that case.
+
+
+def file_hash(path):
+
+    """Function to compute the content hash of a file.
+
+    Args:
+        path (str): Path to the file.
+    Returns:
+        str: SHA-256 hash of the file contents.
+    """
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+class BuildManifest:
+
+    """Build manifest of the artifacts in an output folder.
+
+    Args:
+        path (str): Path to the manifest file (created on first save).
+    """
+
+    def __init__(self, path):
+        self.path         = path
+        self._lock        = threading.Lock()
+        self._file_hashes = {}
+
+        try:
+            with open(path, 'r', encoding = "utf-8") as manifest_file:
+                self.stages = json.load(manifest_file).get('stages', {})
+        except (OSError, ValueError):
+            self.stages = {}
+
+    def stage_key(self, name, params = None, input_files = (), dependency_keys = ()):
+
+        """Return the key of a stage from its parameters, input files and the keys of its dependencies."""
+
+        key_data = {'name':         name,
+                    'params':       repr(sorted((params or {}).items())),
+                    'input_files':  [self._file_hash(path) for path in input_files],
+                    'dependencies': list(dependency_keys)}
+
+        return hashlib.sha256(json.dumps(key_data, sort_keys = True).encode("utf-8")).hexdigest()
+
+    def is_fresh(self, name, key, outputs):
+
+        """Return True if the stage was built with the same key and all its outputs exist."""
+
+        entry = self.stages.get(name)
+        return entry is not None and entry['key'] == key and all(os.path.exists(path) for path in outputs)
+
+    def record(self, name, key, outputs):
+
+        """Record that a stage was built with the given key."""
+
+        with self._lock:
+            self.stages[name] = {'key': key, 'outputs': list(outputs), 'built': time.time()}
+
+    def discard(self, name):
+
+        """Remove a stage from the manifest, so it is built again next time."""
+
+        with self._lock:
+            self.stages.pop(name, None)
+
+    def save(self):
+
+        """Save the manifest (written to a temporary file first so that it is never partially written)."""
+
+        folder = os.path.dirname(self.path) or '.'
+        os.makedirs(folder, exist_ok = True)
+
+        with self._lock:
+            fd, tmp_path = tempfile.mkstemp(dir = folder, suffix = '.tmp')
+            with os.fdopen(fd, 'w', encoding = "utf-8") as manifest_file:
+                json.dump({'stages': self.stages}, manifest_file, indent = 2)
+            os.replace(tmp_path, self.path)
+
+    def _file_hash(self, path):
+        if path not in self._file_hashes:
+            self._file_hashes[path] = file_hash(path)
+        return self._file_hashes[path]
@@ -0,0 +1,316 @@
+import os
+import io
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from importlib.metadata import version
+
+# Import catalog and helpers:
+from catalog.catalog import folders, chart_store_settings
+from helpers.tracing import span
+
+# Functions:
+#
+#   pie_chart_key
+#   render_pie_chart
+#   tornado_chart_key
+#   render_tornado_chart
+#   ChartStore (class)
+#   get_chart_store
+#
+# Charts are drawn on their own Agg Figure (not with the global pyplot state), so charts can be drawn
+# in parallel threads. Rendered charts are kept in a content-addressed store: the file name of a chart
+# is a hash of its data and style, so an identical chart (e.g. the previous year pie of year N and the
+# current year pie of year N-1) is drawn only once and reused across years and report formats. The least
+# recently used charts are dropped from memory and removed from disk (last use = file modification time)
+# once the store holds more than the maximum number of charts.
+# matplotlib is imported only when a chart is drawn, so runs with all charts in the store do not load it.
+
+
+# Style of the Basic SCR composition pie charts:
+pie_chart_style = {'figsize':    (5, 5),
+                   'autopct':    '%1.1f%%',
+                   'startangle': 90,
+                   'fontsize':   8}
+
+# Style of the tornado charts of the sensitivities (bars below and above the base value):
+tornado_chart_style = {'figsize':    (6, 3.5),
+                       'colors':     ['#c0392b', '#2e86c1'],
+                       'fontsize':   8}
+
+
+@lru_cache(maxsize = None)
+def _matplotlib_version():
+
+    """Version of matplotlib (read from the package metadata, without importing matplotlib)."""
+
+    return version('matplotlib')
+
+
+def pie_chart_key(labels, values, style = None):
+
+    """Function to compute the key of a pie chart from its data and style.
+
+    Args:
+        labels (list): Labels of the slices.
+        values (list): Values of the slices.
+        style (dict): Style of the chart (defaults to pie_chart_style).
+    Returns:
+        str: SHA-256 hash of the chart data, style and matplotlib version.
+    """
+
+    key_data = {'type':       'pie',
+                'labels':     [str(label) for label in labels],
+                'values':     [float(value) for value in values],
+                'style':      style or pie_chart_style,
+                'matplotlib': _matplotlib_version()}
+
+    return hashlib.sha256(json.dumps(key_data, sort_keys = True).encode("utf-8")).hexdigest()
+
+
+def render_pie_chart(labels, values, style = None):
+
+    """Function to draw a pie chart as png.
+
+    Args:
+        labels (list): Labels of the slices.
+        values (list): Values of the slices.
+        style (dict): Style of the chart (defaults to pie_chart_style).
+    Returns:
+        bytes: The chart as png.
+    """
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    style = style or pie_chart_style
+
+    # Create the pie chart on its own figure:
+    fig = Figure(figsize = style['figsize'])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.pie(values, labels = labels, autopct = style['autopct'], startangle = style['startangle'],
+           textprops = {'fontsize': style['fontsize']})
+
+    # Equal aspect ratio ensures that pie is drawn as a circle:
+    ax.axis('equal')
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format = 'png')
+
+    return buffer.getvalue()
+
+
+def tornado_chart_key(labels, low, high, base, style = None):
+
+    """Function to compute the key of a tornado chart from its data and style.
+
+    Args:
+        labels (list): Labels of the bars (from top to bottom).
+        low (list): Values after the down shocks.
+        high (list): Values after the up shocks.
+        base (float): Base value (where the bars start).
+        style (dict): Style of the chart (defaults to tornado_chart_style).
+    Returns:
+        str: SHA-256 hash of the chart data, style and matplotlib version.
+    """
+
+    key_data = {'type':       'tornado',
+                'labels':     [str(label) for label in labels],
+                'low':        [float(value) for value in low],
+                'high':       [float(value) for value in high],
+                'base':       float(base),
+                'style':      style or tornado_chart_style,
+                'matplotlib': _matplotlib_version()}
+
+    return hashlib.sha256(json.dumps(key_data, sort_keys = True).encode("utf-8")).hexdigest()
+
+
+def render_tornado_chart(labels, low, high, base, style = None):
+
+    """Function to draw a tornado chart as png: for each label a bar from the base value to the value after
+    the down shock and one to the value after the up shock.
+
+    Args:
+        labels (list): Labels of the bars (from top to bottom).
+        low (list): Values after the down shocks.
+        high (list): Values after the up shocks.
+        base (float): Base value (where the bars start).
+        style (dict): Style of the chart (defaults to tornado_chart_style).
+    Returns:
+        bytes: The chart as png.
+    """
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    style = style or tornado_chart_style
+
+    fig = Figure(figsize = style['figsize'])
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    # First label at the top:
+    positions = list(range(len(labels)))[::-1]
+    ax.barh(positions, [value - base for value in low],  left = base, color = style['colors'][0], label = 'Down shock')
+    ax.barh(positions, [value - base for value in high], left = base, color = style['colors'][1], label = 'Up shock')
+    ax.axvline(base, color = 'black', linewidth = 0.8)
+
+    ax.set_yticks(positions)
+    ax.set_yticklabels(labels, fontsize = style['fontsize'])
+    ax.tick_params(axis = 'x', labelsize = style['fontsize'])
+    ax.xaxis.set_major_formatter(lambda value, _: f"{value:.0%}")
+    ax.legend(fontsize = style['fontsize'], loc = 'lower right')
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format = 'png')
+
+    return buffer.getvalue()
+
+
+class ChartStore:
+
+    """Content-addressed store of rendered charts (in memory and on disk) with LRU eviction.
+
+    Args:
+        store_folder (str): Folder where the charts are saved by key.
+        max_memory_charts (int): Maximum number of charts kept in memory.
+        max_stored_charts (int): Maximum number of charts saved on disk.
+    """
+
+    def __init__(self, store_folder, max_memory_charts = 64, max_stored_charts = 500):
+        self.store_folder      = store_folder
+        self.max_memory_charts = max_memory_charts
+        self.max_stored_charts = max_stored_charts
+        self.rendered          = 0
+        self.reused            = 0
+        self.evictions         = 0
+        self._charts           = OrderedDict()
+        self._lock             = threading.Lock()
+
+    def pie_chart(self, labels, values, style = None):
+
+        """Return the png of a pie chart, drawing it only if it is not in the store yet."""
+
+        return self._chart('pie', pie_chart_key(labels, values, style), lambda: render_pie_chart(labels, values, style))
+
+    def tornado_chart(self, labels, low, high, base, style = None):
+
+        """Return the png of a tornado chart, drawing it only if it is not in the store yet."""
+
+        return self._chart('tornado', tornado_chart_key(labels, low, high, base, style),
+                           lambda: render_tornado_chart(labels, low, high, base, style))
+
+    def _chart(self, kind, key, render):
+
+        """Return the png of a chart by key from memory or disk, drawing it with render() if it is not in the store yet."""
+
+        with span('chart.' + kind) as chart_span:
+
+            # In memory:
+            with self._lock:
+                png = self._charts.get(key)
+                if png is not None:
+                    self._charts.move_to_end(key)
+            if png is not None:
+                self._count('reused')
+                chart_span.set_attribute('source', 'memory')
+                chart_span.set_attribute('bytes', len(png))
+                return png
+
+            # On disk:
+            path = os.path.join(self.store_folder, key + '.png')
+            try:
+                with open(path, 'rb') as chart_file:
+                    png = chart_file.read()
+                self._touch(path)
+                self._count('reused')
+                chart_span.set_attribute('source', 'store')
+            except OSError:
+                png = render()
+                self._save(path, png)
+                self._count('rendered')
+                chart_span.set_attribute('source', 'rendered')
+
+            with self._lock:
+                self._charts[key] = png
+                while len(self._charts) > self.max_memory_charts:
+                    self._charts.popitem(last = False)
+
+            chart_span.set_attribute('bytes', len(png))
+
+            return png
+
+    def _save(self, path, png):
+        os.makedirs(self.store_folder, exist_ok = True)
+        fd, tmp_path = tempfile.mkstemp(dir = self.store_folder, suffix = '.tmp')
+        with os.fdopen(fd, 'wb') as chart_file:
+            chart_file.write(png)
+        os.replace(tmp_path, path)
+
+        self._evict()
+
+    def _evict(self):
+
+        """Remove the least recently used charts from disk until the store is within its bound."""
+
+        try:
+            names = [name for name in os.listdir(self.store_folder) if name.endswith('.png')]
+        except OSError:
+            return
+
+        charts = []
+        for name in names:
+            path = os.path.join(self.store_folder, name)
+            try:
+                charts.append((os.stat(path).st_mtime, path))
+            except OSError:
+                continue
+
+        charts.sort()
+        for _, path in charts[:max(0, len(charts) - self.max_stored_charts)]:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._count('evictions')
+
+    @staticmethod
+    def _touch(path):
+
+        """Mark a chart on disk as recently used."""
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+# Process-wide chart store:
+_chart_store      = None
+_chart_store_lock = threading.Lock()
+
+
+def get_chart_store():
+
+    """Function to return the process-wide chart store.
+
+    Returns:
+        ChartStore: The chart store.
+    """
+
+    global _chart_store
+
+    with _chart_store_lock:
+        if _chart_store is None:
+            _chart_store = ChartStore(folders['chart_store'], **chart_store_settings)
+
+    return _chart_store
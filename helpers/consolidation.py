@@ -0,0 +1,179 @@
+import numpy as np
+
+# Import helpers:
+from helpers.scr_table import ScrTable, CURRENT, PREVIOUS, MOVEMENT, MOVEMENT_PCT
+from helpers.ingestion import read_scr_table
+from helpers.validation import validate_scr_tables, validation_status
+from helpers.tracing import span
+
+# Functions:
+#
+#   GroupConsolidation (class)
+#   consolidate_scr_tables
+#   load_group_tables
+#
+# Consolidation of the SCR tables of the entities of a group. The entity tables (same line items, also if
+# named differently, see line_item_aliases in catalog/validation_rules.py) are stacked into one array of
+# shape (entities, rows, 4), and the group results are computed with numpy reductions over the entity axis:
+# the amounts are summed, the ratios (e.g. the Solvency Ratio) are recalculated from the group amounts with
+# the ratio rules of the validation catalog, and the movements from the group current and previous year.
+# The share of each entity in every group line item and the ranking of the entities by line item are taken
+# from the same array, and the validation rules are evaluated on the whole stack at once, so the group
+# results are not computed by running the single entity pipeline for each entity. The group SCR is the sum
+# of the entity SCRs (no diversification between entities is taken into account).
+
+
+class GroupConsolidation:
+
+    """Consolidated SCR results of a group with the results of its entities.
+
+    Args:
+        entities (list): Names of the entities, in the order of the stacked tables.
+        values (np.ndarray): Values of the entity tables, shape (entities, rows, 4) (read-only).
+        group (ScrTable): The group SCR table (canonical line item names).
+        shares (np.ndarray): Share of each entity in the group current year, previous year and Movement of
+                             each line item, shape (entities, rows, 3) (NaN for ratios and zero group values).
+        ranks (np.ndarray): Entities by line item ordered from the largest to the smallest current year value,
+                            shape (rows, entities).
+        differences (np.ndarray): Validation differences of the entity tables, shape (entities, rows, 4).
+    """
+
+    def __init__(self, entities, values, group, shares, ranks, differences):
+        self.entities    = list(entities)
+        self.values      = values
+        self.group       = group
+        self.shares      = shares
+        self.ranks       = ranks
+        self.differences = differences
+
+    def __repr__(self):
+        return f"GroupConsolidation({self.group.current_year} vs {self.group.previous_year}, {len(self.entities)} entities)"
+
+    @property
+    def current_year(self):
+        return self.group.current_year
+
+    @property
+    def previous_year(self):
+        return self.group.previous_year
+
+    def entity_values(self, item, column):
+
+        """Values of a line item in a column (a year, 'Movement' or 'Movement %') for all entities."""
+
+        return self.values[:, self.group.row(item), self.group.column_index(column)]
+
+    def entity_shares(self, item, column):
+
+        """Shares of the entities in the group value of a line item in a column (a year or 'Movement')."""
+
+        return self.shares[:, self.group.row(item), self.group.column_index(column)]
+
+    def ranking(self, item, column = None, n = None, largest = True):
+
+        """Entities ordered by their value of a line item, from the largest (or the smallest) value.
+
+        Args:
+            item (str): The line item (e.g. 'Total SCR').
+            column: The column (a year, 'Movement' or 'Movement %', defaults to the current year).
+            n (int): Number of entities returned (all if None).
+            largest (bool): Set to False to start with the smallest values.
+        Returns:
+            list: Tuples of the entity name, its value and its share in the group value (None for 'Movement %').
+        """
+
+        column = self.current_year if column is None else column
+        values = self.entity_values(item, column)
+        shares = self.entity_shares(item, column) if self.group.column_index(column) != MOVEMENT_PCT else None
+
+        # The current year ranking is computed once for all line items:
+        if column == self.current_year:
+            order = self.ranks[self.group.row(item)]
+        else:
+            order = np.argsort(-values, kind = 'stable')
+        order = order if largest else order[::-1]
+
+        return [(self.entities[i], float(values[i]), None if shares is None else float(shares[i])) for i in order[:n]]
+
+    def validation_failures(self, threshold):
+
+        """Number of failed validation checks of each entity table.
+
+        Args:
+            threshold (float): Threshold for the validation checks (a difference above it fails).
+        Returns:
+            np.ndarray: Failed checks by entity.
+        """
+
+        _, failed = validation_status(self.differences, threshold)
+
+        return failed.sum(axis = (1, 2))
+
+
+def consolidate_scr_tables(scr_tables, entities):
+
+    """Function to consolidate the SCR tables of the entities of a group in one vectorised pass.
+
+    Args:
+        scr_tables (list): SCR tables of the entities (ScrTable, same line items and years).
+        entities (list): Names of the entities, in the order of the tables.
+    Returns:
+        GroupConsolidation: The group results with the results of the entities.
+    Raises:
+        ValueError: If there are no tables, the tables are for different years or have different line items.
+    """
+
+    if not scr_tables:
+        raise ValueError("No SCR tables to consolidate.")
+    if len(entities) != len(scr_tables):
+        raise ValueError(f"{len(entities)} entity names given for {len(scr_tables)} SCR tables.")
+
+    years = {(scr_table.current_year, scr_table.previous_year) for scr_table in scr_tables}
+    if len(years) > 1:
+        raise ValueError(f"SCR tables of the group are for different years: {sorted(years)}.")
+    current_year, previous_year = years.pop()
+
+    with span('consolidation', entities = len(scr_tables), current_year = current_year):
+
+        # Validation of all entity tables at once (also checks that they have the same line items):
+        differences, compiled = validate_scr_tables(scr_tables)
+        values                = np.stack([scr_table.values for scr_table in scr_tables])
+        values.flags.writeable = False
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+
+            # Group amounts (sums over the entities), with the ratios recalculated from the group amounts:
+            years_total = values[..., CURRENT:PREVIOUS + 1].sum(axis = 0)
+            if compiled.ratio_targets.size:
+                years_total[compiled.ratio_targets] = (years_total[compiled.ratio_numerators] /
+                                                       years_total[compiled.ratio_denominators])
+
+            group_values = np.column_stack([years_total,
+                                            years_total[:, 0] - years_total[:, 1],
+                                            years_total[:, 0] / years_total[:, 1] - 1])
+
+            # Share of each entity in the group amounts and movements (not meaningful for ratios):
+            shares = values[..., CURRENT:MOVEMENT + 1] / group_values[np.newaxis, :, CURRENT:MOVEMENT + 1]
+            shares[:, compiled.ratio_targets] = np.nan
+            shares[~np.isfinite(shares)]      = np.nan
+
+        # Entities by line item from the largest to the smallest current year value:
+        ranks = np.argsort(-values[..., CURRENT], axis = 0, kind = 'stable').T
+
+        group = ScrTable(list(compiled.labels), group_values, current_year, previous_year)
+
+    return GroupConsolidation(entities, values, group, shares, ranks, differences)
+
+
+def load_group_tables(table_paths):
+
+    """Function to read the SCR tables of the entities of a group (from their snapshots if unchanged).
+
+    Args:
+        table_paths (dict): Paths of the SCR tables (scr_table_<year>YE.xlsx) by entity name.
+    Returns:
+        list: The SCR tables (ScrTable), in the order of the entities.
+    """
+
+    with span('consolidation.load_tables', entities = len(table_paths)):
+        return [read_scr_table(path) for path in table_paths.values()]
@@ -2,71 +2,250 @@
 import os
 import re
 import pandas as pd
-import jinja2
-import pdfkit
-from docx import Document
-from docx.shared import Pt, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.enum.text import WD_BREAK
-from bs4 import BeautifulSoup
-import base64
-import tempfile
+import io
+import numpy as np
 
 # Import catalog and helpers:
-from catalog.catalog import filenames
-from catalog.llm_prompts import set_llm_prompts
-from helpers.utils import image_to_base64, count_pass_fail
-from helpers.formatting import format_numeric, conditional_formatting, highlight_rows, format_word_table
+from catalog.catalog import filenames, llm_settings, report_settings
+from catalog.llm_prompts import set_llm_prompts, set_structured_llm_prompt, structured_response_schema, default_llm_response
+from helpers.formatting import html_table, format_word_table, format_scr_table, scr_table_display
+from helpers.validation import canonical_label, validation_status
 from helpers.generate_text import retrieve_quantity_from_table, wording_percentage_movement, wording_percentage_point_movement
 from helpers.generate_text import wording_scr_movement, wording_target_solvency, wording_bscr_movements
-from helpers.api_calls import llm_response
+from helpers.generate_text import wording_sensitivities, wording_stress_grid
+from helpers.api_calls import llm_responses
+from helpers.structured_output import structured_sections
+from helpers.pdf_service import render_pdf
+from helpers.templates import get_template
+from helpers.tracing import span
+from helpers.report_model import Report, Section, Paragraph, BulletList, Table, TableRow, Figure
 
 # Functions: 
 #
+#   results_analysis_bullets
+#   report_llm_prompts
+#   structured_llm_wording
+#   results_table
+#   sensitivity_table
+#   create_report_model
+#   group_results_wording
+#   create_group_report_model
 #   create_html_report
+#   create_group_html_report
+#   render_report_html
 #   html2pdf
 #   crate_pdf_report
 #   create_word_report
 #   create_validation_report 
 
-# Create html report:
-def create_html_report(folders, filenames, current_year, previous_year, scr_table,   
-                       llm_flag,  llm_provider, llm_nr_of_sentences,
-                       target_solvency_ratio, conclusion_wording):
 
-    """Function to create HTML report for SCR analysis.
+# Totals highlighted in the results tables:
+highlighted_items = ["Basic SCR", "Total SCR", "Own Funds", "Solvency Ratio"]
+
+# Reformat the LLM results analysis into bullet points:
+def results_analysis_bullets(results_analysis_wording):
+
+    """Function to split the results analysis of the LLM into bullet points.
+
+    Args:
+        results_analysis_wording (str): The results analysis as returned by the LLM.
+    Returns:
+        list: The bullet points.
+    """
+
+    #Remove redundant characters (: and -):
+    results_analysis_wording_reformat = results_analysis_wording.replace(":", "").replace("-", "")           
+
+    # Split the text into sentences
+    sentences = re.split(r'(?<=[.!?])\s+', results_analysis_wording_reformat)
+    bullets   = []
+
+    # If key items (SCR, Own Funds and Solvency Ratio) highlighed by double **:
+    if '**' in results_analysis_wording_reformat:
+
+        # Add bullets for each highlighted term (e.g., **SCR**, **Own Funds**, **Solvency Ratio**)
+        for sentence in sentences:
+            # Check for highlighted terms and add them as separate bullets
+            if '**' in sentence:
+                # Extract term between '**' and add it as a bullet point
+                highlighted_term = re.findall(r"\*\*(.*?)\*\*", sentence)
+                if highlighted_term:
+                    bullets.append(highlighted_term[0])  # Add term as a separate bullet
+
+                # Now add the rest of the sentence as another bullet point
+                sentence = re.sub(r"\*\*(.*?)\*\*", '', sentence)  # Remove the '**' part
+                if sentence.strip():
+                    bullets.append(sentence.strip())
+
+    # Otherwise use simple bullet points (one per sentence): 
+    else:
+        print('No there are no **s')
+        bullets = [sentence.strip() for sentence in sentences]
+
+    return bullets
+
+
+# Set the LLM prompts of the SCR report:
+def report_llm_prompts(scr_table, previous_year, llm_nr_of_sentences, llm_response_mode = None):
+
+    """Function to set the LLM prompts of the SCR report (Background section and results analysis).
+
+    Args:
+        scr_table (ScrTable): The SCR table (formatted).
+        previous_year (int): The previous year.
+        llm_nr_of_sentences (int): Number of sentences to generate with LLM.
+        llm_response_mode (str): 'structured' for one prompt for all sections (JSON response) or 'sections'
+                                 for one prompt per section (defaults to the response mode in llm_settings).
+
+    Returns:
+        dict: The prompts by name ('report' in the structured mode, otherwise 'background' and 'results_analysis').
+    """
+
+    llm_response_mode = llm_response_mode or llm_settings['response_mode']
+    if llm_response_mode not in ('structured', 'sections'):
+        raise ValueError(f"Unknown LLM response mode: {llm_response_mode}")
+
+    # Results table as text (amounts without decimals):
+    with pd.option_context('display.float_format', '{:,.0f}'.format):
+        results_table = scr_table_display(scr_table).to_string()
+
+    if llm_response_mode == 'structured':
+        return {'report': set_structured_llm_prompt(llm_nr_of_sentences, previous_year, results_table)}
+
+    prompts = set_llm_prompts(llm_nr_of_sentences, previous_year, results_table)
+
+    return {'background': prompts['background'], 'results_analysis': prompts['results_analysis']}
+
+
+# Get the wording of all AI sections from one structured LLM request:
+def structured_llm_wording(prompt, llm_provider, llm_use_cache, results_analysis_wording_code, llm_sources = None,
+                           llm_cache_only = False):
+
+    """Function to get the Background wording and the results analysis bullets from one structured LLM request.
+
+    Each section of the JSON response is checked against its schema; a section which is missing or not
+    valid is replaced by the wording generated by code (all sections if no LLM provider answered in time).
+
+    Args:
+        prompt (str): The structured prompt (as set by report_llm_prompts).
+        llm_provider (str): The LLM provider to use (e.g., 'OpenAI' or 'Gemini').
+        llm_use_cache (bool): Flag indicating whether cached LLM responses can be reused.
+        results_analysis_wording_code (list): Bullets of the results analysis generated by code.
+        llm_sources (set): If given, the source of the response is added to it (see llm_response in helpers/api_calls.py).
+        llm_cache_only (bool): Flag to take the response from the LLM cache only, without asking the providers.
+
+    Returns:
+        tuple: The Background wording (str) and the results analysis bullets (list).
+    """
+
+    response_text    = llm_responses({'report': prompt}, 'Yes', provider = llm_provider, use_cache = llm_use_cache,
+                                     json_output = True, fallback = True, sources = llm_sources,
+                                     cache_only = llm_cache_only)['report']
+    if response_text is None:
+        return default_llm_response['background'], results_analysis_wording_code
+
+    sections, errors = structured_sections(response_text, structured_response_schema)
+
+    for name, section_errors in errors.items():
+        print(f"❌AI commentary for the {name} section is not valid ({'; '.join(section_errors)}), "
+              f"the wording generated by code is used instead.")
+
+    background_wording = sections.get('background', default_llm_response['background']).strip()
+
+    # One bullet with the name of each item, followed by the bullets about it:
+    if 'results_analysis' in sections:
+        results_analysis_wording = []
+        for item in sections['results_analysis']:
+            results_analysis_wording.append(item['item'].strip())
+            results_analysis_wording.extend(bullet.strip() for bullet in item['bullets'])
+    else:
+        results_analysis_wording = results_analysis_wording_code
+
+    return background_wording, results_analysis_wording
+
+
+# Results table of a report:
+def results_table(scr_table, caption):
+
+    """Function to create the results table of a report from the SCR table (the totals are highlighted).
+
+    Args:
+        scr_table (ScrTable): The SCR table (formatted).
+        caption (str): Caption of the table.
+
+    Returns:
+        Table: The results table.
+    """
+
+    # Table for display purposes
+    df_display = scr_table_display(scr_table)
+    df_display.iloc[-1, 1:] = df_display.iloc[-1, 1:].apply(lambda x: f"{x:.1%}" if isinstance(x, (int, float)) and pd.notna(x) else x)
+
+    return Table(caption = caption,
+                 columns = [str(col) for col in df_display.columns],
+                 rows    = [TableRow(cells = [str(value) for value in row], highlight = row[0] in highlighted_items)
+                            for row in df_display.itertuples(index = False)])
+
+
+def sensitivity_table(stress_results, caption):
+
+    """Function to create the table of the solvency ratio after a down and an up shock of each risk module and Own Funds.
+
+    Args:
+        stress_results (dict): Results of the stress tests (see run_stress_tests in helpers/stress.py).
+        caption (str): Caption of the table.
+
+    Returns:
+        Table: The sensitivity table (largest sensitivity first, the base solvency ratio highlighted).
+    """
+
+    base = stress_results['base']
+    rows = [TableRow(cells = ["Base", f"{base:.1%}", f"{base:.1%}", "-"], highlight = True)]
+    for sensitivity in stress_results['sensitivities']:
+        rows.append(TableRow(cells = [sensitivity['factor'], f"{sensitivity['low']:.1%}", f"{sensitivity['high']:.1%}",
+                                      f"{sensitivity['range'] * 100:.1f}pp"]))
+
+    shock = stress_results['sensitivities'][0]['shock']
+
+    return Table(caption = caption,
+                 columns = ["Solvency Ratio", f"Shock -{shock:.0%}", f"Shock +{shock:.0%}", "Range"],
+                 rows    = rows)
+
+
+# Create the structured model of the SCR report:
+def create_report_model(current_year, previous_year, scr_table,   
+                        llm_flag,  llm_provider, llm_nr_of_sentences,
+                        target_solvency_ratio, conclusion_wording, llm_use_cache = True, charts = None, llm_response_mode = None,
+                        entity_name = None, stress = None, llm_cache_only = False):
+
+    """Function to create the content of the SCR report as a structured model (rendered to HTML and Word).
 
     Args:
-        folders (dict): Dictionary containing folder paths.
-        filenames (dict): Dictionary containing file names.
         current_year (int): The current year.
         previous_year (int): The previous year.
-        scr_table (pd.DataFrame): DataFrame containing SCR data.
+        scr_table (ScrTable): The SCR table (formatted).
         llm_flag (str): Flag indicating whether to use LLM or not.
         llm_provider (str): The LLM provider to use (e.g., 'OpenAI' or 'Gemini').
         llm_nr_of_sentences (int): Number of sentences to generate with LLM.
         target_solvency_ratio (float): Target solvency ratio.
         conclusion_wording (str): Conclusion wording for the report.
+        llm_use_cache (bool): Flag indicating whether cached LLM responses can be reused.
+        charts (dict): Pie charts as png bytes with keys 'current' and 'previous' (and the tornado chart of the
+                       sensitivities with key 'tornado' if stress is given).
+        llm_response_mode (str): 'structured' for one LLM request for all sections or 'sections' for one request
+                                 per section (defaults to the response mode in llm_settings).
+        entity_name (str): Name of the entity in the report (defaults to entity_name in report_settings).
+        stress (dict): Results of the stress tests (see run_stress_tests in helpers/stress.py), shown in a
+                       sensitivity analysis section (left out if None).
+        llm_cache_only (bool): Flag to take the AI commentary from the LLM cache only, without asking the providers
+                               (the wording generated by code is used for the sections not cached).
 
     Returns:
-        str: The file path of the created HTML report.
+        Report: The content of the SCR report (with the sources of its AI commentary).
     """
 
-    # Set folders and filenames:
-    root_folder                            = folders['root']
-    output_images_folder                   = folders['output_images'] + str(current_year) + '/'
-    bscr_current_chart_filename            = str(current_year) + '_' +  filenames['bscr_current_chart'] 
-    bscr_previous_chart_filename           = str(previous_year) + '_' +  filenames['bscr_previous_chart']
-
-    # Create HTML report:
-    print(f"Creating HTML report... ")
-    
-    template_loader                        = jinja2.FileSystemLoader(searchpath="./")
-    template_env                           = jinja2.Environment(loader=template_loader)
-    layout_folder                          = folders['layout']
-    report_layout_filename                 = filenames['scr_report_layout']
-    template_file_reports                  = os.path.join(layout_folder, report_layout_filename)
-    template                               = template_env.get_template(template_file_reports)
+    entity_name = entity_name or report_settings['entity_name']
+    llm_sources = set()
 
     # Generate the wording for the movements in the report:
     current_solvency_ratio                 = retrieve_quantity_from_table(scr_table, "Solvency Ratio", current_year)
@@ -80,102 +259,303 @@ def create_html_report(folders, filenames, current_year, previous_year, scr_tabl
     bscr_movement_wording_code             = wording_bscr_movements(scr_table, 'amount', previous_year, current_year)
 
 
-    # Set LLM prompts for AI wording:
-    results_table                 = scr_table.to_string()
-    prompts                       = set_llm_prompts(llm_nr_of_sentences, previous_year, results_table)  # XX used scr table not formatted one
-    background_prompt             = prompts['background']
-    results_analysis_prompt       = prompts['results_analysis']
+    # Results analysis generated by Python code (used without AI and if the AI results analysis is not valid):
+    results_analysis_wording_code = [f"{scr_percentage_movement_wording_code}{scr_movement_wording_code}",
+                                     own_funds_movement_wording_code,
+                                     solvency_ratio_movement_wording_code,
+                                     bscr_movement_wording_code]
 
-    # Generate wording for the Background section (either with AI or llm_flag = False then with Python code only):
-    background_wording            = llm_response(background_prompt, llm_flag, provider = llm_provider)
+    # Without AI, use the default Background wording and the results analysis generated by code:
+    if llm_flag != 'Yes':
+        background_wording        = default_llm_response['background']
+        results_analysis_wording  = results_analysis_wording_code
 
-    # Generate results analysis (either with AI or llm_flag = False then with Python code only):   
-    results_analysis_wording      = llm_response(results_analysis_prompt, llm_flag, provider = llm_provider)
+    else:
+        # Set LLM prompts for AI wording (one prompt for all sections in the structured mode, otherwise one per section):
+        prompts = report_llm_prompts(scr_table, previous_year, llm_nr_of_sentences, llm_response_mode)
 
-    # Condition to use LLM response or code generated and reformat for inclusion in the table:
-    if llm_flag == 'Yes':
-        
-        results_analysis_wording_reformat = results_analysis_wording
-
-        #Remove redundant characters (: and -):
-        results_analysis_wording_reformat = results_analysis_wording_reformat.replace(":", "").replace("-", "")           
-
-        # If key items (SCR, Own Funds and Solvency Ratio) highlighed by double **:
-        if '**' in results_analysis_wording_reformat:
-            # Split the text into sentences
-            sentences = re.split(r'(?<=[.!?])\s+', results_analysis_wording_reformat)
-            results_analysis_wording = "<ul>"
-
-            # Add bullets for each highlighted term (e.g., **SCR**, **Own Funds**, **Solvency Ratio**)
-            for sentence in sentences:
-                # Check for highlighted terms and add them as separate bullets
-                if '**' in sentence:
-                    # Extract term between '**' and add it as a bullet point
-                    highlighted_term = re.findall(r"\*\*(.*?)\*\*", sentence)
-                    if highlighted_term:
-                        results_analysis_wording += f"<li>{highlighted_term[0]}</li>"  # Add term as a separate bullet
-
-                    # Now add the rest of the sentence as another bullet point
-                    sentence = re.sub(r"\*\*(.*?)\*\*", '', sentence)  # Remove the '**' part
-                    if sentence.strip():
-                        results_analysis_wording += f"<li>{sentence.strip()}</li>"
-            
-            results_analysis_wording += "</ul>"
-
-        # Otherwise use simple bullet points: 
+        if 'report' in prompts:
+            background_wording, results_analysis_wording = structured_llm_wording(prompts['report'], llm_provider, llm_use_cache,
+                                                                                  results_analysis_wording_code, llm_sources,
+                                                                                  llm_cache_only)
         else:
+            # Generate wording for the Background section and the results analysis at the same time
+            # and reformat the results analysis as bullet points (the wording generated by code is used
+            # for a section if no LLM provider answered in time):
+            llm_wordings              = llm_responses(prompts, llm_flag, provider = llm_provider, use_cache = llm_use_cache,
+                                                      fallback = True, sources = llm_sources, cache_only = llm_cache_only)
+            background_wording        = llm_wordings['background'] or default_llm_response['background']
+            if llm_wordings['results_analysis'] is None:
+                results_analysis_wording = results_analysis_wording_code
+            else:
+                results_analysis_wording = results_analysis_bullets(llm_wordings['results_analysis'])
 
-            print('No there are no **s')
+    # Generate wording for BSCR movements using Python code:
+    bscr_percentage_movement_wording_code = wording_bscr_movements(scr_table, 'percentage', previous_year, current_year)
 
-            # Split sentences more reliably by ensuring there's a space after punctuation (or no space at all)
-            sentences = re.split(r'(?<=[.!?])\s+', results_analysis_wording_reformat)  # Split by punctuation followed by space(s)
+    # Results table (the totals are highlighted):
+    summary_table = results_table(scr_table, f"Table 1 – Summary of Solvency Position {current_year} vs {previous_year} ")
+
+    # Content of the report:
+    sections = [
+
+        Section("1. Introduction", subsections = [
+            Section("1.1 Overview", [
+                Paragraph(f"This report summarises the Solvency Position of {entity_name} (the Company) for year-end {current_year} "
+                          f"with comparison to the previous year-end.\n\n{solvency_ratio_movement_wording_code} "
+                          f"Analysis of the drivers of the results is provided in Section 2.")]),
+            Section("1.2 Background", [
+                Paragraph(background_wording)]),
+            Section("1.3 Scope", [
+                Paragraph(f"The scope of this report covers the annual results of {entity_name} in terms of:"),
+                BulletList(["Solvency Capital Requirement (SCR)", "Own Funds", "Solvency Ratio"])])]),
+
+        Section("2. Results", [
+            Paragraph(f"Table 1 below summarises the solvency position of the entity for year-end {current_year}."),
+            summary_table,
+            Paragraph("The table shows that:"),
+            BulletList(results_analysis_wording),
+            Figure(charts['current'],  f"Figure 1: Composition of the Basic SCR - {current_year}",  alt = "Image 1"),
+            Figure(charts['previous'], f"Figure 2: Composition of the Basic SCR - {previous_year}", alt = "Image 2"),
+            Paragraph(f"{bscr_percentage_movement_wording_code} The increase in Life and Health risks is due to growth in business volume. "
+                      f"Most of the growth came from Health Risks due to the introduction of a new product called ProtectMe.")])]
+
+    # Sensitivity of the solvency ratio to the risk modules and Own Funds (if the stress tests were run):
+    if stress is not None:
+        sections.append(Section("3. Sensitivity analysis", [
+            Paragraph(f"Table 2 below shows the solvency ratio for year-end {current_year} after a decrease and an increase "
+                      f"of each risk module and of Own Funds, one at a time (the Basic SCR is recalculated with the "
+                      f"correlations between the risk modules)."),
+            sensitivity_table(stress, f"Table 2 – Sensitivity of the Solvency Ratio {current_year}"),
+            Paragraph(wording_sensitivities(stress)),
+            Figure(charts['tornado'], f"Figure 3: Sensitivity of the Solvency Ratio - {current_year}", alt = "Image 3"),
+            Paragraph(wording_stress_grid(stress, target_solvency_ratio))]))
+
+    sections.append(Section(f"{len(sections) + 1}. Conclusion", [
+        Paragraph(f"{target_solvency_ratio_wording_code}\n{conclusion_wording}")]))
+
+    report = Report(title = f"SCR results for year-end {current_year}", sections = sections, llm_sources = llm_sources)
+
+    return report
+
+
+# Wording on the contribution of the entities to the group results:
+def group_results_wording(consolidation, target_solvency_ratio, validation_threshold, n = 3):
+
+    """Function to generate the wording on the contribution of the entities to the group results.
+
+    Args:
+        consolidation (GroupConsolidation): The group results with the results of the entities.
+        target_solvency_ratio (float): Target solvency ratio.
+        validation_threshold (float): Threshold for the validation checks of the entity tables.
+        n (int): Number of entities named in the rankings.
 
-            results_analysis_wording = "<ul>"  # Start an unordered list
-            for sentence in sentences:
-                results_analysis_wording += f"<li>{sentence.strip()}</li>"  # Wrap each sentence in <li> tags
-            results_analysis_wording += "</ul>"  # Close the unordered list
+    Returns:
+        tuple: Bullets on the contributions of the entities (list) and the validation wording (str).
+    """
 
+    current_year = consolidation.current_year
+    entities     = np.array(consolidation.entities, dtype = object)
+
+    # Largest contributors to the group SCR:
+    contributors = ', '.join(f"{entity} (€{value:,.1f}m, {share:.1%})"
+                             for entity, value, share in consolidation.ranking('Total SCR', n = n))
+    bullets      = [f"The largest contributors to the Total SCR of the Group are {contributors}."]
+
+    # Largest increase and decrease in SCR:
+    increase = consolidation.ranking('Total SCR', 'Movement', n = 1)[0]
+    decrease = consolidation.ranking('Total SCR', 'Movement', n = 1, largest = False)[0]
+    if increase[1] > 0:
+        bullets.append(f"The largest increase in SCR since {consolidation.previous_year} is at {increase[0]} (€{increase[1]:,.1f}m).")
+    if decrease[1] < 0:
+        bullets.append(f"The largest decrease in SCR since {consolidation.previous_year} is at {decrease[0]} (€{-decrease[1]:,.1f}m).")
+
+    # Range of the Solvency Ratios and entities below the target:
+    solvency_ratios = consolidation.entity_values('Solvency Ratio', current_year)
+    lowest, highest = solvency_ratios.argmin(), solvency_ratios.argmax()
+    bullets.append(f"The Solvency Ratio of the entities ranges from {solvency_ratios[lowest]:.1%} ({entities[lowest]}) "
+                   f"to {solvency_ratios[highest]:.1%} ({entities[highest]}).")
+
+    below_target = np.flatnonzero(solvency_ratios < target_solvency_ratio)
+    below_target = below_target[np.argsort(solvency_ratios[below_target], kind = 'stable')]
+    if below_target.size:
+        bullets.append(f"{below_target.size} of the {len(entities)} entities have a Solvency Ratio below the target of "
+                       f"{target_solvency_ratio:.1%}: " + ', '.join(f"{entities[i]} ({solvency_ratios[i]:.1%})" for i in below_target) + ".")
     else:
-        results_analysis_wording = f"""
-        <ul>
-           <li>{scr_percentage_movement_wording_code}{scr_movement_wording_code}</li>
-           <li>{own_funds_movement_wording_code}</li>
-           <li>{solvency_ratio_movement_wording_code}</li>
-           <li>{bscr_movement_wording_code}</li> 
-        </ul>
-          """
+        bullets.append(f"All entities have a Solvency Ratio above the target of {target_solvency_ratio:.1%}.")
+
+    # Validation of the entity tables:
+    failures = consolidation.validation_failures(validation_threshold)
+    failed   = np.flatnonzero(failures)
+    if failed.size:
+        validation_wording = (f"The validation checks show failed tests for {failed.size} of the {len(entities)} entity tables: "
+                              + ', '.join(f"{entities[i]} ({failures[i]} failed tests)" for i in failed)
+                              + f". Further investigation is needed. The validation threshold used is {validation_threshold}.")
+    else:
+        validation_wording = (f"All validation checks passed for the {len(entities)} entity tables, which means that their "
+                              f"Solvency Positions at year-end {current_year} are internally consistent. "
+                              f"The validation threshold used is {validation_threshold}.")
 
-    # Generate wording for BSCR movements using Python code:
+    return bullets, validation_wording
+
+
+# Create the structured model of the group SCR report:
+def create_group_report_model(consolidation, target_solvency_ratio, conclusion_wording, group_name = None,
+                              validation_threshold = 0.001, charts = None):
+
+    """Function to create the content of the group SCR report (consolidated results of many entities) as a structured model.
+
+    The group results and the wording on them are generated by code from the consolidated table, and the
+    contributions of the entities from the stacked entity tables (see helpers/consolidation.py).
+
+    Args:
+        consolidation (GroupConsolidation): The group results with the results of the entities.
+        target_solvency_ratio (float): Target solvency ratio.
+        conclusion_wording (str): Conclusion wording for the report.
+        group_name (str): Name of the group in the report (defaults to group_name in report_settings).
+        validation_threshold (float): Threshold for the validation checks of the entity tables.
+        charts (dict): Pie charts as png bytes with keys 'current' and 'previous' (composition of the group Basic SCR)
+                       and 'entities' (Total SCR by entity). The figures of the charts not given are left out.
+
+    Returns:
+        Report: The content of the group SCR report.
+    """
+
+    group_name    = group_name or report_settings['group_name']
+    current_year  = consolidation.current_year
+    previous_year = consolidation.previous_year
+    scr_table     = format_scr_table(consolidation.group)
+    charts        = charts or {}
+
+    # Figure of a chart as a list of blocks (empty if the chart is not given):
+    def figure(chart, caption, alt):
+        return [Figure(charts[chart], caption, alt = alt)] if chart in charts else []
+
+    # Wording on the group results generated by Python code (as in the entity reports):
+    current_solvency_ratio                = retrieve_quantity_from_table(scr_table, "Solvency Ratio", current_year)
+    scr_percentage_movement_wording_code  = wording_percentage_movement(scr_table, "Total SCR", previous_year, current_year, "m")
+    scr_movement_wording_code             = wording_scr_movement(scr_table, previous_year, current_year, "m")
+    own_funds_movement_wording_code       = wording_percentage_movement(scr_table, "Own Funds", previous_year, current_year, "m")
+    solvency_ratio_movement_wording_code  = wording_percentage_point_movement(scr_table, "Solvency Ratio", previous_year, current_year)
+    target_solvency_ratio_wording_code    = wording_target_solvency(target_solvency_ratio, current_solvency_ratio)
+    bscr_movement_wording_code            = wording_bscr_movements(scr_table, 'amount', previous_year, current_year)
     bscr_percentage_movement_wording_code = wording_bscr_movements(scr_table, 'percentage', previous_year, current_year)
 
-    # Create a copy of df for display purposes
-    df_display = scr_table.copy()
-    df_display.iloc[-1, 1:] = df_display.iloc[-1, 1:].apply(lambda x: f"{x:.1%}" if isinstance(x, (int, float)) and pd.notna(x) else x)
+    # Wording on the contributions of the entities:
+    entity_wording, validation_wording    = group_results_wording(consolidation, target_solvency_ratio, validation_threshold)
+
+    # Entities table, from the largest to the smallest SCR, with the group total:
+    scr_shares     = consolidation.entity_shares('Total SCR', current_year)
+    scr_movements  = consolidation.entity_values('Total SCR', 'Movement')
+    own_funds      = consolidation.entity_values('Own Funds', current_year)
+    ratios         = consolidation.entity_values('Solvency Ratio', current_year)
+    order          = consolidation.ranks[consolidation.group.row('Total SCR')]
+    scr_values     = consolidation.entity_values('Total SCR', current_year)
+
+    entity_rows    = [TableRow(cells = [consolidation.entities[i], f"{scr_values[i]:.1f}", f"{scr_shares[i]:.1%}",
+                                        f"{scr_movements[i]:.1f}", f"{own_funds[i]:.1f}", f"{ratios[i]:.1%}"])
+                      for i in order]
+    entity_rows.append(TableRow(cells = ["Group", f"{scr_table.value('Total SCR', current_year):.1f}", f"{1:.1%}",
+                                         f"{scr_table.value('Total SCR', 'Movement'):.1f}",
+                                         f"{scr_table.value('Own Funds', current_year):.1f}",
+                                         f"{scr_table.value('Solvency Ratio', current_year):.1%}"], highlight = True))
+
+    entities_table = Table(caption = f"Table 2 – Contribution of the entities to the Group Solvency Position {current_year}",
+                           columns = ['€m', f"Total SCR {current_year}", "Share of Group SCR", "SCR Movement",
+                                      f"Own Funds {current_year}", f"Solvency Ratio {current_year}"],
+                           rows    = entity_rows)
+
+    # Content of the report:
+    report = Report(title = f"Group SCR results for year-end {current_year}", sections = [
+
+        Section("1. Introduction", subsections = [
+            Section("1.1 Overview", [
+                Paragraph(f"This report summarises the consolidated Solvency Position of {group_name} (the Group) for year-end "
+                          f"{current_year} with comparison to the previous year-end, based on the results of its "
+                          f"{len(consolidation.entities)} entities.\n\n{solvency_ratio_movement_wording_code} "
+                          f"Analysis of the drivers of the results is provided in Section 2 and the contribution of the entities in Section 3.")]),
+            Section("1.2 Scope", [
+                Paragraph(f"The scope of this report covers the annual results of {group_name} in terms of:"),
+                BulletList(["Solvency Capital Requirement (SCR)", "Own Funds", "Solvency Ratio"]),
+                Paragraph("The group results are the sum of the results of the entities, without diversification between the entities. "
+                          "The Solvency Ratio of the Group is the ratio of the group Own Funds and Total SCR.")])]),
+
+        Section("2. Group results", [
+            Paragraph(f"Table 1 below summarises the solvency position of the Group for year-end {current_year}."),
+            results_table(scr_table, f"Table 1 – Summary of Group Solvency Position {current_year} vs {previous_year} "),
+            Paragraph("The table shows that:"),
+            BulletList([f"{scr_percentage_movement_wording_code}{scr_movement_wording_code}",
+                        own_funds_movement_wording_code,
+                        solvency_ratio_movement_wording_code,
+                        bscr_movement_wording_code]),
+            *figure('current',  f"Figure 1: Composition of the Group Basic SCR - {current_year}",  "Image 1"),
+            *figure('previous', f"Figure 2: Composition of the Group Basic SCR - {previous_year}", "Image 2"),
+            Paragraph(bscr_percentage_movement_wording_code)]),
+
+        Section("3. Contribution of the entities", [
+            Paragraph(f"Table 2 below shows the contribution of each entity to the Group Solvency Position for year-end {current_year}."),
+            entities_table,
+            Paragraph("The table shows that:"),
+            BulletList(entity_wording),
+            *figure('entities', f"Figure 3: Total SCR by entity - {current_year}", "Image 3")]),
+
+        Section("4. Validation", [
+            Paragraph(validation_wording)]),
+
+        Section("5. Conclusion", [
+            Paragraph(f"{target_solvency_ratio_wording_code}\n{conclusion_wording}")])])
+
+    return report
 
-    # Convert images to base64 for display in the HTML report:
-    bscr_current_chart_full_path = os.path.join(root_folder, output_images_folder, bscr_current_chart_filename)
-    bscr_previous_chart_full_path = os.path.join(root_folder, output_images_folder, bscr_previous_chart_filename)
-    
-    bscr_current_chart_base64 = image_to_base64(bscr_current_chart_full_path)
-    bscr_current_chart_html_tag = f'<img src="data:image/png;base64,{bscr_current_chart_base64}" alt="Image 1" style="width: 100%; height: auto;/">'
 
-    bscr_previous_chart_base64 = image_to_base64(bscr_previous_chart_full_path)
-    bscr_previous_chart_html_tag = f'<img src="data:image/png;base64,{bscr_previous_chart_base64}" alt="Image 1" style="width: 100%; height: auto;"/>'
+# Create html report:
+def create_html_report(folders, filenames, current_year, previous_year, scr_table,   
+                       llm_flag,  llm_provider, llm_nr_of_sentences,
+                       target_solvency_ratio, conclusion_wording, llm_use_cache = True, charts = None, report = None):
+
+    """Function to create HTML report for SCR analysis.
+
+    Args:
+        folders (dict): Dictionary containing folder paths.
+        filenames (dict): Dictionary containing file names.
+        current_year (int): The current year.
+        previous_year (int): The previous year.
+        scr_table (ScrTable): The SCR table (formatted, only used if report is None).
+        llm_flag (str): Flag indicating whether to use LLM or not.
+        llm_provider (str): The LLM provider to use (e.g., 'OpenAI' or 'Gemini').
+        llm_nr_of_sentences (int): Number of sentences to generate with LLM.
+        target_solvency_ratio (float): Target solvency ratio.
+        conclusion_wording (str): Conclusion wording for the report.
+        llm_use_cache (bool): Flag indicating whether cached LLM responses can be reused.
+        charts (dict): Pie charts as png bytes with keys 'current' and 'previous' (read from the images folder if None).
+        report (Report): Content of the report as created by create_report_model (created here if None).
 
+    Returns:
+        tuple: The paths of the created reports (dict) and the HTML of the report (str).
+    """
+
+    # Create HTML report:
+    print(f"Creating HTML report... ")
+
+    # Create the content of the report if not given:
+    if report is None:
+
+        # Read the charts from the images folder if not given:
+        if charts is None:
+            output_images_folder = folders['output_images'] + str(current_year) + '/'
+            charts = {}
+            for chart, year in [('current', current_year), ('previous', previous_year)]:
+                chart_filename = str(year) + '_' + filenames[f'bscr_{chart}_chart']
+                with open(os.path.join(folders['root'], output_images_folder, chart_filename), 'rb') as chart_file:
+                    charts[chart] = chart_file.read()
+
+        report = create_report_model(current_year, previous_year, scr_table, llm_flag, llm_provider, llm_nr_of_sentences,
+                                     target_solvency_ratio, conclusion_wording, llm_use_cache, charts)
+    
     # Render html report:
-    report_html     = template.render(df = df_display,
-                                      current_year = current_year,
-                                      previous_year = previous_year,
-                                      background_wording = background_wording,  
-                                      solvency_ratio_movement_wording_code = solvency_ratio_movement_wording_code,                           
-                                      results_analysis_wording = results_analysis_wording,
-                                      bscr_percentage_movement_wording_code = bscr_percentage_movement_wording_code,
-                                      target_solvency_ratio_wording_code = target_solvency_ratio_wording_code,
-                                      conclusion_wording = conclusion_wording,
-                                      bscr_current_chart_html_tag = bscr_current_chart_html_tag,
-                                      bscr_previous_chart_html_tag = bscr_previous_chart_html_tag
-
-    )  
+    with span('render.html') as render_span:
+        report_html = render_report_html(report, folders['layout'])
+        render_span.set_attribute('bytes', len(report_html.encode('utf-8')))
 
     # Set output reports folder:
     output_reports_folder = folders['output_reports'] + str(current_year) + '/'
@@ -194,6 +574,72 @@ def create_html_report(folders, filenames, current_year, previous_year, scr_tabl
     return report_paths, report_html
 
 
+# Create html group report:
+def create_group_html_report(folders, consolidation, target_solvency_ratio, conclusion_wording, group_name = None,
+                             validation_threshold = 0.001, charts = None, report = None):
+
+    """Function to create the HTML group SCR report from the consolidated results of the entities.
+
+    Args:
+        folders (dict): Dictionary containing folder paths (with the output folders of the group).
+        consolidation (GroupConsolidation): The group results with the results of the entities.
+        target_solvency_ratio (float): Target solvency ratio.
+        conclusion_wording (str): Conclusion wording for the report.
+        group_name (str): Name of the group in the report (defaults to group_name in report_settings).
+        validation_threshold (float): Threshold for the validation checks of the entity tables.
+        charts (dict): Pie charts as png bytes with keys 'current', 'previous' and 'entities' (only used if report is None,
+                       no figures if None).
+        report (Report): Content of the report as created by create_group_report_model (created here if None).
+
+    Returns:
+        tuple: The paths of the created reports (dict) and the HTML of the report (str).
+    """
+
+    # Create HTML report:
+    print(f"Creating HTML group report... ")
+
+    current_year = consolidation.current_year
+
+    # Create the content of the report if not given:
+    if report is None:
+        report = create_group_report_model(consolidation, target_solvency_ratio, conclusion_wording, group_name,
+                                           validation_threshold, charts)
+
+    # Render html report (same layout as the entity reports):
+    with span('render.html', group = True) as render_span:
+        report_html = render_report_html(report, folders['layout'])
+        render_span.set_attribute('bytes', len(report_html.encode('utf-8')))
+
+    # Export HTML output file in the output reports folder of the group:
+    output_reports_folder = folders['output_reports'] + str(current_year) + '/'
+    html_path             = f'./{output_reports_folder}scr_report_{current_year}.html'
+
+    with open(html_path, 'w', encoding="utf-8") as html_file:
+        html_file.write(report_html)
+
+        print(f"✅HTML group SCR report saved at: {html_path}")
+
+    return {'html': html_path}, report_html
+
+
+def render_report_html(report, layout_folder = None):
+
+    """Function to render the SCR report as HTML (without saving it).
+
+    Args:
+        report (Report): Content of the report as created by create_report_model.
+        layout_folder (str): Folder of the layouts (defaults to the layout folder of the catalog).
+
+    Returns:
+        str: The HTML of the report.
+    """
+
+    # Layout template (compiled once per process):
+    template = get_template(filenames['scr_report_layout'], layout_folder)
+
+    return template.render(report = report)
+
+
 def html2pdf(html_path, pdf_path):
     
     """
@@ -205,25 +651,12 @@ def html2pdf(html_path, pdf_path):
     Returns:
         None
     """
-    
-    options = {
-        'page-size': 'A4',
-        'margin-top': '0.35in',
-        'margin-right': '0.75in',
-        'margin-bottom': '0.75in',
-        'margin-left': '0.75in',
-        'encoding': "UTF-8",
-        'no-outline': None,
-        'enable-local-file-access': None
-    }
 
-    # Open the HTML file with UTF-8 encoding
-    with open(html_path, 'r', encoding='utf-8') as f:
-        pdfkit.from_file(f, pdf_path, options=options)
+    render_pdf(html_path, pdf_path)
 
 
 
-def create_pdf_report(folders, report_paths, current_year):
+def create_pdf_report(folders, report_paths, current_year, pdf_service = None):
   
     """Function to create PDF report from HTML report.
     
@@ -231,6 +664,8 @@ def create_pdf_report(folders, report_paths, current_year):
         folders (dict): Dictionary containing folder paths.
         report_paths (dict): Dictionary containing report paths.
         current_year (int): The current year for the report.
+        pdf_service (PdfRenderService): If given, the conversion is run on the service (which caps the number
+                                        of wkhtmltopdf processes and serialises conversions to the same pdf).
 
     Returns:
         dict: Updated report paths including the PDF path.
@@ -249,27 +684,35 @@ def create_pdf_report(folders, report_paths, current_year):
     report_path_html = report_paths['html']
 
     # Create pdf file and confirm once ready:
-    html2pdf(report_path_html, pdf_path_report)   
-    print(f"✅PDF SCR report saved at: {pdf_path_report}.")
+    if pdf_service is not None:
+        pdf_service.wait([pdf_service.submit(report_path_html, pdf_path_report)])
+    else:
+        html2pdf(report_path_html, pdf_path_report)   
+        print(f"✅PDF SCR report saved at: {pdf_path_report}.")
 
     # Add path to pdf file to outputs:
     report_paths['pdf'] = pdf_path_report
 
     return report_paths
 
-def create_word_report(folders, report_paths, report_html, current_year):
+def create_word_report(folders, report_paths, report, current_year):
 
-    """Function to create Word report from HTML report.     
+    """Function to create Word report from the content of the report.     
 
     Args:
         folders (dict): Dictionary containing folder paths.
         report_paths (dict): Dictionary containing report paths.
-        report_html (str): HTML content of the report.
+        report (Report): Content of the report as created by create_report_model.
         current_year (int): The current year for the report.
         
     Returns:      
         dict: Updated report paths including the Word document path."""
     
+    # python-docx is imported on first use (only needed for Word reports):
+    from docx import Document
+    from docx.shared import Pt
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+
     # Set folders:
     output_reports_folder = folders['output_reports'] + str(current_year) + '/'
     
@@ -279,120 +722,122 @@ def create_word_report(folders, report_paths, report_html, current_year):
     # Set path for saving the Word document
     docx_path = f'./{output_reports_folder}scr_report {current_year}.docx'
 
-    # Parse the HTML content
-    soup = BeautifulSoup(report_html, "html.parser")
-
     # Create a new Word document
     doc = Document()
 
-    # Process all elements in order
-    for tag in soup.find_all(["h1", "h2", "h3", "p", "table", "figure", "ul"]):  # Include <ul> here
-    
-        if tag.name == "h1" and "report-title" in tag.get("class", []):  # Handling h1 with class 'report-title'
-            para = doc.add_paragraph()
-            run = para.add_run(tag.get_text())
-            run.bold = True
-            run.font.size = Pt(16)  # Font size 16 for the report title
-            para.alignment = WD_ALIGN_PARAGRAPH.CENTER  # Center-align the report title
-            para.paragraph_format.space_before = Pt(6)  # Add 6-point space before
-
-        elif tag.name == "h2":  # Specifically handling h2 headings
-            para = doc.add_paragraph()
-            run = para.add_run(tag.get_text())
-            run.bold = True
-            run.font.size = Pt(14)  # Font size 14 for h2 heading
-            para.paragraph_format.space_before = Pt(6)  # Add 6-point space before
-
-        elif tag.name.startswith("h"):  # Handle other headings (like h3, h4, etc.)
-            para = doc.add_paragraph()
-            run = para.add_run(tag.get_text())
-            run.bold = True
-            run.font.size = Pt(14) if tag.name == "h1" else Pt(12)  # Adjust font size based on the heading level
-            para.paragraph_format.space_before = Pt(6) # Add 6-point space before
-
-        elif tag.name == "p":
-            para = doc.add_paragraph()  # Create the paragraph only once
-            para.paragraph_format.space_after = Pt(0)  # Ensure no extra space after paragraphs
-
-            for part in tag.contents:
-                if isinstance(part, str):
-                    # Replace <br><br> with ONE real line break
-                    part = part.replace("\n", "")  # Removes excessive line breaks
-                    run = para.add_run(part)
+    # Report title:
+    para = doc.add_paragraph()
+    run = para.add_run(report.title)
+    run.bold = True
+    run.font.size = Pt(16)  # Font size 16 for the report title
+    para.alignment = WD_ALIGN_PARAGRAPH.CENTER  # Center-align the report title
+    para.paragraph_format.space_before = Pt(6)  # Add 6-point space before
+
+    # Sections (font size 14 for sections and subsections):
+    for section in report.sections:
+        add_word_heading(doc, section.title, Pt(14))
+        add_word_blocks(doc, section.blocks)
+
+        for subsection in section.subsections:
+            add_word_heading(doc, subsection.title, Pt(14))
+            add_word_blocks(doc, subsection.blocks)
         
-                elif part.name == "br":
-                    para.add_run().add_break(WD_BREAK.LINE)  # Adds a true line break
+    # Save as a Word document
+    with span('render.docx') as render_span:
+        doc.save(docx_path)
+        render_span.set_attribute('bytes', os.path.getsize(docx_path))
+    print(f"✅ Word SCR report saved at: {docx_path}.")    
 
+    # Add path to pdf file to outputs:
+    report_paths['docx'] = docx_path
 
-        elif tag.name == "table":  # Handle tables
-            caption_tag = tag.find("caption")
-            if caption_tag:
-                caption_para = doc.add_paragraph()
-                caption_run = caption_para.add_run(caption_tag.get_text())
-                caption_run.italic = True
-                caption_run.font.size = Pt(10)
-                caption_para.paragraph_format.space_before = Pt(6)
+    return report_paths
 
-            rows = tag.find_all("tr")
-            num_cols = len(rows[0].find_all(["th", "td"]))
-            table = doc.add_table(rows=len(rows), cols=num_cols)
-            table.style = 'Table Grid'
 
-            # Fill in the table with data
-            for row_idx, row in enumerate(rows):
-                cells = row.find_all(["th", "td"])
-                for col_idx, cell in enumerate(cells):
-                    word_cell = table.cell(row_idx, col_idx)
-                    word_cell.text = cell.get_text()
+def add_word_heading(doc, title, font_size):
 
-            format_word_table(table)   
+    """Function to add a bold heading to a Word document.
 
-        elif tag.name == "ul":  # Handling unordered list <ul>
-            for li in tag.find_all("li"):  # Find all <li> items within the <ul>
-                para = doc.add_paragraph(style='List Bullet')  # Applying 'List Bullet' style
-                para.paragraph_format.space_before = Pt(0)  # Removes unwanted spacing above list
-                para.paragraph_format.space_after = Pt(0)  # Removes unwanted spacing below list
-                para.add_run(li.get_text())  # Add the text of each list item
+    Args:
+        doc (docx.Document): The Word document.
+        title (str): The heading text.
+        font_size (docx.shared.Pt): The font size of the heading.
+    Returns:
+        None
+    """
 
+    from docx.shared import Pt
 
-        elif tag.name == "figure":  # Handle images and captions
-            img_tag = tag.find("img")
-            caption_tag = tag.find("figcaption")
+    para = doc.add_paragraph()
+    run = para.add_run(title)
+    run.bold = True
+    run.font.size = font_size
+    para.paragraph_format.space_before = Pt(6)  # Add 6-point space before
 
-            if img_tag and "src" in img_tag.attrs:
-                img_src = img_tag["src"]
 
-                if img_src.startswith("data:image"):  # Handle base64 images
-                    base64_str = img_src.split(",")[1]  # Remove "data:image/png;base64,"
-                    img_data = base64.b64decode(base64_str)
+def add_word_blocks(doc, blocks):
 
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_img:
-                        temp_img.write(img_data)
-                        temp_img_path = temp_img.name  # Get temporary file path
+    """Function to add the blocks of a report section (paragraphs, lists, tables and figures) to a Word document.
 
-                    # Insert the image and resize it
-                    doc.add_paragraph().add_run().add_picture(temp_img_path, width=Inches(3.5), height=Inches(3))  # Resize here
+    Args:
+        doc (docx.Document): The Word document.
+        blocks (list): The blocks of the section.
+    Returns:
+        None
+    """
 
-                    # Remove temp file after use
-                    os.remove(temp_img_path)
+    from docx.shared import Pt, Inches
+    from docx.enum.text import WD_BREAK
 
-            if caption_tag:
-                caption_para = doc.add_paragraph()
-                caption_run = caption_para.add_run(caption_tag.get_text())
-                caption_run.italic = True
-                caption_run.font.size = Pt(10)
+    for block in blocks:
 
-        
-    # Save as a Word document
-    doc.save(docx_path)
-    print(f"✅ Word SCR report saved at: {docx_path}.")    
+        if block.kind == "paragraph":
+            para = doc.add_paragraph()  # Create the paragraph only once
+            para.paragraph_format.space_after = Pt(0)  # Ensure no extra space after paragraphs
 
-    # Add path to pdf file to outputs:
-    report_paths['docx'] = docx_path
+            for i, line in enumerate(block.text.split("\n")):
+                if i > 0:
+                    para.add_run().add_break(WD_BREAK.LINE)  # Adds a true line break
+                para.add_run(line)
 
-    return report_paths
+        elif block.kind == "table":  # Handle tables
+            caption_para = doc.add_paragraph()
+            caption_run = caption_para.add_run(block.caption)
+            caption_run.italic = True
+            caption_run.font.size = Pt(10)
+            caption_para.paragraph_format.space_before = Pt(6)
+
+            table = doc.add_table(rows=len(block.rows) + 1, cols=len(block.columns))
+            table.style = 'Table Grid'
+
+            # Fill in the table with the header and data
+            for col_idx, column in enumerate(block.columns):
+                table.cell(0, col_idx).text = column
+            for row_idx, row in enumerate(block.rows, start=1):
+                for col_idx, cell in enumerate(row.cells):
+                    table.cell(row_idx, col_idx).text = cell
+
+            # Highlight total rows (row 0 is the header):
+            format_word_table(table, [row_idx for row_idx, row in enumerate(block.rows, start=1) if row.highlight])
 
-def create_validation_report(df_check, folders, current_year, previous_year, validation_threshold):
+        elif block.kind == "bullet_list":  # Handling bullet points
+            for item in block.items:
+                para = doc.add_paragraph(style='List Bullet')  # Applying 'List Bullet' style
+                para.paragraph_format.space_before = Pt(0)  # Removes unwanted spacing above list
+                para.paragraph_format.space_after = Pt(0)  # Removes unwanted spacing below list
+                para.add_run(item)
+
+        elif block.kind == "figure":  # Handle images (from memory) and captions
+            doc.add_paragraph().add_run().add_picture(io.BytesIO(block.image), width=Inches(3.5), height=Inches(3))  # Resize here
+
+            caption_para = doc.add_paragraph()
+            caption_run = caption_para.add_run(block.caption)
+            caption_run.italic = True
+            caption_run.font.size = Pt(10)
+
+
+def create_validation_report(df_check, folders, current_year, previous_year, validation_threshold, pdf_service = None,
+                             entity_name = None):
 
     """Function to create validation report for SCR analysis.
 
@@ -402,58 +847,62 @@ def create_validation_report(df_check, folders, current_year, previous_year, val
         current_year (int): The current year.
         previous_year (int): The previous year.
         validation_threshold (float): Threshold for validation checks.
+        pdf_service (PdfRenderService): If given, the conversion to pdf is run on the service (which caps the number
+                                        of wkhtmltopdf processes and serialises conversions to the same pdf).
+        entity_name (str): Name of the entity in the report (defaults to entity_name in report_settings).
 
     Returns:
-        tuple: Paths to the HTML and PDF validation reports.
+        tuple: Paths to the HTML and PDF validation reports and the HTML validation report.
     """
+
+    entity_name = entity_name or report_settings['entity_name']
         
     # Set folders:
     output_reports_folder = folders['output_reports'] + str(current_year) + '/'
     layout_folder = folders['layout']
     
-    # Apply the counting function to each cell in the DataFrame
-    results = df_check.applymap(lambda val: count_pass_fail(val, validation_threshold))
+    # Differences of the checked cells (the cells which are not checked are empty strings):
+    labels      = df_check['€m'].astype(str).to_numpy()
+    differences = df_check.iloc[:, 1:].apply(pd.to_numeric, errors = 'coerce').to_numpy(dtype = float)
 
-    # Count the number of passes and fails
-    pass_count = (results == 'pass').sum().sum()
-    fail_count = (results == 'fail').sum().sum()
+    # Pass/fail masks and counts:
+    passed, failed = validation_status(differences, validation_threshold)
+    pass_count     = int(passed.sum())
+    fail_count     = int(failed.sum())
 
     if fail_count == 0:
-        validation_conclusion_wording = f'<b>All validation checks</b> passed which means that the Solvency Position of Smart Insurance Ltd \
+        validation_conclusion_wording = f'<b>All validation checks</b> passed which means that the Solvency Position of {entity_name} \
                                          at year-end {current_year} is internal internally consistent. The validation threshold used is {validation_threshold}.'
     else:
-        validation_conclusion_wording = f'The validation checks for the Solvency Position of Smart Insurance Ltd show <b>{fail_count} \
+        validation_conclusion_wording = f'The validation checks for the Solvency Position of {entity_name} show <b>{fail_count} \
                                           failed tests</b>. Further investigation is needed. The validation threshold used is {validation_threshold}.'
 
-    
-    # Apply formatting and styling
-    df_check_styled = (
-        df_check
-        .style
-        .applymap(lambda val: conditional_formatting(val, validation_threshold))
-        .format(format_numeric)
-        .apply(highlight_rows, axis=1)  # Apply bold styling to specific rows
-        .set_caption("Table 1 - Results of the validation checks for the Solvency Position of Smart Insurance Ltd")
-        .hide(axis='index')
-    )
-
-    # Convert the styled DataFrame to an HTML string and export:
-    html_path_validation       = f'./{output_reports_folder}validation_report_{current_year}.html'
-    df_check_html = df_check_styled.to_html(escape=False)
-
-    # Load layout template with Jinja2:
-    template_loader = jinja2.FileSystemLoader(searchpath="./")
-    template_env = jinja2.Environment(loader=template_loader)
-    validation_layout_filename = filenames['validation_report_layout_filename']
-    template_file_validation = os.path.join(layout_folder, validation_layout_filename)
-    template = template_env.get_template(template_file_validation)
+    # Display values (2 decimals) and CSS classes of the cells (pass/fail) and rows (totals in bold):
+    values       = np.where(np.isnan(differences), '', np.char.mod('%.2f', differences))
+    cell_classes = np.where(failed, 'fail', np.where(passed, 'pass', ''))
+    row_classes  = np.where(np.isin([canonical_label(label) for label in labels], highlighted_items), 'total', '')
+
+    df_check_html = html_table(columns      = [str(column) for column in df_check.columns],
+                               rows         = np.column_stack([labels, values]).tolist(),
+                               caption      = f"Table 1 - Results of the validation checks for the Solvency Position of {entity_name}",
+                               cell_classes = np.column_stack([np.full(len(labels), ''), cell_classes]).tolist(),
+                               row_classes  = row_classes.tolist())
+
+    # Path of the html validation report:
+    html_path_validation = f'./{output_reports_folder}validation_report_{current_year}.html'
+
+    # Layout template (compiled once per process):
+    template = get_template(filenames['validation_report_layout_filename'], layout_folder)
 
     # Render html validation report:
-    html_report_validation = template.render(df = df_check_html,
-                                             current_year = current_year,
-                                             previous_year = previous_year,
-                                             validation_conclusion_wording = validation_conclusion_wording
-    )
+    with span('render.validation_html', checks_passed = pass_count, checks_failed = fail_count) as render_span:
+        html_report_validation = template.render(df = df_check_html,
+                                                 current_year = current_year,
+                                                 previous_year = previous_year,
+                                                 entity_name = entity_name,
+                                                 validation_conclusion_wording = validation_conclusion_wording
+        )
+        render_span.set_attribute('bytes', len(html_report_validation.encode('utf-8')))
 
     # Save html validation report:
     with open(html_path_validation, 'w', encoding="utf-8") as html_file:
@@ -463,7 +912,10 @@ def create_validation_report(df_check, folders, current_year, previous_year, val
     pdf_path_validation = f'./{output_reports_folder}validation_report_{current_year}.pdf'  
 
     # Create pdf validation report and confirm once ready:
-    html2pdf(html_path_validation, pdf_path_validation)   
-    print(f"✅PDF Validation report saved at: {pdf_path_validation}.")
+    if pdf_service is not None:
+        pdf_service.wait([pdf_service.submit(html_path_validation, pdf_path_validation)])
+    else:
+        html2pdf(html_path_validation, pdf_path_validation)   
+        print(f"✅PDF Validation report saved at: {pdf_path_validation}.")
 
-    return html_path_validation, pdf_path_validation
\ No newline at end of file
+    return html_path_validation, pdf_path_validation, html_report_validation
\ No newline at end of file
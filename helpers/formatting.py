@@ -1,53 +1,64 @@
-import pandas as pd
 import re
-import docx
-from docx.enum.table import WD_TABLE_ALIGNMENT 
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from docx.oxml import OxmlElement
-from docx.oxml.ns import qn
-from docx.shared import RGBColor
+import html
+
+# Import helpers:
+from helpers.scr_table import CURRENT, MOVEMENT, MOVEMENT_PCT
 
 # Functions:
 #
 #   In html (and same applied in pdf):
 #
 #   format_scr_table
+#   scr_table_display
 #   replace_bold
 #   create_bullet_points
-#   conditinal_formatting
-#   format_numeric
-#   highlight_rows
+#   html_table
 # 
 #   In Word (with docx)   
 
 
-def format_scr_table(df, previous_year, current_year):
+def format_scr_table(scr_table, previous_year = None, current_year = None):
 
-    """Function to format the SCR report table for better display.
+    """Function to round the SCR table for display (a new table is returned, the input table is unchanged).
 
     Args:
-        df (pd.DataFrame): DataFrame containing the SCR report data.
-        previous_year (int): Previous year for comparison.
-        current_year (int): Current year for comparison.
+        scr_table (ScrTable): The SCR table.
+        previous_year (int): Previous year for comparison (defaults to the previous year of the table).
+        current_year (int): Current year for comparison (defaults to the current year of the table).
 
     Returns:
-        pd.DataFrame: Formatted DataFrame.          
+        ScrTable: Rounded SCR table.
     """
 
-    # Set display options for better number formatting
-
-    # Format numeric columns in pandas:
-    pd.options.display.float_format = '{:,.0f}'.format  
+    if current_year is not None and (current_year, previous_year) != (scr_table.current_year, scr_table.previous_year):
+        raise ValueError(f"SCR table is for {scr_table.current_year} vs {scr_table.previous_year}, not {current_year} vs {previous_year}.")
 
     # Round all rows in the table (except for the Movement % column) to one decimal places 
     # except for the last row (solvency ratio) which is rounded to 3 decimal places:
-    for col in ["Movement", current_year, previous_year]:
-        df.loc[df.index[-1], col] = df[col].iloc[-1].round(3)
-        df.loc[df.index[:-1], col] = df[col].iloc[:-1].round(1)
+    values = scr_table.values.copy()
+    values[:-1, CURRENT:MOVEMENT + 1] = values[:-1, CURRENT:MOVEMENT + 1].round(1)
+    values[-1,  CURRENT:MOVEMENT + 1] = values[-1,  CURRENT:MOVEMENT + 1].round(3)
 
-        # Format the 'Movement %' column as percentage with one decimal place:                  
-    df["Movement %"]   = df["Movement %"].apply(lambda x: f"{100*x:.1f}%")
+    # Round the 'Movement %' column to the percentage with one decimal place shown in the reports:
+    values[:, MOVEMENT_PCT] = values[:, MOVEMENT_PCT].round(3)
   
+    return scr_table.with_values(values)
+
+def scr_table_display(scr_table):
+
+    """Function to convert the SCR table to a DataFrame for display, with the Movement % column as percentage strings.
+
+    Args:
+        scr_table (ScrTable): The SCR table (rounded with format_scr_table).
+    Returns:
+        pd.DataFrame: The table with the columns of the input workbook.
+    """
+
+    df = scr_table.to_dataframe()
+
+    # Format the 'Movement %' column as percentage with one decimal place:
+    df["Movement %"] = [f"{100*x:.1f}%" for x in scr_table.values[:, MOVEMENT_PCT]]
+
     return df
 
 # Function to replace '**' with <strong> for bold in HTML
@@ -86,65 +97,62 @@ def create_bullet_points(text):
     html_output += "</ul>"
     return html_output 
 
-def conditional_formatting(value, threshold):
+def html_table(columns, rows, caption = '', cell_classes = None, row_classes = None):
+
+    """Function to render a table as HTML with CSS classes for the styling (instead of inline styles).
 
-    """Function to apply conditional formatting based on a threshold.   
-    
     Args:
-        value (float): Numeric value to evaluate.
-        threshold (float): Threshold for formatting.        
+        columns (list): Column headers.
+        rows (list): Rows of the table, each a list of display strings.
+        caption (str): Caption of the table.
+        cell_classes (list): CSS class of each cell ('' for none), same shape as rows.
+        row_classes (list): CSS class of each row ('' for none).
     Returns:
-        str: CSS style string for formatting.           
+        str: The table as HTML.
     """
 
-    if isinstance(value, (int, float)):
-        if value > threshold:
-            return 'background-color: red; color: white'
-        else:
-            return 'background-color: green; color: white'
-    return ''
+    lines = ['<table>']
+    if caption:
+        lines.append(f'  <caption>{html.escape(caption)}</caption>')
 
-# Define function to format numeric values to 3 decimals
-def format_numeric(value, decimals=2):
-    
-    """Function to format numeric values to a specified number of decimal places.
-    Args:
-        value (float): Numeric value to format.
-        decimals (int): Number of decimal places.   
-    Returns:
-        str: Formatted numeric value as string.
-    """
-    
-    if isinstance(value, (int, float)):
-        return f"{value:.{decimals}f}"
-    return value
+    lines.append('  <thead>')
+    lines.append('    <tr>' + ''.join(f'<th>{html.escape(str(column))}</th>' for column in columns) + '</tr>')
+    lines.append('  </thead>')
+    lines.append('  <tbody>')
 
-# Define function to apply bold styling to specific rows
-def highlight_rows(row):
-    
-    """Function to apply bold styling to specific rows in a DataFrame.
+    def class_attribute(css_class):
+        return f' class="{css_class}"' if css_class else ''
 
-    Args:
-        row (pd.Series): The row to evaluate.
-    Returns:
-        list: A list of CSS styles for each cell in the row.
-    """
+    for row_idx, row in enumerate(rows):
+        row_class = row_classes[row_idx] if row_classes is not None else ''
+        classes   = cell_classes[row_idx] if cell_classes is not None else [''] * len(row)
+        cells     = ''.join(f'<td{class_attribute(cell_class)}>{html.escape(str(cell))}</td>' for cell, cell_class in zip(row, classes))
+        lines.append(f'    <tr{class_attribute(row_class)}>{cells}</tr>')
+
+    lines.append('  </tbody>')
+    lines.append('</table>')
 
-    if row.name in [5, 8, 9, 10]:  # Row indices 6 and 9-11
-        return ['font-weight: bold'] * len(row)
-    return [''] * len(row)
+    return '\n'.join(lines)
 
 
-def format_word_table(table):
+def format_word_table(table, target_rows = None):
 
     """Function to format a Word table using python-docx.   
     
     Args:
         table (docx.table.Table): The Word table to format.
+        target_rows (list): Indices of the rows to highlight (row 0 is the header), defaults to the totals of the SCR table.
     Returns:
         None
     """
 
+    # python-docx is imported on first use (only needed for Word reports):
+    from docx.enum.table import WD_TABLE_ALIGNMENT
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+    from docx.shared import RGBColor
+
     # Function to set background color of a cell
     def set_cell_background(cell, hex_color):
         
@@ -179,7 +187,8 @@ def format_word_table(table):
                 run.font.color.rgb = RGBColor(255, 255, 255)  # White font color
 
     # Apply light fill color to specific rows (0-based index: row 7 and rows 10-12)
-    target_rows = [6, 9, 10, 11]
+    if target_rows is None:
+        target_rows = [6, 9, 10, 11]
     light_fill_color = "D9E1F2"  # Light blue color (you can change this)
 
     for row_idx in target_rows:
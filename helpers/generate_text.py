@@ -1,9 +1,12 @@
+# Import helpers:
+from helpers.scr_table import MOVEMENT
+
 # Function to retrieve the quantity for an item from the table:
-def retrieve_quantity_from_table(df, item, year):
+def retrieve_quantity_from_table(scr_table, item, year):
 
     """Function to retrieve the quantity for a specific item from the SCR table.
     Args:
-        df (pd.DataFrame): DataFrame containing the SCR report data.            
+        scr_table (ScrTable): The SCR table.
         item (str): The item to retrieve the quantity for.
         year (int): The year column to retrieve the quantity from.
 
@@ -11,18 +14,18 @@ def retrieve_quantity_from_table(df, item, year):
         float: The quantity for the specified item and year.
     """
     
-    # Retrieve the quantity for the item from the table:
-    quantity = df.loc[df['€m'] == item, year].values[0]
+    # Retrieve the quantity for the item from the table (row found with the index of the table):
+    quantity = scr_table.value(item, year)
 
     return quantity
 
 # Function to generate the wording for the movements in the report::
-def wording_scr_movement(df, previous_year, current_year, unit):
+def wording_scr_movement(scr_table, previous_year, current_year, unit):
 
     """Function to generate wording for the movements in the Total SCR.
     
     Args:
-        df (pd.DataFrame): DataFrame containing the SCR report data.            
+        scr_table (ScrTable): The SCR table.
         previous_year (int): Previous year for comparison.
         current_year (int): Current year for comparison.
         unit (str): Unit to append to the quantities (e.g., 'm' for million).
@@ -31,8 +34,8 @@ def wording_scr_movement(df, previous_year, current_year, unit):
     """
     
     # Calculate current and previous quantities and movement based on period:
-    quantity_previous  = retrieve_quantity_from_table(df, 'Total SCR', previous_year)
-    quantity_current   = retrieve_quantity_from_table(df, 'Total SCR', current_year)  
+    quantity_previous  = retrieve_quantity_from_table(scr_table, 'Total SCR', previous_year)
+    quantity_current   = retrieve_quantity_from_table(scr_table, 'Total SCR', current_year)  
     quantity_movement  = quantity_current - quantity_previous
 
     # Round quantities:  
@@ -42,15 +45,14 @@ def wording_scr_movement(df, previous_year, current_year, unit):
 
     # Calculate the SCR components with the largest and smallest movement:
     scr_components = ['Market Risk', 'Counterparty Default Risk', 'Life Risk', 'Health Risk', 'Diversification Benefit', 'Operational Risk', 'Deferred Tax Adjustment']
-    max_movement = df.loc[df['€m'].isin(scr_components), 'Movement'].max()
-    min_movement = -df.loc[df['€m'].isin(scr_components), 'Movement'].min()
+    component_rows = scr_table.rows(scr_components)
+    movements      = scr_table.values[component_rows, MOVEMENT]
+    max_movement   = movements.max()
+    min_movement   = -movements.min()
     
     # Retrieve the component with the largest and smallest movement:
-    filtered_df = df[df['€m'].isin(scr_components)]
-    max_movement_index = filtered_df['Movement'].idxmax()
-    min_movement_index = filtered_df['Movement'].idxmin()
-    component_with_max_movement = df.at[max_movement_index, '€m']
-    component_with_min_movement = df.at[min_movement_index, '€m']
+    component_with_max_movement = scr_table.labels[component_rows[movements.argmax()]]
+    component_with_min_movement = scr_table.labels[component_rows[movements.argmin()]]
 
     if quantity_movement == 0:
         return f"The Total SCR is unchanged since the previous year at {quantity_previous}{unit}."
@@ -62,12 +64,12 @@ def wording_scr_movement(df, previous_year, current_year, unit):
         return f"Invalid data in SCR table."
 
 # Function to generate the wording for the movements in the report::
-def wording_percentage_movement(df, item, previous_year, current_year, unit):
+def wording_percentage_movement(scr_table, item, previous_year, current_year, unit):
     
     """Function to generate wording for the percentage movements of a specific item.
     
     Args:
-        df (pd.DataFrame): DataFrame containing the SCR report data.    
+        scr_table (ScrTable): The SCR table.
         item (str): The item to generate wording for.
         previous_year (int): Previous year for comparison.  
         current_year (int): Current year for comparison.
@@ -77,8 +79,8 @@ def wording_percentage_movement(df, item, previous_year, current_year, unit):
     """
 
     # Retrieve the quantities for the item from the table:
-    quantity_previous = round(retrieve_quantity_from_table(df, item, previous_year), 1)
-    quanitity_current = round(retrieve_quantity_from_table(df, item, current_year), 1)
+    quantity_previous = round(retrieve_quantity_from_table(scr_table, item, previous_year), 1)
+    quanitity_current = round(retrieve_quantity_from_table(scr_table, item, current_year), 1)
 
     # Calculate the percentage movement:
     if quantity_previous == 0:
@@ -96,12 +98,12 @@ def wording_percentage_movement(df, item, previous_year, current_year, unit):
         return f"Invalid data in SCR table."
 
 # Function to generate the wording for the movements in the report::
-def wording_percentage_point_movement(df, item, previous_year, current_year):
+def wording_percentage_point_movement(scr_table, item, previous_year, current_year):
 
     """Function to generate wording for the percentage point movements of a specific item.
     
     Args:
-        df (pd.DataFrame): DataFrame containing the SCR report data.    
+        scr_table (ScrTable): The SCR table.
         item (str): The item to generate wording for.
         previous_year (int): Previous year for comparison.  
         current_year (int): Current year for comparison.    
@@ -110,8 +112,8 @@ def wording_percentage_point_movement(df, item, previous_year, current_year):
     """
 
     # Retrieve the quantities for the item from the table:
-    percentage_previous = retrieve_quantity_from_table(df, item, previous_year)
-    percentage_current  = retrieve_quantity_from_table(df, item, current_year)
+    percentage_previous = retrieve_quantity_from_table(scr_table, item, previous_year)
+    percentage_current  = retrieve_quantity_from_table(scr_table, item, current_year)
 
     # Calculate the percentage movement:
     movement_percentage_point = round(percentage_current - percentage_previous, 3)
@@ -157,12 +159,12 @@ def wording_target_solvency(target_solvency_ratio, solvency_ratio_current):
     
 
 # Generate wording for BSCR movements using Python code:
-def wording_bscr_movements(df, quantity, previous_year, current_year):
+def wording_bscr_movements(scr_table, quantity, previous_year, current_year):
 
     """Function to generate wording for the BSCR movements.
     
     Args:
-        df (pd.DataFrame): DataFrame containing the SCR report data.    
+        scr_table (ScrTable): The SCR table.
         quantity (str): 'amount' or 'percentage'.   
         previous_year (int): Previous year for comparison.
         current_year (int): Current year for comparison.    
@@ -171,35 +173,21 @@ def wording_bscr_movements(df, quantity, previous_year, current_year):
     """
 
     # Select only the first 4 rows to include the BSCR modules:
-    df_bscr = df.head(4)
-
-    # Compute the percentage contribution of each value to the total
-    df_bscr_percentage = df_bscr.copy()  # Copy to keep the same structure
-    df_bscr_percentage[current_year] = df_bscr[current_year] / df_bscr[current_year].sum()
-    df_bscr_percentage[previous_year] = df_bscr[previous_year] / df_bscr[previous_year].sum()
+    bscr_modules = scr_table.head(4)
+    current      = bscr_modules.column(current_year)
+    previous     = bscr_modules.column(previous_year)
 
     if quantity == 'amount':
-        df_bscr_analysed = df_bscr
         description = ''
     else:
-        df_bscr_analysed = df_bscr_percentage
+        # Compute the percentage contribution of each value to the total
+        current     = current / current.sum()
+        previous    = previous / previous.sum()
         description = 'proportion of '
 
-    # Initialize lists to store results
-    increased = []
-    decreased = []
-
-    # Loop through each row in the subset to compare the current and previous year values
-    for _, row in df_bscr_analysed.iterrows():
-        category = row['€m']
-        current = row[current_year]
-        previous = row[previous_year]
-
-        # Compare current and previous year capital values
-        if current > previous:
-            increased.append(category)
-        elif current < previous:
-            decreased.append(category)
+    # Compare current and previous year capital values
+    increased = bscr_modules.labels[current > previous].tolist()
+    decreased = bscr_modules.labels[current < previous].tolist()
 
     # Generate the response
     if increased and not decreased:
@@ -211,3 +199,58 @@ def wording_bscr_movements(df, quantity, previous_year, current_year):
         increase_str = ", ".join(increased)
         decrease_str = ", ".join(decreased)
         return f"The {description}{increase_str} BSCR increased over the year but {description}{decrease_str} BSCR decreased."
+
+
+# Generate wording for the sensitivities of the solvency ratio:
+def wording_sensitivities(stress_results):
+
+    """Function to generate wording for the sensitivities of the solvency ratio to the risk modules and Own Funds.
+
+    Args:
+        stress_results (dict): Results of the stress tests (see run_stress_tests in helpers/stress.py).
+    Returns:
+        str: Wording describing the largest sensitivities of the solvency ratio.
+    """
+
+    sensitivities = stress_results['sensitivities']
+    shock         = round(sensitivities[0]['shock'] * 100)
+    largest       = sensitivities[0]
+    second        = sensitivities[1] if len(sensitivities) > 1 else None
+
+    wording = (f"The solvency ratio is most sensitive to {largest['factor']}: a {shock}% decrease or increase moves "
+               f"the solvency ratio from {round(stress_results['base'] * 100, 1)}% to {round(largest['low'] * 100, 1)}% "
+               f"and {round(largest['high'] * 100, 1)}% respectively.")
+    if second:
+        wording += (f" The next largest sensitivity is to {second['factor']}, with a solvency ratio between "
+                    f"{round(min(second['low'], second['high']) * 100, 1)}% and {round(max(second['low'], second['high']) * 100, 1)}%.")
+
+    return wording
+
+
+# Generate wording for the stress grid of the solvency ratio:
+def wording_stress_grid(stress_results, target_solvency_ratio):
+
+    """Function to generate wording for the solvency ratio over the stress grid (all combinations of shocks).
+
+    Args:
+        stress_results (dict): Results of the stress tests (see run_stress_tests in helpers/stress.py).
+        target_solvency_ratio (float): Target solvency ratio (as a decimal, e.g., 1.25 for 125%).
+    Returns:
+        str: Wording describing the range of the solvency ratio and the scenarios below the target and 100%.
+    """
+
+    grid = stress_results['grid']
+
+    wording = (f"Over {grid['scenarios']:,} scenarios combining shocks between {round(grid['min_shock'] * 100)}% and "
+               f"{round(grid['max_shock'] * 100)}% to each risk module and to Own Funds, the solvency ratio ranges from "
+               f"{round(grid['min'] * 100, 1)}% to {round(grid['max'] * 100, 1)}% "
+               f"(5th percentile {round(grid['p5'] * 100, 1)}%). "
+               f"It is below the target of {round(target_solvency_ratio * 100, 1)}% in {round(grid['below_target'] * 100, 1)}% "
+               f"of the scenarios")
+
+    if grid['below_100']:
+        wording += f" and below 100% in {round(grid['below_100'] * 100, 1)}% of the scenarios."
+    else:
+        wording += " and above 100% in all scenarios."
+
+    return wording
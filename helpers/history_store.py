@@ -0,0 +1,342 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+import numpy as np
+
+# Import catalog and helpers:
+from catalog.catalog import folders, filenames
+from helpers.scr_table import ScrTable, CURRENT, PREVIOUS
+from helpers.ingestion import read_scr_table
+from helpers.validation import canonical_label
+from helpers.tracing import span
+
+# Functions:
+#
+#   ScrHistory (class)
+#   HistoryStore (class)
+#   get_history_store
+#
+# Local history of the SCR results: every line item of every entity and year in one SQLite database (in the
+# history folder of the cache), so a window of several years can be read in one indexed query instead of
+# opening one workbook per year. The store is filled incrementally from the input tables: a workbook is only
+# loaded (through its snapshot, see ingestion.py) if it is new or changed since the last sync, and the values
+# of a removed workbook are dropped.
+#
+# Each workbook holds two years. A year is taken from the workbook of that year, and from the previous year
+# column of the workbook of the next year only if there is no workbook of its own. The values are kept in a
+# table clustered by entity, line item and year, with covering indexes by entity and year and by year and
+# entity, so the window queries of one entity and the queries of all entities for a year read the indexes only.
+# Line items are saved under their canonical names (see line_item_aliases in catalog/validation_rules.py).
+# The default entity (the tables directly in the input tables folder) is saved as the entity ''.
+
+
+_schema = """
+CREATE TABLE IF NOT EXISTS sources (
+    path        TEXT PRIMARY KEY,
+    entity      TEXT NOT NULL,
+    year        INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    loaded_at   REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS scr_values (
+    entity      TEXT NOT NULL,
+    line_item   TEXT NOT NULL,
+    year        INTEGER NOT NULL,
+    row_nr      INTEGER NOT NULL,
+    value       REAL NOT NULL,
+    source_year INTEGER NOT NULL,
+    source      TEXT NOT NULL,
+    PRIMARY KEY (entity, line_item, year)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS scr_values_by_entity_year ON scr_values (entity, year, row_nr, line_item, value);
+CREATE INDEX IF NOT EXISTS scr_values_by_year_entity ON scr_values (year, entity, row_nr, line_item, value);
+CREATE INDEX IF NOT EXISTS scr_values_by_source ON scr_values (source);
+"""
+
+# A value of a year is replaced by the value from the workbook of an earlier (or the same) year only,
+# so the workbook of the year itself wins over the previous year column of the next workbook:
+_upsert_value = """
+INSERT INTO scr_values (entity, line_item, year, row_nr, value, source_year, source) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (entity, line_item, year) DO UPDATE SET
+    row_nr = excluded.row_nr, value = excluded.value, source_year = excluded.source_year, source = excluded.source
+WHERE excluded.source_year <= scr_values.source_year
+"""
+
+# Workbook file names (scr_table_<year>YE.xlsx) with the year as group:
+_table_pattern = re.compile('^' + re.escape(filenames['scr_table']).replace(re.escape('{year}'), r'(\d{4})') + '$')
+
+
+class ScrHistory:
+
+    """Window of several years of the SCR results of an entity.
+
+    Args:
+        entity (str): The entity ('' for the default entity).
+        labels (list): Canonical names of the line items, in the order of the input tables.
+        years (list): The years, in ascending order.
+        values (np.ndarray): Values of shape (line items, years), NaN where a year has no value (read-only).
+    """
+
+    def __init__(self, entity, labels, years, values):
+        values = np.asarray(values, dtype = float)
+        values.flags.writeable = False
+
+        self.entity = entity
+        self.labels = list(labels)
+        self.years  = list(years)
+        self.values = values
+        self._rows  = {label: row for row, label in enumerate(self.labels)}
+
+    def __repr__(self):
+        span_text = f"{self.years[0]}-{self.years[-1]}" if self.years else "no years"
+        return f"ScrHistory({self.entity!r}, {span_text}, {len(self.labels)} line items)"
+
+    def series(self, item):
+
+        """Values of a line item over the years of the window (NaN for missing years)."""
+
+        return self.values[self._rows[item]]
+
+    def year(self, year):
+
+        """Values of all line items in a year."""
+
+        return self.values[:, self.years.index(year)]
+
+    def scr_table(self, current_year, previous_year = None):
+
+        """SCR table of two years of the window (with the movements), as used by the wording, chart and validation code.
+
+        Args:
+            current_year (int): The current year.
+            previous_year (int): The year compared with (defaults to the year before the current year).
+        Returns:
+            ScrTable: The SCR table.
+        Raises:
+            ValueError: If a year is not in the window or has missing values.
+        """
+
+        previous_year = current_year - 1 if previous_year is None else previous_year
+
+        for year in [current_year, previous_year]:
+            if year not in self.years:
+                raise ValueError(f"Year {year} is not in the history window {self.years} of entity {self.entity!r}.")
+
+        values = np.empty((len(self.labels), 4))
+        values[:, CURRENT]  = self.year(current_year)
+        values[:, PREVIOUS] = self.year(previous_year)
+        if np.isnan(values[:, CURRENT:PREVIOUS + 1]).any():
+            raise ValueError(f"History of entity {self.entity!r} has missing values for {current_year} or {previous_year}.")
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            values[:, 2] = values[:, CURRENT] - values[:, PREVIOUS]
+            values[:, 3] = values[:, CURRENT] / values[:, PREVIOUS] - 1
+
+        return ScrTable(self.labels, values, current_year, previous_year)
+
+
+class HistoryStore:
+
+    """SQLite store of the SCR results of all entities and years.
+
+    Args:
+        db_path (str): Path of the database file (created if it does not exist).
+    """
+
+    def __init__(self, db_path):
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok = True)
+
+        self.db_path = db_path
+        self._lock   = threading.Lock()
+
+        # One connection shared by the threads of the process (used under the lock), WAL so that
+        # batch worker processes can read while another process syncs:
+        self._connection = sqlite3.connect(db_path, timeout = 30, check_same_thread = False)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.executescript(_schema)
+            self._connection.commit()
+
+    def close(self):
+
+        """Close the database connection."""
+
+        with self._lock:
+            self._connection.close()
+
+    def _query(self, sql, params = ()):
+
+        """Run a query and return all rows."""
+
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    @staticmethod
+    def find_tables(input_folder = None):
+
+        """Find the SCR tables (scr_table_<year>YE.xlsx) in the input folder and its entity subfolders.
+
+        Args:
+            input_folder (str): The input tables folder (defaults to the input tables folder of the catalog).
+        Returns:
+            list: Tuples of the path, entity ('' for the tables of the input folder itself) and year.
+        """
+
+        input_folder = input_folder or folders['input_tables']
+        tables       = []
+
+        for folder, _, files in os.walk(input_folder):
+            entity = '' if os.path.normpath(folder) == os.path.normpath(input_folder) else os.path.basename(folder)
+            for file in sorted(files):
+                match = _table_pattern.match(file)
+                if match:
+                    tables.append((os.path.join(folder, file), entity, int(match.group(1))))
+
+        return tables
+
+    def sync(self, input_folder = None):
+
+        """Load the new and changed input tables into the store and drop the values of removed tables.
+
+        Args:
+            input_folder (str): The input tables folder (defaults to the input tables folder of the catalog).
+        Returns:
+            dict: Number of tables loaded, unchanged and removed.
+        """
+
+        with span('history.sync') as sync_span:
+
+            tables  = self.find_tables(input_folder)
+            known   = {path: (size, mtime_ns) for path, size, mtime_ns in self._query("SELECT path, size, mtime_ns FROM sources")}
+            current = {os.path.normpath(path) for path, _, _ in tables}
+
+            # Removed tables (other tables of the entity are loaded again, as they may hold a year of the removed table):
+            removed = [path for path in known if path not in current]
+            if removed:
+                with self._lock, self._connection:
+                    for path in removed:
+                        entity = self._connection.execute("SELECT entity FROM sources WHERE path = ?", (path,)).fetchone()[0]
+                        self._connection.execute("DELETE FROM scr_values WHERE source = ?", (path,))
+                        self._connection.execute("DELETE FROM sources WHERE path = ?", (path,))
+                        for (other,) in self._connection.execute("SELECT path FROM sources WHERE entity = ?", (entity,)).fetchall():
+                            known.pop(other, None)
+                for path in removed:
+                    known.pop(path, None)
+
+            # New and changed tables (by size and modification time):
+            loaded = 0
+            for path, entity, year in tables:
+                path = os.path.normpath(path)
+                stat = os.stat(path)
+                if known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+
+                self._load_table(path, entity, year, stat)
+                loaded += 1
+
+            counts = {'loaded': loaded, 'unchanged': len(tables) - loaded, 'removed': len(removed)}
+            for key, count in counts.items():
+                sync_span.set_attribute(key, count)
+
+        return counts
+
+    def _load_table(self, path, entity, year, stat):
+
+        """Save the values of an input table (current and previous year) and record its source."""
+
+        scr_table = read_scr_table(path)
+        if scr_table.current_year != year:
+            raise ValueError(f"SCR table {path} is for {scr_table.current_year}, not {year} as in its file name.")
+
+        labels = [canonical_label(label) for label in scr_table.labels]
+        rows   = [(entity, label, column_year, row_nr, float(value), year, path)
+                  for column, column_year in [(CURRENT, scr_table.current_year), (PREVIOUS, scr_table.previous_year)]
+                  for row_nr, (label, value) in enumerate(zip(labels, scr_table.values[:, column]))]
+
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM scr_values WHERE source = ?", (path,))
+            self._connection.executemany(_upsert_value, rows)
+            self._connection.execute("INSERT OR REPLACE INTO sources (path, entity, year, size, mtime_ns, loaded_at) "
+                                     "VALUES (?, ?, ?, ?, ?, ?)", (path, entity, year, stat.st_size, stat.st_mtime_ns, time.time()))
+
+    def entities(self):
+
+        """Entities in the store ('' for the default entity)."""
+
+        return [entity for (entity,) in self._query("SELECT DISTINCT entity FROM scr_values ORDER BY entity")]
+
+    def years(self, entity = None):
+
+        """Years of an entity in the store (None for the default entity)."""
+
+        return [year for (year,) in self._query("SELECT DISTINCT year FROM scr_values WHERE entity = ? ORDER BY year",
+                                                (entity or '',))]
+
+    def window(self, entity = None, end_year = None, n_years = 5):
+
+        """Read a window of years of an entity in one indexed query.
+
+        Args:
+            entity (str): The entity (None for the default entity).
+            end_year (int): Last year of the window (defaults to the last year in the store).
+            n_years (int): Number of years of the window.
+        Returns:
+            ScrHistory: The line items by year (years without values in the store are left out).
+        """
+
+        entity = entity or ''
+        if end_year is None:
+            end_year = self._query("SELECT MAX(year) FROM scr_values WHERE entity = ?", (entity,))[0][0]
+            if end_year is None:
+                return ScrHistory(entity, [], [], np.empty((0, 0)))
+
+        with span('history.window', entity = entity, end_year = end_year, n_years = n_years):
+            records = self._query("SELECT year, row_nr, line_item, value FROM scr_values INDEXED BY scr_values_by_entity_year "
+                                  "WHERE entity = ? AND year BETWEEN ? AND ?", (entity, end_year - n_years + 1, end_year))
+
+        if not records:
+            return ScrHistory(entity, [], [], np.empty((0, 0)))
+
+        record_years, row_nrs, items, record_values = zip(*records)
+
+        # Line items in the order of the input tables (first row of each item):
+        first_row = {}
+        for row_nr, item in zip(row_nrs, items):
+            first_row[item] = min(row_nr, first_row.get(item, row_nr))
+        labels = sorted(first_row, key = first_row.get)
+        years  = sorted(set(record_years))
+
+        label_index = {label: i for i, label in enumerate(labels)}
+        year_index  = {year: i for i, year in enumerate(years)}
+
+        values = np.full((len(labels), len(years)), np.nan)
+        values[[label_index[item] for item in items], [year_index[year] for year in record_years]] = record_values
+
+        return ScrHistory(entity, labels, years, values)
+
+
+# Process-wide history store:
+_history_store      = None
+_history_store_lock = threading.Lock()
+
+
+def get_history_store():
+
+    """Function to return the process-wide history store (in the history folder of the catalog).
+
+    Returns:
+        HistoryStore: The history store.
+    """
+
+    global _history_store
+
+    with _history_store_lock:
+        if _history_store is None:
+            _history_store = HistoryStore(os.path.join(folders['history'], filenames['history_store']))
+
+    return _history_store
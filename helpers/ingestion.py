@@ -0,0 +1,208 @@
+import os
+import hashlib
+import importlib.util
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+# Import catalog and helpers:
+from catalog.catalog import folders
+from helpers.tracing import span
+from helpers.scr_table import ScrTable
+
+# Functions:
+#
+#   excel_engine
+#   validate_scr_table
+#   read_scr_table
+#
+# Parsing an Excel workbook is slow compared to the rest of the pipeline, so each input table is parsed
+# only once: the validated table is saved as a compact numpy snapshot (.npz) in the table cache folder,
+# keyed by the path, size and modification time of the workbook. Later runs (and batch workers) load the
+# snapshot instead. The file name starts with a hash of the workbook path, so the snapshot of a changed
+# workbook replaces the previous one. Tables are returned as read-only ScrTable objects, so a table loaded once in a process
+# is shared instead of copied. The python-calamine Excel engine is used when installed, as it is much faster
+# than openpyxl.
+
+
+# Expected columns of an SCR table (the second and third columns are the current and previous year):
+scr_table_columns = ['€m', 'current_year', 'previous_year', 'Movement', 'Movement %']
+
+# Tables already loaded in this process by workbook path, with their snapshot key (the table of a changed
+# workbook replaces the previous one, so there is one table per workbook):
+_loaded_tables      = {}
+_loaded_tables_lock = threading.Lock()
+
+
+def excel_engine():
+
+    """Function to return the fastest Excel engine available for pandas.
+
+    Returns:
+        str: 'calamine' if python-calamine is installed, 'openpyxl' otherwise.
+    """
+
+    return 'calamine' if importlib.util.find_spec('python_calamine') is not None else 'openpyxl'
+
+
+def validate_scr_table(df, path = ''):
+
+    """Function to validate the schema of an SCR table.
+
+    Args:
+        df (pd.DataFrame): The SCR table as read from Excel.
+        path (str): Path of the workbook (used in error messages).
+    Returns:
+        None
+    Raises:
+        ValueError: If the columns or values are not as expected.
+    """
+
+    columns = list(df.columns)
+
+    if len(columns) != len(scr_table_columns):
+        raise ValueError(f"SCR table {path} has {len(columns)} columns, expected {len(scr_table_columns)}: {scr_table_columns}.")
+
+    if columns[0] != '€m' or columns[3] != 'Movement' or columns[4] != 'Movement %':
+        raise ValueError(f"SCR table {path} has columns {columns}, expected {scr_table_columns}.")
+
+    if not all(isinstance(year, (int, np.integer)) for year in columns[1:3]) or columns[1] != columns[2] + 1:
+        raise ValueError(f"SCR table {path} should have the current and previous year as second and third column, found {columns[1:3]}.")
+
+    if df.empty or df['€m'].isna().any():
+        raise ValueError(f"SCR table {path} has no rows or rows without an item name.")
+
+    values = df.iloc[:, 1:]
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in values.dtypes) or values.isna().any().any():
+        raise ValueError(f"SCR table {path} has missing or non-numeric values.")
+
+
+def _snapshot_key(path):
+
+    """Key of the snapshot of a workbook: hash of its absolute path, size and modification time."""
+
+    stat     = os.stat(path)
+    key_text = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    return hashlib.sha256(key_text.encode("utf-8")).hexdigest()
+
+
+def _snapshot_path(path, key):
+
+    """Path of the snapshot of a workbook: hash of the workbook path followed by the snapshot key."""
+
+    path_hash = hashlib.sha256(_table_path(path).encode("utf-8")).hexdigest()[:16]
+
+    return os.path.join(folders['table_cache'], f"{path_hash}_{key}.npz")
+
+
+def _remove_previous_snapshots(snapshot_path):
+
+    """Remove the other snapshots of the same workbook (saved before it was changed)."""
+
+    folder, name = os.path.split(snapshot_path)
+    prefix       = name.split('_', 1)[0] + '_'
+
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return
+
+    for other in names:
+        if other.startswith(prefix) and other.endswith('.npz') and other != name:
+            try:
+                os.remove(os.path.join(folder, other))
+            except OSError:
+                pass
+
+
+def _save_snapshot(scr_table, snapshot_path):
+
+    """Save an SCR table as a numpy snapshot (written to a temporary file first for concurrent workers)
+    and remove the previous snapshots of the same workbook."""
+
+    folder = os.path.dirname(snapshot_path)
+    os.makedirs(folder, exist_ok = True)
+
+    fd, tmp_path = tempfile.mkstemp(dir = folder, suffix = '.tmp')
+    with os.fdopen(fd, 'wb') as snapshot_file:
+        np.savez(snapshot_file,
+                 labels  = scr_table.labels.astype(str),
+                 values  = scr_table.values,
+                 columns = np.array([str(column) for column in scr_table.columns]))
+    os.replace(tmp_path, snapshot_path)
+
+    _remove_previous_snapshots(snapshot_path)
+
+
+def _table_path(path):
+
+    """Absolute path of a workbook, used to keep one loaded table per workbook."""
+
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _load_snapshot(snapshot_path):
+
+    """Load an SCR table from a numpy snapshot."""
+
+    with np.load(snapshot_path, allow_pickle = False) as snapshot:
+        labels  = snapshot['labels']
+        values  = snapshot['values']
+        columns = [str(column) for column in snapshot['columns']]
+
+    # Year columns are integers in the Excel tables:
+    return ScrTable(labels.tolist(), values, current_year = int(columns[1]), previous_year = int(columns[2]))
+
+
+def read_scr_table(path, use_snapshot = True):
+
+    """Function to read an SCR table from Excel, using the snapshot of the table if it is unchanged.
+
+    Args:
+        path (str): Path to the Excel workbook (scr_table_<year>YE.xlsx).
+        use_snapshot (bool): Set to False to always parse the workbook (the snapshot is still refreshed).
+    Returns:
+        ScrTable: The SCR table (read-only, the same table is returned to every caller in this process).
+    Raises:
+        ValueError: If the table does not have the expected columns and values.
+    """
+
+    with span('ingestion.read_scr_table', path = path) as read_span:
+
+        key           = _snapshot_key(path)
+        snapshot_path = _snapshot_path(path, key)
+
+        if use_snapshot:
+            with _loaded_tables_lock:
+                loaded_key, scr_table = _loaded_tables.get(_table_path(path), (None, None))
+            if loaded_key == key:
+                read_span.set_attribute('source', 'memory')
+                return scr_table
+
+            try:
+                scr_table = _load_snapshot(snapshot_path)
+            except (OSError, ValueError, KeyError):
+                scr_table = None
+
+            if scr_table is not None:
+                with _loaded_tables_lock:
+                    _loaded_tables[_table_path(path)] = (key, scr_table)
+                read_span.set_attribute('source', 'snapshot')
+                return scr_table
+
+        # Parse the workbook, validate and save the snapshot:
+        engine = excel_engine()
+        read_span.set_attribute('source', 'excel')
+        read_span.set_attribute('engine', engine)
+
+        df = pd.read_excel(path, usecols = "A:E", engine = engine)
+        validate_scr_table(df, path)
+        scr_table = ScrTable.from_dataframe(df)
+        _save_snapshot(scr_table, snapshot_path)
+
+        with _loaded_tables_lock:
+            _loaded_tables[_table_path(path)] = (key, scr_table)
+
+        return scr_table
@@ -0,0 +1,245 @@
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from decimal import Decimal
+
+# Import catalog:
+from catalog.catalog import folders, llm_cache_settings
+
+# Functions:
+#
+#   normalise_prompt
+#   LLMResponseCache (class)
+#   get_llm_cache
+#
+# The cache stores one JSON file per response in the llm cache folder. The file name is a hash of the
+# provider, model name and normalised prompt, so the same prompt is answered from disk on later runs.
+# Least recently used entries are evicted (last access time = file modification time) once the cache
+# holds more than the maximum number of entries or bytes, and entries older than the TTL are ignored.
+
+
+# Numbers with an exponent of this size or more are not written in canonical form:
+_max_canonical_exponent = 30
+
+# Regex for numbers in the prompt, including thousands separators (e.g. 1,234.50) and exponents:
+_number_pattern = re.compile(r"(?<![\w.])-?\d{1,3}(?:,\d{3})+(?:\.\d+)?|-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?")
+
+
+def normalise_prompt(prompt):
+
+    """Function to normalise a prompt before hashing, so cosmetic changes do not cause cache misses.
+
+    Whitespace is collapsed and numbers are written in a canonical form without losing any digit
+    (e.g. '105.000000', '105.0', '1.05e2' and '105' are the same number, '1,234.5' is '1234.5').
+    Numbers with an exponent of 30 or more (e.g. '1e400') are left as written.
+
+    Args:
+        prompt (str): The prompt to normalise.
+    Returns:
+        str: The normalised prompt.
+    """
+
+    def canonical_number(match):
+        number = Decimal(match.group(0).replace(',', ''))
+        if number == 0:
+            return '0'
+        # Numbers with a large exponent are left as written (written out in full they could be huge):
+        if abs(number.adjusted()) >= _max_canonical_exponent:
+            return match.group(0)
+        return format(number.normalize(), 'f')
+
+    prompt = _number_pattern.sub(canonical_number, prompt)
+
+    return " ".join(prompt.split())
+
+
+class LLMResponseCache:
+
+    """On-disk cache of LLM responses with TTL and size-bounded LRU eviction.
+
+    Args:
+        cache_folder (str): Folder where the responses are saved.
+        ttl_seconds (float): Time to live of a response in seconds (None for no expiry).
+        max_entries (int): Maximum number of responses kept.
+        max_bytes (int): Maximum total size of the cache folder in bytes.
+    """
+
+    def __init__(self, cache_folder, ttl_seconds = None, max_entries = 500, max_bytes = 20_000_000):
+        self.cache_folder = cache_folder
+        self.ttl_seconds  = ttl_seconds
+        self.max_entries  = max_entries
+        self.max_bytes    = max_bytes
+        self.hits         = 0
+        self.misses       = 0
+        self.evictions    = 0
+        self._lock        = threading.Lock()
+
+    @staticmethod
+    def make_key(provider, model, prompt):
+
+        """Hash of the provider, model name and normalised prompt."""
+
+        key_text = "\n".join([(provider or '').strip().lower(), model or '', normalise_prompt(prompt)])
+        return hashlib.sha256(key_text.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_folder, key + '.json')
+
+    def get(self, key):
+
+        """Return the cached response for the key or None (counted as a miss) if not cached or expired
+        (after the TTL of the cache, or the shorter TTL saved with the entry)."""
+
+        entry = self.get_entry(key)
+
+        return entry['response'] if entry is not None else None
+
+    def get_entry(self, key):
+
+        """Return the cached entry for the key (the response with the metadata saved with it) or None, as get."""
+
+        path  = self._path(key)
+        entry = self._read(path)
+        if entry is None:
+            self._count('misses')
+            return None
+
+        # Mark as recently used:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self._count('hits')
+        return entry
+
+    def contains(self, key):
+
+        """Return True if a response is cached for the key and not expired (not counted as a hit or miss
+        and not marked as recently used)."""
+
+        return self._read(self._path(key)) is not None
+
+    def set(self, key, response, **metadata):
+
+        """Save a response for the key and evict least recently used entries if the cache is too large
+        (a 'ttl_seconds' in the metadata sets a shorter TTL for this entry)."""
+
+        os.makedirs(self.cache_folder, exist_ok = True)
+        entry = dict(metadata, created = time.time(), response = response)
+
+        # Write to a temporary file first so that concurrent readers never see a partial file:
+        fd, tmp_path = tempfile.mkstemp(dir = self.cache_folder, suffix = '.tmp')
+        with os.fdopen(fd, 'w', encoding = "utf-8") as cache_file:
+            json.dump(entry, cache_file)
+        os.replace(tmp_path, self._path(key))
+
+        self._evict()
+
+    def clear(self):
+
+        """Remove all cached responses and reset the counters."""
+
+        for path in self._entries():
+            self._remove(path)
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+
+        """Return the hit/miss/eviction counters and the current size of the cache."""
+
+        paths = self._entries()
+        return {'hits':      self.hits,
+                'misses':    self.misses,
+                'evictions': self.evictions,
+                'entries':   len(paths),
+                'bytes':     sum(self._size(path) for path in paths)}
+
+    def _entries(self):
+        try:
+            return [os.path.join(self.cache_folder, name) for name in os.listdir(self.cache_folder) if name.endswith('.json')]
+        except OSError:
+            return []
+
+    def _read(self, path):
+
+        """Return the entry saved in the file or None if there is none or it has expired (the file is then removed)."""
+
+        try:
+            with open(path, 'r', encoding = "utf-8") as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+        ttl_seconds = min((ttl for ttl in [self.ttl_seconds, entry.get('ttl_seconds')] if ttl is not None), default = None)
+        if ttl_seconds is not None and time.time() - entry.get('created', 0) > ttl_seconds:
+            self._remove(path)
+            return None
+
+        return entry
+
+    def _evict(self):
+
+        """Remove least recently used entries until the cache is within its bounds."""
+
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            total_bytes  -= size
+            self._remove(path)
+            self._count('evictions')
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    @staticmethod
+    def _size(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# Process-wide cache instance:
+_llm_cache      = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+
+    """Function to return the process-wide LLM response cache (created on first use from the catalog settings).
+
+    Returns:
+        LLMResponseCache: The cache instance.
+    """
+
+    global _llm_cache
+
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache(folders['llm_cache'], **llm_cache_settings)
+
+    return _llm_cache
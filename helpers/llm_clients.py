@@ -0,0 +1,416 @@
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+
+# Import catalog:
+from catalog.catalog import api_keys, api_key_placeholders, llm_models, llm_settings, mock_llm_settings
+
+# Functions:
+#
+#   LLMUnavailableError (class)
+#   provider_settings
+#   provider_configured
+#   OpenAIClient (class)
+#   GeminiClient (class)
+#   MockRateLimitError (class)
+#   MockClient (class)
+#   get_llm_client
+#   is_transient_error
+#   backoff_delay
+#   call_with_retries
+#
+# Clients of the LLM providers, created once per process and reused by all calls: the Gemini client is
+# configured and its model built once, and the OpenAI client sends all requests through one shared HTTP
+# session, so connections to the API are kept open between calls. Each request has a deadline (timeout),
+# and requests which fail with a transient error (rate limit, timeout, connection or server error) are
+# retried with jittered exponential backoff while the latency budget of the call allows it. The failover
+# to the other provider and to the wording generated by code is done by the callers (see api_calls.py).
+# The provider packages are imported on first use (slow to import).
+#
+# The mock provider ('Mock') answers locally without network: each response is deterministic for its prompt,
+# after a latency drawn from a configurable distribution plus the time to generate the response at the
+# configured token throughput, and a configurable share of the requests fails with a transient error (see
+# mock_llm_settings in catalog/catalog.py). It is used to load test the LLM path (benchmarks/load_test.py).
+
+
+class LLMUnavailableError(RuntimeError):
+
+    """No LLM provider returned a response within the latency budget."""
+
+
+def provider_settings(provider):
+
+    """Function to return the provider name (lower case), API key and model of an LLM provider.
+
+    Args:
+        provider (str): The LLM provider (e.g. 'OpenAI' or 'Gemini').
+    Returns:
+        tuple: Provider name (lower case), API key and model.
+    Raises:
+        ValueError: If the provider is unknown.
+        RuntimeError: If the API key of the provider is not set.
+    """
+
+    prov = (provider or '').strip().lower()
+
+    if prov not in _client_classes:
+        raise ValueError(f"Unknown provider: {provider}")
+
+    api_key = api_keys.get(prov)
+    if not api_key:
+        raise RuntimeError(f"API key for {provider} not found or empty.")
+
+    return prov, api_key, llm_models[prov]
+
+
+def provider_configured(prov):
+
+    """Function to check if the API key of a provider (lower case name) is set, i.e. not empty nor a placeholder."""
+
+    api_key = (api_keys.get(prov) or '').strip()
+
+    return bool(api_key) and api_key not in api_key_placeholders
+
+
+class OpenAIClient:
+
+    """Client of the OpenAI chat completion API (openai==0.28), sending all requests through one HTTP session.
+
+    Args:
+        api_key (str): The API key.
+        model (str): The model (e.g. 'gpt-3.5-turbo').
+        max_connections (int): Maximum number of connections kept open to the API.
+    """
+
+    provider = 'openai'
+
+    def __init__(self, api_key, model, max_connections = 4):
+        import openai  # Imported on first use (slow to import)
+        import requests
+
+        self.api_key = api_key
+        self.model   = model
+        self._openai = openai
+
+        # Shared session of all requests (openai otherwise opens a new session for every thread):
+        session = requests.Session()
+        session.mount('https://', requests.adapters.HTTPAdapter(pool_connections = 1, pool_maxsize = max_connections))
+        openai.requestssession = session
+
+    def _create(self, prompt, timeout, json_output = False, stream = False):
+        json_options = {'response_format': {'type': 'json_object'}} if json_output else {}
+
+        return self._openai.ChatCompletion.create(
+            api_key = self.api_key,
+            model = self.model,
+            messages = [
+                {"role": "system", "content": "Your system message here."},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens = 1000 if json_output else 500,  # All sections in one response need more tokens
+            request_timeout = timeout,
+            stream = stream,
+            **json_options,
+        )
+
+    def complete(self, prompt, timeout, json_output = False):
+
+        """Send the prompt and return the response text (a JSON object if json_output is set)."""
+
+        response = self._create(prompt, timeout, json_output)
+
+        return response['choices'][0]['message']['content']
+
+    def stream(self, prompt, timeout):
+
+        """Send the prompt and yield the response text in pieces as it is generated."""
+
+        for chunk in self._create(prompt, timeout, stream = True):
+            piece = chunk['choices'][0]['delta'].get('content', '')
+            if piece:
+                yield piece
+
+
+class GeminiClient:
+
+    """Client of the Gemini API, configured once with its model.
+
+    Args:
+        api_key (str): The API key.
+        model (str): The model (e.g. 'models/gemini-2.5-pro').
+        max_connections (int): Not used (the Gemini library keeps its own connection to the API).
+    """
+
+    provider = 'gemini'
+
+    def __init__(self, api_key, model, max_connections = 4):
+        import google.generativeai as genai  # Imported on first use (slow to import)
+
+        self.api_key = api_key
+        self.model   = model
+
+        genai.configure(api_key = api_key)
+        self._model  = genai.GenerativeModel(model)
+
+    def complete(self, prompt, timeout, json_output = False):
+
+        """Send the prompt and return the response text (a JSON object if json_output is set)."""
+
+        generation_config = {'response_mime_type': 'application/json'} if json_output else None
+        response = self._model.generate_content(prompt, generation_config = generation_config,
+                                                request_options = {'timeout': timeout})
+
+        return response.text
+
+    def stream(self, prompt, timeout):
+
+        """Send the prompt and yield the response text in pieces as it is generated."""
+
+        for chunk in self._model.generate_content(prompt, stream = True, request_options = {'timeout': timeout}):
+            if chunk.text:
+                yield chunk.text
+
+
+class MockRateLimitError(RuntimeError):
+
+    """Transient error of the mock provider (retried like the rate limit errors of the real providers)."""
+
+
+# Latency draws of the mock provider by distribution (median in seconds and spread):
+_mock_latency_draws = {'fixed':       lambda rng, median, spread: median,
+                       'uniform':     lambda rng, median, spread: rng.uniform(max(0.0, median - spread), median + spread),
+                       'exponential': lambda rng, median, spread: rng.expovariate(math.log(2) / median) if median > 0 else 0.0,
+                       'lognormal':   lambda rng, median, spread: rng.lognormvariate(math.log(median), spread) if median > 0 else 0.0}
+
+# Canned wording of the mock provider:
+_mock_wording = {'background':       "The capital regime of insurance undertakings in the EU is set by the Solvency II Directive. "
+                                     "Undertakings report their solvency position to the supervisor quarterly and annually.",
+                 'results_analysis': [{'item': 'SCR',            'bullets': ["The SCR moved with the underlying risk modules."]},
+                                      {'item': 'Own Funds',      'bullets': ["Own Funds moved with the result of the year."]},
+                                      {'item': 'Solvency Ratio', 'bullets': ["The Solvency Ratio reflects the movements in Own Funds and SCR."]}]}
+
+
+class MockClient:
+
+    """Local stand-in for an LLM provider, without network (see mock_llm_settings).
+
+    Responses are deterministic for a prompt (a JSON object matching the structured response schema if json_output
+    is set). The latency, error rate and token throughput are read from mock_llm_settings at each request, so they
+    can be changed while the client is in use.
+
+    Args:
+        api_key (str): Not used.
+        model (str): Name of the mock model.
+        max_connections (int): Not used.
+    """
+
+    provider = 'mock'
+
+    def __init__(self, api_key, model, max_connections = 4):
+        self.api_key = api_key
+        self.model   = model
+
+        self._rng           = random.Random(mock_llm_settings['seed'])
+        self._lock          = threading.Lock()
+        self.requests       = 0
+        self.errors         = 0
+        self.in_flight      = 0
+        self.peak_in_flight = 0
+
+    def _response_text(self, prompt, json_output):
+
+        """Deterministic response to the prompt (with a digest of the prompt, so different prompts get different responses)."""
+
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        if json_output:
+            return json.dumps({'background':       f"{_mock_wording['background']} (mock {digest})",
+                               'results_analysis': _mock_wording['results_analysis']})
+
+        return ' '.join([_mock_wording['background']] +
+                        [f"**{item['item']}** {' '.join(item['bullets'])}" for item in _mock_wording['results_analysis']] +
+                        [f"(mock {digest})"])
+
+    def _draw(self):
+
+        """Draw the latency of a request and whether it fails (under the lock, so a seed gives the same draws)."""
+
+        settings = mock_llm_settings
+        with self._lock:
+            latency = _mock_latency_draws[settings['latency_distribution']](self._rng, settings['latency_median_seconds'],
+                                                                            settings['latency_spread'])
+            failed  = self._rng.random() < settings['error_rate']
+
+        return max(0.0, latency), failed
+
+    def _generate(self, prompt, timeout, json_output):
+
+        """Simulate a request: wait for the first token, fail at the error rate and yield the response in pieces
+        at the token throughput (a token is taken as 4 characters)."""
+
+        latency, failed = self._draw()
+        started         = time.monotonic()
+        deadline        = started + timeout
+
+        with self._lock:
+            self.requests      += 1
+            self.in_flight     += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        try:
+            time.sleep(min(latency, timeout))
+            if latency >= timeout:
+                raise TimeoutError(f"Mock request timed out after {timeout} seconds.")
+            if failed:
+                with self._lock:
+                    self.errors += 1
+                raise MockRateLimitError("Mock rate limit error.")
+
+            seconds_per_token = 1 / mock_llm_settings['tokens_per_second']
+            for word in self._response_text(prompt, json_output).split(' '):
+                piece = word + ' '
+                time.sleep(len(piece) / 4 * seconds_per_token)
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Mock request timed out after {timeout} seconds.")
+                yield piece
+
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def complete(self, prompt, timeout, json_output = False):
+
+        """Return the mock response text (a JSON object if json_output is set)."""
+
+        return ''.join(self._generate(prompt, timeout, json_output)).strip()
+
+    def stream(self, prompt, timeout):
+
+        """Yield the mock response text in pieces at the token throughput."""
+
+        yield from self._generate(prompt, timeout, json_output = False)
+
+    def stats(self):
+
+        """Return the number of requests, failed requests, and the current and peak number of requests in flight."""
+
+        with self._lock:
+            return {'requests':       self.requests,
+                    'errors':         self.errors,
+                    'in_flight':      self.in_flight,
+                    'peak_in_flight': self.peak_in_flight}
+
+
+# Client class of each provider:
+_client_classes = {'openai': OpenAIClient,
+                   'gemini': GeminiClient,
+                   'mock':   MockClient}
+
+# Process-wide clients by provider, API key and model:
+_clients      = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm_client(provider):
+
+    """Function to return the process-wide client of an LLM provider (created on first use).
+
+    Args:
+        provider (str): The LLM provider (e.g. 'OpenAI', 'Gemini' or 'Mock').
+    Returns:
+        OpenAIClient, GeminiClient or MockClient: The client.
+    """
+
+    prov, api_key, model = provider_settings(provider)
+    key                  = (prov, api_key, model)
+
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _client_classes[prov](api_key, model, max_connections = llm_settings['max_concurrent_calls'])
+            _clients[key] = client
+
+    return client
+
+
+# Errors worth retrying (rate limits, timeouts, connection and server errors) of openai, google-api-core and requests:
+_transient_errors = {'TimeoutError', 'ConnectionError', 'Timeout', 'RateLimitError', 'MockRateLimitError', 'APIConnectionError',
+                     'ServiceUnavailableError', 'TryAgain', 'ResourceExhausted', 'TooManyRequests',
+                     'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError', 'BadGateway', 'GatewayTimeout'}
+
+
+def is_transient_error(error):
+
+    """Function to check if a failed request is worth retrying.
+
+    Args:
+        error (Exception): The error of the request.
+    Returns:
+        bool: True for rate limits, timeouts, connection errors and server errors (5xx).
+    """
+
+    if any(cls.__name__ in _transient_errors for cls in type(error).__mro__):
+        return True
+
+    # openai APIError with a server error status:
+    status = getattr(error, 'http_status', None)
+
+    return isinstance(status, int) and status >= 500
+
+
+def backoff_delay(attempt, base_seconds = None, max_seconds = None):
+
+    """Function to return the delay before a retry: exponential backoff with full jitter.
+
+    Args:
+        attempt (int): Number of the failed attempt (0 for the first).
+        base_seconds (float): Delay cap of the first retry (defaults to llm_settings).
+        max_seconds (float): Maximum delay (defaults to llm_settings).
+    Returns:
+        float: Delay in seconds, drawn uniformly between 0 and min(max_seconds, base_seconds * 2**attempt).
+    """
+
+    base_seconds = llm_settings['backoff_base_seconds'] if base_seconds is None else base_seconds
+    max_seconds  = llm_settings['backoff_max_seconds'] if max_seconds is None else max_seconds
+
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** attempt))
+
+
+def call_with_retries(request, deadline, timeout, max_retries = None):
+
+    """Function to send a request with retries on transient errors until the deadline.
+
+    Args:
+        request (callable): Function sending the request, called with the timeout of the attempt in seconds.
+        deadline (float): Deadline of the call (time.monotonic() value).
+        timeout (float): Timeout of each attempt in seconds (shortened to the time left before the deadline).
+        max_retries (int): Maximum number of retries (defaults to llm_settings).
+    Returns:
+        The result of the request.
+    Raises:
+        TimeoutError: If the deadline passes before a successful attempt.
+        Exception: The error of the last attempt if it is not transient or no retries are left.
+    """
+
+    max_retries = llm_settings['max_retries'] if max_retries is None else max_retries
+    attempt     = 0
+
+    while True:
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            raise TimeoutError("Deadline of the LLM call passed.")
+
+        try:
+            return request(min(timeout, time_left))
+        except Exception as e:
+            if attempt >= max_retries or not is_transient_error(e):
+                raise
+
+            # Wait before the retry (give up if the wait would pass the deadline):
+            delay = backoff_delay(attempt)
+            if time.monotonic() + delay >= deadline:
+                raise
+            time.sleep(delay)
+            attempt += 1
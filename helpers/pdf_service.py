@@ -0,0 +1,196 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Import catalog and helpers:
+from catalog.catalog import pdf_settings
+from helpers.tracing import span, submit_in_context
+
+# Functions:
+#
+#   get_pdfkit_configuration
+#   render_pdf
+#   PdfRenderService (class)
+#   get_pdf_service
+#
+# wkhtmltopdf writes one pdf per run (several inputs are merged into a single pdf), so documents cannot
+# share a conversion. Instead the service converts queued documents on a small pool of worker threads,
+# each running its own wkhtmltopdf process, and the wkhtmltopdf executable is looked up only once
+# per process (pdfkit otherwise starts an extra 'which wkhtmltopdf' process for every document).
+# pdfkit is imported on first use, so processes which do not create pdfs do not load it.
+
+
+# Options for the conversion of the reports:
+pdf_options = {
+    'page-size': 'A4',
+    'margin-top': '0.35in',
+    'margin-right': '0.75in',
+    'margin-bottom': '0.75in',
+    'margin-left': '0.75in',
+    'encoding': "UTF-8",
+    'no-outline': None,
+    'enable-local-file-access': None
+}
+
+_pdfkit_configuration      = None
+_pdfkit_configuration_lock = threading.Lock()
+
+
+def get_pdfkit_configuration():
+
+    """Function to return the pdfkit configuration, looking up the wkhtmltopdf executable on first use only.
+
+    Returns:
+        pdfkit.configuration.Configuration: The pdfkit configuration.
+    """
+
+    import pdfkit  # Imported on first use (not needed if no pdf is created)
+
+    global _pdfkit_configuration
+
+    with _pdfkit_configuration_lock:
+        if _pdfkit_configuration is None:
+            _pdfkit_configuration = pdfkit.configuration(wkhtmltopdf = pdf_settings['wkhtmltopdf_path'] or '')
+
+    return _pdfkit_configuration
+
+
+def render_pdf(html_path, pdf_path, options = None):
+
+    """Function to convert an HTML file to pdf with wkhtmltopdf.
+
+    Args:
+        html_path (str): Path to the input HTML file.
+        pdf_path (str): Path to the output PDF file.
+        options (dict): wkhtmltopdf options (defaults to pdf_options).
+    Returns:
+        float: Render time in seconds.
+    """
+
+    import pdfkit
+
+    with span('render.pdf', path = pdf_path) as pdf_span:
+        start_time = time.perf_counter()
+        pdfkit.from_file(html_path, pdf_path, options = options or pdf_options, configuration = get_pdfkit_configuration())
+        render_time = time.perf_counter() - start_time
+        pdf_span.set_attribute('bytes', os.path.getsize(pdf_path))
+
+    return render_time
+
+
+class PdfRenderService:
+
+    """Service converting queued HTML documents to pdf on a pool of wkhtmltopdf workers.
+
+    Conversions to the same pdf path (e.g. the same year of two sessions or batch jobs) are run one after
+    the other, so two wkhtmltopdf processes never write the same file. Each caller waits on the future
+    returned by submit.
+
+    Args:
+        max_workers (int): Maximum number of wkhtmltopdf processes running at the same time.
+        options (dict): wkhtmltopdf options (defaults to pdf_options).
+    """
+
+    def __init__(self, max_workers = 2, options = None):
+        self.options      = options or pdf_options
+        self._pending     = {}
+        self._latest      = {}
+        self._lock        = threading.Lock()
+        self._executor    = ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = 'pdf')
+
+    def submit(self, html_path, pdf_path):
+
+        """Queue an HTML document for conversion and return its future (result: render time in seconds).
+        The conversion starts once the conversions queued before to the same pdf path are done."""
+
+        with self._lock:
+            previous = self._latest.get(pdf_path)
+            future   = submit_in_context(self._executor, self._render, html_path, pdf_path, previous)
+            self._pending[future]  = pdf_path
+            self._latest[pdf_path] = future
+
+        future.add_done_callback(lambda done: self._done(done, pdf_path))
+
+        return future
+
+    def wait(self, futures = None):
+
+        """Wait until the given (default: all queued) conversions are done.
+
+        Args:
+            futures (list): Futures of the conversions to wait for, as returned by submit.
+        Returns:
+            list: Render times in seconds, in the order of the futures.
+        Raises:
+            Exception: The first conversion error, once all documents are done.
+        """
+
+        if futures is None:
+            with self._lock:
+                futures = list(self._pending)
+
+        render_times = []
+        error        = None
+        for future in futures:
+            try:
+                render_times.append(future.result())
+            except Exception as e:
+                error = error or e
+
+        if error is not None:
+            raise error
+
+        return render_times
+
+    def shutdown(self):
+
+        """Wait for the queued documents and stop the workers."""
+
+        self._executor.shutdown(wait = True)
+
+    def _render(self, html_path, pdf_path, previous = None):
+
+        # Wait for the conversion queued before to the same pdf path (queued earlier, so it is not waiting for this one):
+        if previous is not None:
+            try:
+                previous.result()
+            except Exception:
+                pass
+
+        render_time = render_pdf(html_path, pdf_path, self.options)
+
+        print(f"✅PDF saved at: {pdf_path} (rendered in {round(render_time, 2)} seconds).")
+
+        return render_time
+
+    def _done(self, future, pdf_path):
+
+        """Forget a finished conversion (its caller holds its future)."""
+
+        with self._lock:
+            self._pending.pop(future, None)
+            if self._latest.get(pdf_path) is future:
+                del self._latest[pdf_path]
+
+
+# Process-wide service:
+_pdf_service      = None
+_pdf_service_lock = threading.Lock()
+
+
+def get_pdf_service():
+
+    """Function to return the process-wide pdf render service (created on first use from the catalog settings).
+
+    Returns:
+        PdfRenderService: The pdf render service.
+    """
+
+    global _pdf_service
+
+    with _pdf_service_lock:
+        if _pdf_service is None:
+            _pdf_service = PdfRenderService(max_workers = pdf_settings['max_workers'])
+
+    return _pdf_service
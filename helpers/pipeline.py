@@ -0,0 +1,191 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# Import helpers:
+from helpers.tracing import span, submit_in_context
+
+# Functions:
+#
+#   Stage (class)
+#   run_stages
+#
+# A report is generated as a small dependency graph of stages. Each stage is started as soon as all
+# stages it depends on are finished, so independent stages (e.g. the validation report and the pdf/Word
+# exports of the SCR report) run at the same time on a pool of threads.
+#
+# With a build manifest, a stage with output files is skipped if its inputs are unchanged since it was
+# last built (its result is then taken from the existing outputs with its reuse function) and no stage
+# with output files it depends on is run. A stage without output files is only run if a stage depending
+# on it is run. A stage can decline to be recorded after it has run (e.g. a report with provisional AI
+# commentary), it is then run again next time.
+#
+# Each stage run is traced as a span 'stage.<name>' of the active tracer (if any).
+
+
+class Stage:
+
+    """A stage of the report pipeline.
+
+    Args:
+        name (str): Unique name of the stage.
+        func (callable): Function run by the stage, called with the results of its dependencies
+                         (in the order of the dependencies).
+        dependencies (list): Names of the stages that must be finished first.
+        params (dict): Parameters of the stage (part of its key in the build manifest).
+        input_files (list): Files read by the stage (their contents are part of its key in the build manifest).
+        outputs (list): Files written by the stage.
+        reuse (callable): Function returning the result of the stage from its existing outputs
+                          (the stage is never skipped if None).
+        always_run (bool): Flag to run the stage even if its inputs are unchanged.
+        recordable (callable): Function called after the stage has run, returning False if the outputs should not
+                               be recorded in the build manifest (the stage is then run again next time).
+    """
+
+    def __init__(self, name, func, dependencies = (), params = None, input_files = (), outputs = (),
+                 reuse = None, always_run = False, recordable = None):
+        self.name         = name
+        self.func         = func
+        self.dependencies = list(dependencies)
+        self.params       = params or {}
+        self.input_files  = list(input_files)
+        self.outputs      = list(outputs)
+        self.reuse        = reuse
+        self.always_run   = always_run
+        self.recordable   = recordable
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, dependencies={self.dependencies!r})"
+
+
+def _topological_order(stages_by_name):
+
+    """Return the stages ordered so that every stage comes after its dependencies."""
+
+    order   = []
+    visited = {}
+
+    def visit(name, path):
+        if visited.get(name) == 'done':
+            return
+        if visited.get(name) == 'visiting':
+            raise ValueError(f"Circular dependencies between stages: {path + [name]}")
+
+        visited[name] = 'visiting'
+        for dependency in stages_by_name[name].dependencies:
+            if dependency not in stages_by_name:
+                raise ValueError(f"Stage {name} depends on unknown stage {dependency}.")
+            visit(dependency, path + [name])
+        visited[name] = 'done'
+        order.append(stages_by_name[name])
+
+    for name in stages_by_name:
+        visit(name, [])
+
+    return order
+
+
+def run_stages(stages, max_workers = 4, manifest = None, force = False):
+
+    """Function to run the stages of a pipeline with as much overlap as their dependencies allow.
+
+    Args:
+        stages (list): The stages to run.
+        max_workers (int): Maximum number of stages running at the same time.
+        manifest (BuildManifest): Build manifest used to skip stages with unchanged inputs (None to run all stages).
+        force (bool): Flag to run all stages even if their inputs are unchanged (the manifest is still updated).
+    Returns:
+        tuple: Results by stage name, runtime in seconds by stage name (of the stages run)
+               and names of the skipped stages.
+    Raises:
+        ValueError: If a dependency is unknown or the dependencies are circular.
+        Exception: The error of the first failed stage (stages depending on it are not run).
+    """
+
+    stages_by_name = {stage.name: stage for stage in stages}
+    order          = _topological_order(stages_by_name)
+
+    # Keys of the stages and stages which are up to date:
+    keys  = {}
+    fresh = set()
+    if manifest is not None:
+        for stage in order:
+            keys[stage.name] = manifest.stage_key(stage.name, stage.params, stage.input_files,
+                                                  [keys[d] for d in stage.dependencies])
+
+            # A stage is rebuilt if a stage with outputs it depends on is rebuilt (e.g. the pdf of a new HTML report),
+            # also if the key of that stage is unchanged:
+            if (not force and not stage.always_run and stage.outputs and stage.reuse is not None
+                    and all(d in fresh for d in stage.dependencies if stages_by_name[d].outputs)
+                    and manifest.is_fresh(stage.name, keys[stage.name], stage.outputs)):
+                fresh.add(stage.name)
+
+    # Stages to run (a stage without outputs is only needed by the stages depending on it):
+    dependents = {stage.name: [] for stage in order}
+    for stage in order:
+        for dependency in stage.dependencies:
+            dependents[dependency].append(stage.name)
+
+    to_run = set()
+    for stage in reversed(order):
+        if stage.name in fresh:
+            continue
+        if stage.outputs or not dependents[stage.name] or any(d in to_run for d in dependents[stage.name]):
+            to_run.add(stage.name)
+
+    # Results of up to date stages from their existing outputs:
+    results = {name: stages_by_name[name].reuse() for name in fresh}
+    skipped = [stage.name for stage in order if stage.name not in to_run]
+
+    timings  = {}
+    waiting  = {name: stages_by_name[name] for name in to_run}
+    running  = {}
+    error    = None
+
+    def run_stage(stage, args):
+        with span('stage.' + stage.name):
+            start_time = time.perf_counter()
+            result     = stage.func(*args)
+            return result, time.perf_counter() - start_time
+
+    try:
+        with ThreadPoolExecutor(max_workers = max_workers, thread_name_prefix = 'stage') as executor:
+
+            while waiting or running:
+
+                # Start all stages whose dependencies are finished (unless a stage failed):
+                if error is None:
+                    ready = [stage for stage in waiting.values() if all(d in results for d in stage.dependencies)]
+                    for stage in ready:
+                        del waiting[stage.name]
+                        args = [results[d] for d in stage.dependencies]
+                        running[submit_in_context(executor, run_stage, stage, args)] = stage.name
+
+                if not running:
+                    break
+
+                # Wait for the next stage to finish:
+                done, _ = wait(running, return_when = FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name], timings[name] = future.result()
+                    except Exception as e:
+                        error = error or e
+                        continue
+
+                    stage = stages_by_name[name]
+                    if manifest is not None and stage.outputs:
+                        if stage.recordable is None or stage.recordable():
+                            manifest.record(name, keys[name], stage.outputs)
+                        else:
+                            manifest.discard(name)
+
+    finally:
+        # Save the stages built so far, also if a stage failed:
+        if manifest is not None:
+            manifest.save()
+
+    if error is not None:
+        raise error
+
+    return results, timings, skipped
@@ -0,0 +1,94 @@
+from dataclasses import dataclass, field
+
+# Classes:
+#
+#   Paragraph
+#   BulletList
+#   TableRow
+#   Table
+#   Figure
+#   Section
+#   Report
+#
+# Structured model of a report. The content of a report is built once as a Report (sections with
+# paragraphs, bullet lists, tables and figures) and then rendered to HTML (with the Jinja2 layout)
+# and to Word (with python-docx) directly from the model, so both formats always have the same content.
+# Each block has a 'kind' used by the renderers to choose how to display it.
+
+
+@dataclass
+class Paragraph:
+
+    """Paragraph of text, line breaks are written as '\\n'."""
+
+    text: str
+    kind = 'paragraph'
+
+
+@dataclass
+class BulletList:
+
+    """List of bullet points."""
+
+    items: list
+    kind = 'bullet_list'
+
+
+@dataclass
+class TableRow:
+
+    """Row of a table with its cells as display strings and a flag for highlighted (total) rows."""
+
+    cells: list
+    highlight: bool = False
+
+
+@dataclass
+class Table:
+
+    """Table with a caption, column headers and rows."""
+
+    caption: str
+    columns: list
+    rows: list
+    kind = 'table'
+
+
+@dataclass
+class Figure:
+
+    """Figure with a png image (bytes) and a caption."""
+
+    image: bytes
+    caption: str
+    alt: str = ''
+    kind = 'figure'
+
+
+@dataclass
+class Section:
+
+    """Section of a report with its blocks (paragraphs, lists, tables, figures) and subsections."""
+
+    title: str
+    blocks: list = field(default_factory=list)
+    subsections: list = field(default_factory=list)
+
+
+@dataclass
+class Report:
+
+    """Report with a title and sections, and the sources of its AI commentary ('provider', 'failover' or 'fallback',
+    see llm_response in helpers/api_calls.py; empty without AI commentary)."""
+
+    title: str
+    sections: list = field(default_factory=list)
+    llm_sources: set = field(default_factory=set)
+
+    @property
+    def provisional(self):
+
+        """True if the AI commentary is (partly) from another provider than the selected one or generated by code
+        because no provider answered, so the report should be built again later."""
+
+        return bool(self.llm_sources & {'failover', 'fallback'})
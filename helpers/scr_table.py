@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+# Classes:
+#
+#   ScrTable
+#
+# Compact model of an SCR table, passed through the whole pipeline instead of a DataFrame. The line item
+# names are held in an array and the values in a (rows, 4) float array with the columns current year,
+# previous year, Movement and Movement % (as a fraction, e.g. 0.05 for 5%). The index of line item name to
+# row is built once, so looking up a quantity does not scan the table. The value array is read-only: the
+# first rows (head) share the arrays of the table, and formatting creates a new table instead of changing
+# the input, so a table loaded once can be shared by all the stages (and runs) that use it.
+
+
+# Value columns of an SCR table:
+CURRENT, PREVIOUS, MOVEMENT, MOVEMENT_PCT = range(4)
+
+
+class ScrTable:
+
+    """SCR table with its line items, values and a line item to row index.
+
+    Args:
+        labels (list): Names of the line items, in the order of the table rows.
+        values (np.ndarray): Values of shape (rows, 4): current year, previous year, Movement and Movement %.
+        current_year (int): The current year.
+        previous_year (int): The previous year.
+    """
+
+    __slots__ = ('labels', 'values', 'current_year', 'previous_year', '_rows')
+
+    def __init__(self, labels, values, current_year, previous_year, _rows = None):
+        # Copy a writeable array, so freezing the values does not make the caller's array read-only
+        # (read-only arrays, e.g. the values of another table, are shared):
+        values = np.asarray(values, dtype = float)
+        if values.flags.writeable:
+            values = values.copy()
+        if values.ndim != 2 or values.shape != (len(labels), 4):
+            raise ValueError(f"SCR table values of shape {values.shape} do not match {len(labels)} line items and 4 columns.")
+        values.flags.writeable = False
+
+        self.labels        = np.asarray(labels, dtype = object)
+        self.values        = values
+        self.current_year  = int(current_year)
+        self.previous_year = int(previous_year)
+        self._rows         = _rows if _rows is not None else {label: row for row, label in enumerate(self.labels)}
+
+    @classmethod
+    def from_dataframe(cls, df, current_year = None, previous_year = None):
+
+        """Create an SCR table from a DataFrame with the columns '€m', current year, previous year, 'Movement' and 'Movement %'.
+
+        Args:
+            df (pd.DataFrame): The SCR table (Movement % as numbers or as formatted strings, e.g. '5.0%').
+            current_year (int): The current year column (defaults to the second column).
+            previous_year (int): The previous year column (defaults to the third column).
+        Returns:
+            ScrTable: The SCR table.
+        """
+
+        current_year  = df.columns[1] if current_year is None else current_year
+        previous_year = df.columns[2] if previous_year is None else previous_year
+
+        movement_pct = df['Movement %']
+        if not pd.api.types.is_numeric_dtype(movement_pct):
+            movement_pct = movement_pct.astype(str).str.rstrip('%').astype(float) / 100
+
+        values = np.column_stack([df[current_year].to_numpy(dtype = float), df[previous_year].to_numpy(dtype = float),
+                                  df['Movement'].to_numpy(dtype = float), np.asarray(movement_pct, dtype = float)])
+
+        return cls(df['€m'].astype(str).tolist(), values, current_year, previous_year)
+
+    @property
+    def columns(self):
+
+        """Column names of the table, as in the input workbook."""
+
+        return ['€m', self.current_year, self.previous_year, 'Movement', 'Movement %']
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __repr__(self):
+        return f"ScrTable({self.current_year} vs {self.previous_year}, {len(self)} line items)"
+
+    def column_index(self, column):
+
+        """Position of a value column (a year, 'Movement' or 'Movement %') in the value array."""
+
+        if column == self.current_year:
+            return CURRENT
+        if column == self.previous_year:
+            return PREVIOUS
+        if column == 'Movement':
+            return MOVEMENT
+        if column == 'Movement %':
+            return MOVEMENT_PCT
+
+        raise KeyError(f"SCR table has no column {column!r}, expected one of {self.columns[1:]}.")
+
+    def row(self, item):
+
+        """Row of a line item."""
+
+        try:
+            return self._rows[item]
+        except KeyError:
+            raise KeyError(f"Line item {item!r} is not in the SCR table: {self.labels.tolist()}.") from None
+
+    def rows(self, items):
+
+        """Rows of the line items found in the table, in the order of the table."""
+
+        return np.array(sorted(self._rows[item] for item in items if item in self._rows), dtype = int)
+
+    def column(self, column):
+
+        """Values of a column (a view of the value array)."""
+
+        return self.values[:, self.column_index(column)]
+
+    def value(self, item, column):
+
+        """Value of a line item in a column (e.g. value('Total SCR', 2024))."""
+
+        return self.values[self.row(item), self.column_index(column)]
+
+    def head(self, n):
+
+        """The first n line items (sharing the arrays of the table)."""
+
+        return ScrTable(self.labels[:n], self.values[:n], self.current_year, self.previous_year,
+                        {label: row for label, row in self._rows.items() if row < n})
+
+    def with_values(self, values):
+
+        """A table with the same line items (and index) and new values."""
+
+        return ScrTable(self.labels, values, self.current_year, self.previous_year, self._rows)
+
+    def to_dataframe(self):
+
+        """Return the table as a DataFrame with the columns of the input workbook."""
+
+        df = pd.DataFrame(self.values, columns = self.columns[1:])
+        df.insert(0, '€m', pd.Series(self.labels, dtype = object))
+
+        return df
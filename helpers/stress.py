@@ -0,0 +1,237 @@
+import numpy as np
+
+# Import catalog and helpers:
+from catalog.catalog import stress_settings
+from helpers.validation import canonical_label
+from helpers.tracing import span
+
+# Functions:
+#
+#   StressBase (class)
+#   stress_base
+#   stress_solvency
+#   shock_grid
+#   sensitivity_analysis
+#   stress_grid_summary
+#   run_stress_tests
+#
+# Stress and sensitivity analysis of the solvency ratio. Shocks are relative changes of the risk modules
+# (Market, Counterparty Default, Life and Health Risk) and of Own Funds, given for many scenarios at once as
+# an array of shape (scenarios, modules + 1). For all scenarios in one pass, the Basic SCR is recalculated
+# from the shocked modules with the correlation matrix of the standard formula, then the Total SCR and the
+# solvency ratio:
+#
+#   - the diversification benefit follows the correlation matrix, scaled so that the unshocked scenario
+#     gives the diversification benefit of the input table (which may include other effects),
+#   - Operational Risk is unchanged and the Deferred Tax Adjustment keeps its share of Basic SCR plus
+#     Operational Risk.
+#
+# The sensitivity table shocks one factor at a time (down and up) and the stress grid all combinations of
+# shock levels (e.g. 7 levels for 5 factors give 16,807 scenarios), see stress_settings in catalog/catalog.py.
+
+
+class StressBase:
+
+    """Current year values of an SCR table used by the stress tests.
+
+    Args:
+        modules (np.ndarray): Risk modules, shape (modules,).
+        diversification (float): Diversification Benefit of the input table.
+        operational_risk (float): Operational Risk.
+        deferred_tax (float): Deferred Tax Adjustment.
+        own_funds (float): Own Funds.
+        correlations (np.ndarray): Correlations between the risk modules, shape (modules, modules).
+    """
+
+    def __init__(self, modules, diversification, operational_risk, deferred_tax, own_funds, correlations):
+        self.modules          = np.asarray(modules, dtype = float)
+        self.diversification  = float(diversification)
+        self.operational_risk = float(operational_risk)
+        self.deferred_tax     = float(deferred_tax)
+        self.own_funds        = float(own_funds)
+        self.correlations     = np.asarray(correlations, dtype = float)
+
+        # Diversification benefit of the correlation matrix in the base scenario, and the scale to the input table:
+        formula_diversification = np.sqrt(self.modules @ self.correlations @ self.modules) - self.modules.sum()
+        self.diversification_scale = self.diversification / formula_diversification if formula_diversification else 0.0
+
+        # Share of the Deferred Tax Adjustment in Basic SCR plus Operational Risk:
+        pre_tax_scr            = self.modules.sum() + self.diversification + self.operational_risk
+        self.deferred_tax_share = self.deferred_tax / pre_tax_scr if pre_tax_scr else 0.0
+
+    def __repr__(self):
+        return f"StressBase({len(self.modules)} risk modules, Own Funds {self.own_funds:.1f})"
+
+
+def stress_base(scr_table, risk_modules = None, correlations = None):
+
+    """Function to take the current year values used by the stress tests from an SCR table.
+
+    Args:
+        scr_table (ScrTable): The SCR table.
+        risk_modules (list): Risk modules shocked (defaults to stress_settings).
+        correlations (list): Correlations between the risk modules (defaults to stress_settings).
+    Returns:
+        StressBase: The base values.
+    Raises:
+        KeyError: If a line item is not in the table.
+    """
+
+    risk_modules = stress_settings['risk_modules'] if risk_modules is None else risk_modules
+    correlations = stress_settings['module_correlations'] if correlations is None else correlations
+
+    # Current year values by canonical line item name:
+    current = dict(zip((canonical_label(label) for label in scr_table.labels), scr_table.column(scr_table.current_year)))
+
+    def value(item):
+        if item not in current:
+            raise KeyError(f"Line item {item!r} is not in the SCR table: {list(current)}.")
+        return current[item]
+
+    return StressBase(modules          = [value(module) for module in risk_modules],
+                      diversification  = value('Diversification Benefit'),
+                      operational_risk = value('Operational Risk'),
+                      deferred_tax     = value('Deferred Tax Adjustment'),
+                      own_funds        = value('Own Funds'),
+                      correlations     = correlations)
+
+
+def stress_solvency(base, shocks):
+
+    """Function to recalculate the Basic SCR, Total SCR and solvency ratio for many scenarios at once.
+
+    Args:
+        base (StressBase): The base values.
+        shocks (np.ndarray): Relative shocks of shape (scenarios, modules + 1): one column per risk module,
+                             then Own Funds (e.g. 0.1 for +10%).
+    Returns:
+        dict: Arrays of shape (scenarios,) with keys 'basic_scr', 'total_scr', 'own_funds' and 'solvency_ratio'.
+    """
+
+    shocks = np.atleast_2d(np.asarray(shocks, dtype = float))
+    n_modules = len(base.modules)
+    if shocks.shape[1] != n_modules + 1:
+        raise ValueError(f"Shocks of shape {shocks.shape} do not match {n_modules} risk modules and Own Funds.")
+
+    # Shocked risk modules and Basic SCR with the correlation matrix (diversification scaled to the input table):
+    modules       = base.modules * (1 + shocks[:, :n_modules])
+    undiversified = modules.sum(axis = 1)
+    formula_bscr  = np.sqrt(np.einsum('si,ij,sj->s', modules, base.correlations, modules))
+    basic_scr     = undiversified + (formula_bscr - undiversified) * base.diversification_scale
+
+    # Total SCR (Deferred Tax Adjustment in proportion to Basic SCR plus Operational Risk) and solvency ratio:
+    pre_tax_scr = basic_scr + base.operational_risk
+    total_scr   = pre_tax_scr * (1 + base.deferred_tax_share)
+    own_funds   = base.own_funds * (1 + shocks[:, n_modules])
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        solvency_ratio = own_funds / total_scr
+
+    return {'basic_scr': basic_scr, 'total_scr': total_scr, 'own_funds': own_funds, 'solvency_ratio': solvency_ratio}
+
+
+def shock_grid(n_factors, levels = None, min_shock = None, max_shock = None):
+
+    """Function to build the grid of all combinations of shock levels of the factors.
+
+    Args:
+        n_factors (int): Number of factors (risk modules and Own Funds).
+        levels (int): Number of shock levels per factor (defaults to stress_settings).
+        min_shock (float): Lowest shock (defaults to stress_settings).
+        max_shock (float): Highest shock (defaults to stress_settings).
+    Returns:
+        np.ndarray: Shocks of shape (levels ** n_factors, n_factors).
+    """
+
+    levels    = stress_settings['grid_levels'] if levels is None else levels
+    min_shock = stress_settings['grid_min_shock'] if min_shock is None else min_shock
+    max_shock = stress_settings['grid_max_shock'] if max_shock is None else max_shock
+
+    shock_levels = np.linspace(min_shock, max_shock, levels)
+    grid         = np.meshgrid(*[shock_levels] * n_factors, indexing = 'ij')
+
+    return np.stack(grid, axis = -1).reshape(-1, n_factors)
+
+
+def sensitivity_analysis(base, factors, shock = None):
+
+    """Function to compute the solvency ratio after a down and an up shock of each factor, one factor at a time.
+
+    Args:
+        base (StressBase): The base values.
+        factors (list): Names of the factors (the risk modules, then Own Funds).
+        shock (float): Size of the shocks (defaults to sensitivity_shock in stress_settings).
+    Returns:
+        tuple: Base solvency ratio and the sensitivities as dictionaries with the factor, the solvency ratios after
+               the down and up shock and their range, ordered from the largest to the smallest range.
+    """
+
+    shock     = stress_settings['sensitivity_shock'] if shock is None else shock
+    n_factors = len(factors)
+
+    # Base scenario, then the down shock and the up shock of each factor:
+    shocks = np.vstack([np.zeros(n_factors), -shock * np.eye(n_factors), shock * np.eye(n_factors)])
+    ratios = stress_solvency(base, shocks)['solvency_ratio']
+    low    = ratios[1:n_factors + 1]
+    high   = ratios[n_factors + 1:]
+
+    ranges = np.abs(high - low)
+    order  = np.argsort(-ranges, kind = 'stable')
+
+    sensitivities = [{'factor': factors[i], 'shock': shock, 'low': float(low[i]), 'high': float(high[i]),
+                      'range': float(ranges[i])} for i in order]
+
+    return float(ratios[0]), sensitivities
+
+
+def stress_grid_summary(base, target_solvency_ratio, shocks = None):
+
+    """Function to run the stress grid and summarise the distribution of the solvency ratio.
+
+    Args:
+        base (StressBase): The base values.
+        target_solvency_ratio (float): Target solvency ratio.
+        shocks (np.ndarray): Shocks of the scenarios (defaults to the grid of stress_settings).
+    Returns:
+        dict: Number of scenarios, shock range, lowest, 5th percentile, median and highest solvency ratio,
+              share of the scenarios below the target and below 100%, and the shocks of the worst scenario.
+    """
+
+    shocks = shock_grid(len(base.modules) + 1) if shocks is None else shocks
+    ratios = stress_solvency(base, shocks)['solvency_ratio']
+    worst  = int(np.argmin(ratios))
+
+    p5, median = np.percentile(ratios, [5, 50])
+
+    return {'scenarios':       len(ratios),
+            'min_shock':       float(shocks.min()),
+            'max_shock':       float(shocks.max()),
+            'min':             float(ratios[worst]),
+            'p5':              float(p5),
+            'median':          float(median),
+            'max':             float(ratios.max()),
+            'below_target':    float(np.mean(ratios < target_solvency_ratio)),
+            'below_100':       float(np.mean(ratios < 1)),
+            'worst_shocks':    shocks[worst].tolist()}
+
+
+def run_stress_tests(scr_table, target_solvency_ratio):
+
+    """Function to run the sensitivity analysis and the stress grid of the solvency ratio of an SCR table.
+
+    Args:
+        scr_table (ScrTable): The SCR table.
+        target_solvency_ratio (float): Target solvency ratio.
+    Returns:
+        dict: Base solvency ratio ('base'), sensitivities ('sensitivities', see sensitivity_analysis) and
+              summary of the stress grid ('grid', see stress_grid_summary).
+    """
+
+    with span('stress_tests') as stress_span:
+        base                = stress_base(scr_table)
+        factors             = stress_settings['risk_modules'] + ['Own Funds']
+        base_ratio, results = sensitivity_analysis(base, factors)
+        grid                = stress_grid_summary(base, target_solvency_ratio)
+        stress_span.set_attribute('scenarios', grid['scenarios'])
+
+    return {'base': base_ratio, 'sensitivities': results, 'grid': grid}
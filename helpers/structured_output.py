@@ -0,0 +1,125 @@
+import re
+import json
+
+# Functions:
+#
+#   schema_errors
+#   parse_json_response
+#   structured_sections
+#
+# With a structured LLM request, all sections of the report are requested in one prompt as a JSON object
+# (see structured_response_schema in catalog/llm_prompts.py). The response is parsed and each section is
+# checked against its part of the schema on its own, so a missing or malformed section only falls back to
+# the wording generated by code for that section. The schema checks cover the subset of JSON schema used
+# in the catalog (type, required, properties, items, minItems and minLength).
+
+
+# Python types of the JSON schema types:
+_json_types = {'object':  dict,
+               'array':   list,
+               'string':  str,
+               'number':  (int, float),
+               'integer': int,
+               'boolean': bool}
+
+# Markdown code fence around a JSON response (e.g. ```json ... ```):
+_code_fence = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL | re.IGNORECASE)
+
+
+def schema_errors(value, schema, path = '$'):
+
+    """Function to check a value against a JSON schema.
+
+    Args:
+        value: The value (as parsed from JSON).
+        schema (dict): The JSON schema.
+        path (str): Path of the value, used in the error messages.
+    Returns:
+        list: The errors found (empty if the value matches the schema).
+    """
+
+    expected_type = schema.get('type')
+    if expected_type is not None:
+        is_bool = isinstance(value, bool) and expected_type != 'boolean'
+        if is_bool or not isinstance(value, _json_types[expected_type]):
+            return [f"{path}: expected {expected_type}, found {type(value).__name__}"]
+
+    errors = []
+
+    if isinstance(value, str) and len(value.strip()) < schema.get('minLength', 0):
+        errors.append(f"{path}: shorter than {schema['minLength']} characters")
+
+    if isinstance(value, list):
+        if len(value) < schema.get('minItems', 0):
+            errors.append(f"{path}: fewer than {schema['minItems']} items")
+        if 'items' in schema:
+            for i, item in enumerate(value):
+                errors += schema_errors(item, schema['items'], f"{path}[{i}]")
+
+    if isinstance(value, dict):
+        for key in schema.get('required', []):
+            if key not in value:
+                errors.append(f"{path}: missing {key!r}")
+        for key, property_schema in schema.get('properties', {}).items():
+            if key in value:
+                errors += schema_errors(value[key], property_schema, f"{path}.{key}")
+
+    return errors
+
+
+def parse_json_response(response_text):
+
+    """Function to parse an LLM response as a JSON object (also if it is wrapped in a markdown code fence).
+
+    Args:
+        response_text (str): The LLM response.
+    Returns:
+        dict: The JSON object, None if the response is not a JSON object.
+    """
+
+    match = _code_fence.match(response_text or '')
+    text  = match.group(1) if match else (response_text or '')
+
+    try:
+        value = json.loads(text)
+    except json.JSONDecodeError:
+        # Keep the outermost braces if there is text around the object:
+        start, end = text.find('{'), text.rfind('}')
+        if start == -1 or end <= start:
+            return None
+        try:
+            value = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+
+    return value if isinstance(value, dict) else None
+
+
+def structured_sections(response_text, schema):
+
+    """Function to return the sections of a structured LLM response which match their schema.
+
+    Args:
+        response_text (str): The LLM response.
+        schema (dict): JSON schema of the response (an object with one property per section).
+    Returns:
+        tuple: The valid sections by name (dict) and the errors of the invalid or missing sections by name (dict).
+    """
+
+    response = parse_json_response(response_text)
+    if response is None:
+        return {}, {name: ["$: response is not a JSON object"] for name in schema['properties']}
+
+    sections, errors = {}, {}
+    for name, section_schema in schema['properties'].items():
+        if name not in response:
+            errors[name] = [f"$: missing {name!r}"]
+            continue
+
+        section_errors = schema_errors(response[name], section_schema, f"$.{name}")
+        if section_errors:
+            errors[name] = section_errors
+        else:
+            sections[name] = response[name]
+
+    return sections, errors
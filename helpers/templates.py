@@ -0,0 +1,81 @@
+import os
+import base64
+import threading
+import jinja2
+
+# Import catalog:
+from catalog.catalog import folders, filenames
+
+# Functions:
+#
+#   get_template_environment
+#   get_template
+#   preload_templates
+#
+# The Jinja2 layouts are loaded through one process-wide environment per layout folder, so a layout is
+# parsed and compiled once per process (Streamlit app, batch worker) instead of on every report. The
+# compiled templates are also saved in a bytecode cache (in the template cache folder), so a new process
+# does not compile them again. Jinja2 checks the modification time of a layout before reusing it, so a
+# changed layout is reloaded automatically.
+
+
+# Template environments by layout folder:
+_environments      = {}
+_environments_lock = threading.Lock()
+
+
+def get_template_environment(layout_folder = None):
+
+    """Function to return the process-wide Jinja2 environment of a layout folder.
+
+    Args:
+        layout_folder (str): Folder of the layouts (defaults to the layout folder of the catalog).
+    Returns:
+        jinja2.Environment: The environment (with the base64 filter for images).
+    """
+
+    layout_folder = layout_folder or folders['layout']
+
+    with _environments_lock:
+        environment = _environments.get(layout_folder)
+        if environment is None:
+            os.makedirs(folders['template_cache'], exist_ok = True)
+            environment = jinja2.Environment(loader          = jinja2.FileSystemLoader(searchpath = layout_folder),
+                                             bytecode_cache  = jinja2.FileSystemBytecodeCache(folders['template_cache']),
+                                             auto_reload     = True)
+            environment.filters['base64'] = lambda image: base64.b64encode(image).decode()
+            _environments[layout_folder]  = environment
+
+    return environment
+
+
+def get_template(template_filename, layout_folder = None):
+
+    """Function to return a compiled layout template (compiled once per process and reloaded if the file changes).
+
+    Args:
+        template_filename (str): File name of the layout (e.g. 'layout_scr_report.html').
+        layout_folder (str): Folder of the layouts (defaults to the layout folder of the catalog).
+    Returns:
+        jinja2.Template: The template.
+    """
+
+    return get_template_environment(layout_folder).get_template(template_filename)
+
+
+def preload_templates(layout_folder = None):
+
+    """Function to compile the report layouts up front (e.g. when the app starts).
+
+    Args:
+        layout_folder (str): Folder of the layouts (defaults to the layout folder of the catalog).
+    Returns:
+        list: File names of the preloaded layouts.
+    """
+
+    template_filenames = [filenames['scr_report_layout'], filenames['validation_report_layout_filename']]
+
+    for template_filename in template_filenames:
+        get_template(template_filename, layout_folder)
+
+    return template_filenames
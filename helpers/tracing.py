@@ -0,0 +1,286 @@
+import os
+import json
+import time
+import uuid
+import tempfile
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Functions:
+#
+#   Span (class)
+#   Tracer (class)
+#   activate
+#   span
+#   submit_in_context
+#   openmetrics_text
+#
+# Lightweight tracing of the report generation. A tracer is activated for a run (e.g. by generate_report) and
+# every traced block within the run - stages, Excel ingestion, charts, LLM calls and rendering - is recorded
+# as a span nested in the span it runs in (the current span is kept in a context variable). Work handed to
+# a thread pool keeps its parent span when submitted with submit_in_context. Without an active tracer, span()
+# does nothing, so the helpers can be traced at no cost when they are used on their own.
+#
+# A trace is exported as JSON lines (one span per line) and as an OpenMetrics text file (durations and byte
+# sizes by span name) that can be collected by Prometheus.
+
+
+# Active tracer and current span of the running code:
+_current_tracer = contextvars.ContextVar('current_tracer', default = None)
+_current_span   = contextvars.ContextVar('current_span', default = None)
+
+
+class Span:
+
+    """A traced block of work.
+
+    Args:
+        name (str): Name of the span (e.g. 'stage.html_report', 'llm.call').
+        trace_id (str): Id of the trace the span belongs to.
+        parent_id (str): Id of the parent span (None for the root span).
+        attributes (dict): Attributes of the span (e.g. provider, model, bytes).
+    """
+
+    def __init__(self, name, trace_id, parent_id = None, attributes = None):
+        self.name       = name
+        self.trace_id   = trace_id
+        self.span_id    = uuid.uuid4().hex[:16]
+        self.parent_id  = parent_id
+        self.attributes = dict(attributes or {})
+        self.thread     = threading.current_thread().name
+        self.start_time = time.time()
+        self.duration   = None
+        self.status     = 'ok'
+        self._start     = time.perf_counter()
+
+    def set_attribute(self, key, value):
+
+        """Set an attribute of the span."""
+
+        self.attributes[key] = value
+
+    def end(self, error = None):
+
+        """End the span (with the error if the traced block failed)."""
+
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.status              = 'error'
+            self.attributes['error'] = f"{type(error).__name__}: {error}"
+
+    def to_dict(self):
+
+        """Return the span as a dictionary (JSON serialisable)."""
+
+        return {'name':       self.name,
+                'trace_id':   self.trace_id,
+                'span_id':    self.span_id,
+                'parent_id':  self.parent_id,
+                'thread':     self.thread,
+                'start_time': self.start_time,
+                'duration':   self.duration,
+                'status':     self.status,
+                'attributes': self.attributes}
+
+
+class _NoSpan:
+
+    """Span used when no tracer is active (attributes are ignored)."""
+
+    def set_attribute(self, key, value):
+        pass
+
+
+class Tracer:
+
+    """Collects the spans of a trace.
+
+    Args:
+        name (str): Name of the trace (e.g. 'generate_report').
+    """
+
+    def __init__(self, name = 'trace'):
+        self.name     = name
+        self.trace_id = uuid.uuid4().hex
+        self.spans    = []
+        self._lock    = threading.Lock()
+
+    def _record(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dicts(self):
+
+        """Return the finished spans as dictionaries, in the order they started."""
+
+        with self._lock:
+            spans = list(self.spans)
+
+        return [span.to_dict() for span in sorted(spans, key = lambda span: span.start_time)]
+
+    def write_jsonl(self, path):
+
+        """Save the spans as JSON lines (one span per line).
+
+        Args:
+            path (str): Path of the file.
+        Returns:
+            str: Path of the file.
+        """
+
+        lines = [json.dumps(span, default = str) for span in self.to_dicts()]
+        _write_text(path, '\n'.join(lines) + '\n')
+
+        return path
+
+    def write_openmetrics(self, path, labels = None):
+
+        """Save the durations and byte sizes of the spans as an OpenMetrics text file.
+
+        Args:
+            path (str): Path of the file.
+            labels (dict): Labels added to every metric (e.g. year and entity).
+        Returns:
+            str: Path of the file.
+        """
+
+        _write_text(path, openmetrics_text(self.to_dicts(), labels))
+
+        return path
+
+
+def _write_text(path, text):
+
+    """Write a text file atomically (to a temporary file first)."""
+
+    folder = os.path.dirname(path) or '.'
+    os.makedirs(folder, exist_ok = True)
+
+    fd, tmp_path = tempfile.mkstemp(dir = folder, suffix = '.tmp')
+    with os.fdopen(fd, 'w', encoding = 'utf-8') as text_file:
+        text_file.write(text)
+    os.replace(tmp_path, path)
+
+
+@contextmanager
+def activate(tracer):
+
+    """Context manager to make a tracer the active tracer of the running code (and of the code it submits in context).
+
+    Args:
+        tracer (Tracer): The tracer.
+    Yields:
+        Tracer: The tracer.
+    """
+
+    tracer_token = _current_tracer.set(tracer)
+    span_token   = _current_span.set(None)
+    try:
+        yield tracer
+    finally:
+        _current_span.reset(span_token)
+        _current_tracer.reset(tracer_token)
+
+
+@contextmanager
+def span(name, **attributes):
+
+    """Context manager to trace a block of work as a span of the active tracer (does nothing without active tracer).
+
+    Args:
+        name (str): Name of the span.
+        **attributes: Attributes of the span (more can be added with set_attribute on the yielded span).
+    Yields:
+        Span: The span.
+    """
+
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield _NoSpan()
+        return
+
+    parent       = _current_span.get()
+    current_span = Span(name, tracer.trace_id, parent.span_id if parent is not None else None, attributes)
+    token        = _current_span.set(current_span)
+    try:
+        yield current_span
+    except BaseException as e:
+        current_span.end(e)
+        raise
+    else:
+        current_span.end()
+    finally:
+        _current_span.reset(token)
+        tracer._record(current_span)
+
+
+def submit_in_context(executor, func, *args, **kwargs):
+
+    """Function to submit work to a thread pool within the current tracer and span.
+
+    Args:
+        executor (concurrent.futures.Executor): The thread pool.
+        func (callable): Function to run.
+        *args, **kwargs: Arguments of the function.
+    Returns:
+        concurrent.futures.Future: Future of the function result.
+    """
+
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+def _label_value(value):
+
+    """Escape a label value for the OpenMetrics text format."""
+
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+
+    """Format labels for the OpenMetrics text format."""
+
+    return '{' + ','.join(f'{key}="{_label_value(value)}"' for key, value in labels.items()) + '}'
+
+
+def openmetrics_text(spans, labels = None):
+
+    """Function to summarise spans as metrics in the OpenMetrics text format.
+
+    Args:
+        spans (list): Spans as dictionaries (as returned by Tracer.to_dicts).
+        labels (dict): Labels added to every metric (e.g. year and entity).
+    Returns:
+        str: Total duration and number of the spans by span name and status, and the total byte size by span name.
+    """
+
+    labels    = labels or {}
+    durations = {}
+    sizes     = {}
+
+    for span_dict in spans:
+        key = (span_dict['name'], span_dict['status'])
+        total, count   = durations.get(key, (0.0, 0))
+        durations[key] = (total + (span_dict['duration'] or 0.0), count + 1)
+
+        if 'bytes' in span_dict['attributes']:
+            sizes[span_dict['name']] = sizes.get(span_dict['name'], 0) + span_dict['attributes']['bytes']
+
+    lines = ['# TYPE scr_report_span_duration_seconds summary',
+             '# UNIT scr_report_span_duration_seconds seconds',
+             '# HELP scr_report_span_duration_seconds Time spent in the traced blocks of the report generation.']
+    for (name, status), (total, count) in sorted(durations.items()):
+        span_labels = _labels({**labels, 'span': name, 'status': status})
+        lines.append(f'scr_report_span_duration_seconds_sum{span_labels} {total:.6f}')
+        lines.append(f'scr_report_span_duration_seconds_count{span_labels} {count}')
+
+    lines += ['# TYPE scr_report_span_bytes gauge',
+              '# UNIT scr_report_span_bytes bytes',
+              '# HELP scr_report_span_bytes Size of the outputs rendered in the traced blocks.']
+    for name, size in sorted(sizes.items()):
+        lines.append(f'scr_report_span_bytes{_labels({**labels, "span": name})} {size}')
+
+    lines.append('# EOF')
+
+    return '\n'.join(lines) + '\n'
@@ -1,149 +1,132 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import base64
-import numpy as np
-from docx import Document
-import os
+
+# Import helpers:
+from helpers.charts import get_chart_store
+from helpers.validation import compile_validation_rules, evaluate_validation_rules
 
 # Write a function to generate a list of integers from 0 to 10
 
 # Functions:
 #
 #       create_pie_charts
-#       image_to_base64
-#       count_pass_fail
+#       create_entity_pie_chart
+#       create_tornado_chart
 #       perform_validation
 
 
-def create_pie_charts(df, year, path):
+def create_pie_charts(scr_table, year, path = None):
 
-    """Create a pie chart for the Basic SCR composition for a given year and save it to the specified path.
+    """Create a pie chart for the Basic SCR composition for a given year and optionally save it to the specified path.
     
     Args:
-        df (pd.DataFrame): DataFrame containing the SCR data.
+        scr_table (ScrTable): The SCR table.
         year (str): The year for which the pie chart is to be created (e.g., '2024').
-        path (str): The file path where the pie chart image will be saved.
+        path (str): The file path where the pie chart image will be saved (not saved if None).
     Returns:
-        None
+        bytes: The pie chart as png.
     """
 
-    # Select the first 4 rows of the dataframe, these include the BSCR modules:
-    df_bscr_modules = df.head(4)
-
-    # Labels from the '€m' column and values from the '2024' column
-    labels = df_bscr_modules['€m']
-    values = df_bscr_modules[year]
+    # Select the first 4 rows of the table, these include the BSCR modules:
+    bscr_modules = scr_table.head(4)
 
-    # Create the pie chart
-    plt.figure(figsize=(5, 5))
-    plt.pie(values, labels=labels, autopct='%1.1f%%', startangle=90, textprops={'fontsize': 8})
+    # Labels from the '€m' column and values from the year column
+    labels = bscr_modules.labels
+    values = bscr_modules.column(year)
 
-    # Display the chart
-    plt.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+    # Create the pie chart (or reuse it if an identical chart was drawn before):
+    png = get_chart_store().pie_chart(labels.tolist(), values.tolist())
 
-    # Save the chart as a png file (file name depends on whether the period is the current year or previous year):    
-    plt.savefig(path)
+    # Save the chart as a png file if requested (file name depends on whether the period is the current year or previous year):    
+    if path is not None:
+        with open(path, 'wb') as chart_file:
+            chart_file.write(png)
 
-    plt.close()
+    return png
 
-    return None
 
+def create_entity_pie_chart(consolidation, item = 'Total SCR', max_slices = 8, path = None):
 
-def image_to_base64(img_path):
+    """Create a pie chart of the split of a group line item by entity (current year), the smallest entities shown as one slice.
 
-    """Convert an image file to a base64 encoded string.
     Args:
-        img_path (str): The file path of the image to be converted.
-
+        consolidation (GroupConsolidation): The group results with the results of the entities.
+        item (str): The line item (e.g. 'Total SCR').
+        max_slices (int): Maximum number of slices (the largest entities, then the other entities together).
+        path (str): The file path where the pie chart image will be saved (not saved if None).
     Returns:
-        str: Base64 encoded string of the image.
+        bytes: The pie chart as png.
     """
 
-    with open(img_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode()
+    # Entities from the largest to the smallest value:
+    ranking = consolidation.ranking(item)
+    labels  = [entity for entity, _, _ in ranking]
+    values  = [value for _, value, _ in ranking]
 
-def count_pass_fail(value, threshold):
+    if len(ranking) > max_slices:
+        labels = labels[:max_slices - 1] + ['Other entities']
+        values = values[:max_slices - 1] + [sum(values[max_slices - 1:])]
 
-    """Count pass/fail based on a threshold.
-    Args:
-        value (float): The value to be evaluated.
-        threshold (float): The threshold for pass/fail evaluation.      
-    Returns:
-        str: 'pass' if value <= threshold, 'fail' if value > threshold, np.nan for non-numeric values.
-    """
+    # Create the pie chart (or reuse it if an identical chart was drawn before):
+    png = get_chart_store().pie_chart(labels, values)
+
+    if path is not None:
+        with open(path, 'wb') as chart_file:
+            chart_file.write(png)
 
-    if isinstance(value, (int, float)):
-        if value > threshold:
-            return 'fail'
-        else:
-            return 'pass'
-    return np.nan  # Non-numeric values are ignored
+    return png
 
 
-def perform_validation(scr_table_df, current_year, previous_year):
+def create_tornado_chart(stress_results, path = None):
 
-    """Perform validation on the SCR table DataFrame.
+    """Create a tornado chart of the solvency ratio after a down and an up shock of each factor (largest range on top).
 
     Args:
-        scr_table_df (pd.DataFrame): DataFrame containing the SCR table data.
-        current_year (str): The current year column name (e.g., '2024').
-        previous_year (str): The previous year column name (e.g., '2023').
+        stress_results (dict): Results of the stress tests (see run_stress_tests in helpers/stress.py).
+        path (str): The file path where the chart image will be saved (not saved if None).
     Returns:
-        pd.DataFrame: DataFrame indicating discrepancies in the SCR table.
+        bytes: The tornado chart as png.
     """
 
-    # Retrieve the SCR results imported from Excel and change the Movement % column to numeric:
-    scr_table_input = scr_table_df.copy()
+    sensitivities = stress_results['sensitivities']
+    labels        = [sensitivity['factor'] for sensitivity in sensitivities]
+    low           = [sensitivity['low'] for sensitivity in sensitivities]
+    high          = [sensitivity['high'] for sensitivity in sensitivities]
 
-    # Convert 'Movement %' from string percentage to float
-    scr_table_input['Movement %'] = (
-        scr_table_input['Movement %']
-        .str.rstrip('%')        # Remove the '%' sign
-        .astype(float) / 100    # Convert to float and divide by 100
-    )
+    # Create the tornado chart (or reuse it if an identical chart was drawn before):
+    png = get_chart_store().tornado_chart(labels, low, high, stress_results['base'])
 
-    # Initialise scr_table_expected as a DataFrame
-    scr_table_expected = pd.DataFrame(scr_table_input)
+    if path is not None:
+        with open(path, 'wb') as chart_file:
+            chart_file.write(png)
 
-    # Define input_cells mask with the same shape as scr_table_expected, initialized to False
-    input_cells = pd.DataFrame(False, index=scr_table_expected.index, columns=scr_table_expected.columns)
+    return png
 
-    # Specifiy input cells - these cannot be checked as row input:
-    input_cells['€m'] = True
-    rows_to_exclude = [0, 1, 2, 3, 4, 6, 7, 9]  # Zero-based indices
-    input_cells.loc[rows_to_exclude, [current_year, previous_year]] = True
-    input_cells = input_cells.astype(bool)
 
-    # Ensure scr_table_expected and scr_table_df have numeric data types:
-    scr_table_expected = scr_table_expected.apply(pd.to_numeric, errors='coerce')
-    scr_table_input =  scr_table_input.apply(pd.to_numeric, errors='coerce')
+def perform_validation(scr_table, current_year, previous_year):
 
-    # Calculate scr_table expected (totals, movements based on input data):
+    """Perform validation on the SCR table.
 
-    # Totals check: 
-    scr_table_expected.loc[5, [current_year, previous_year]] =  scr_table_input.iloc[:5][[current_year, previous_year]].sum()
-    scr_table_expected.loc[8, [current_year, previous_year]] =  scr_table_input.iloc[5:8][[current_year, previous_year]].sum()
-    scr_table_expected.loc[10, [current_year, previous_year]] =  scr_table_input.iloc[6:8][[current_year, previous_year]].sum()
-
-    # Solvency ratio check:
-    scr_table_expected.loc[10, current_year] = scr_table_input.loc[9, current_year] / scr_table_input.loc[8, current_year]
-    scr_table_expected.loc[10, previous_year] = scr_table_input.loc[9, previous_year] / scr_table_input.loc[8, previous_year]
-
-    scr_table_expected.loc[:, 'Movement'] = scr_table_input.loc[:, current_year] - scr_table_input.loc[:, previous_year]
-    scr_table_expected.loc[:, 'Movement %'] = scr_table_input.loc[:, current_year] / scr_table_input.loc[:, previous_year] - 1
+    Args:
+        scr_table (ScrTable): The SCR table.
+        current_year (str): The current year column name (e.g., '2024').
+        previous_year (str): The previous year column name (e.g., '2023').
+    Returns:
+        pd.DataFrame: DataFrame indicating discrepancies in the SCR table.
+    """
 
-    # Compute absolute value of element-wise differences
-    df_diff = scr_table_expected.subtract(scr_table_input).abs()
+    # Compile the validation rules of the catalog for the line items of the table (cached by layout):
+    compiled = compile_validation_rules(scr_table.labels)
 
-    # Apply the mask to set specified cells to NaN
-    df_check = df_diff.mask(input_cells)
+    # Absolute differences between the expected values (totals, ratios, movements) and the input values,
+    # NaN for the input cells which cannot be checked:
+    differences = evaluate_validation_rules(scr_table.values, compiled)
 
+    df_check = pd.DataFrame(differences, columns = [current_year, previous_year, 'Movement', 'Movement %'])
 
-    # Replace NaN values with empty strings and round numeric values to 3 in the check:
-    df_check = df_check.fillna('')
+    # Replace NaN values with empty strings:
+    df_check = df_check.astype(object).where(df_check.notna(), '')
 
     # Put back categories into check dataframe:
-    df_check["€m"] = scr_table_df["€m"]
+    df_check.insert(0, '€m', pd.Series(scr_table.labels, dtype = object))
 
     return df_check
-
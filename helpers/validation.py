@@ -0,0 +1,233 @@
+import threading
+import numpy as np
+
+# Import catalog and helpers:
+from catalog.validation_rules import validation_rules, line_item_aliases
+from helpers.scr_table import CURRENT, PREVIOUS, MOVEMENT, MOVEMENT_PCT
+
+# Functions:
+#
+#   canonical_label
+#   CompiledRules (class)
+#   compile_validation_rules
+#   evaluate_validation_rules
+#   validation_status
+#   validate_scr_tables
+#
+# The validation checks of the SCR table are declared by line item name in catalog/validation_rules.py.
+# The rules are compiled once per table layout into numpy index arrays (a 0/1 weight matrix for the sums
+# and row indices for the ratios), which are then evaluated in one pass over an array of values of shape
+# (..., rows, 4) - a single table or a stack of many tables (e.g. entities x years) with the same layout.
+# The 4 value columns are those of ScrTable.values: current year, previous year, Movement and Movement %.
+
+
+# Compiled rules by table layout (only for the rules and aliases of the catalog):
+_compiled_rules      = {}
+_compiled_rules_lock = threading.Lock()
+
+
+def canonical_label(label, aliases = None):
+
+    """Function to return the canonical name of a line item.
+
+    Args:
+        label (str): Name of the line item in the input table (e.g. 'Market').
+        aliases (dict): Other names of line items (defaults to line_item_aliases).
+    Returns:
+        str: Canonical name of the line item (e.g. 'Market Risk').
+    """
+
+    aliases = line_item_aliases if aliases is None else aliases
+    label   = str(label).strip()
+
+    return aliases.get(label, label)
+
+
+class CompiledRules:
+
+    """Validation rules compiled for a table layout.
+
+    Args:
+        labels (tuple): Canonical names of the line items, in the order of the table rows.
+        sum_targets (np.ndarray): Rows which are sums of other rows.
+        sum_weights (np.ndarray): 0/1 weights of the rows summed, shape (len(sum_targets), rows).
+        ratio_targets (np.ndarray): Rows which are ratios of other rows.
+        ratio_numerators (np.ndarray): Numerator rows of the ratios.
+        ratio_denominators (np.ndarray): Denominator rows of the ratios.
+        checked (np.ndarray): Boolean mask of the checked cells, shape (rows, 4).
+    """
+
+    def __init__(self, labels, sum_targets, sum_weights, ratio_targets, ratio_numerators, ratio_denominators, checked):
+        self.labels             = labels
+        self.sum_targets        = sum_targets
+        self.sum_weights        = sum_weights
+        self.ratio_targets      = ratio_targets
+        self.ratio_numerators   = ratio_numerators
+        self.ratio_denominators = ratio_denominators
+        self.checked            = checked
+
+    def __repr__(self):
+        return f"CompiledRules({len(self.labels)} rows, {int(self.checked.sum())} checked cells)"
+
+
+def _compile(labels, rules, aliases):
+
+    """Compile the rules for the canonical labels of a table."""
+
+    row_of = {label: row for row, label in enumerate(labels)}
+
+    def row(item, rule):
+        item = canonical_label(item, aliases)
+        if item not in row_of:
+            raise ValueError(f"Validation rule {rule['rule']} for {rule.get('item', rule.get('column'))} "
+                             f"refers to line item {item!r}, which is not in the SCR table: {list(labels)}.")
+        return row_of[item]
+
+    n_rows  = len(labels)
+    checked = np.zeros((n_rows, 4), dtype = bool)
+
+    sum_targets, sum_weights                            = [], []
+    ratio_targets, ratio_numerators, ratio_denominators = [], [], []
+
+    for rule in rules:
+        if rule['rule'] == 'sum_of':
+            weights = np.zeros(n_rows)
+            weights[[row(item, rule) for item in rule['items']]] = 1.0
+            sum_targets.append(row(rule['item'], rule))
+            sum_weights.append(weights)
+
+        elif rule['rule'] == 'ratio_of':
+            ratio_targets.append(row(rule['item'], rule))
+            ratio_numerators.append(row(rule['numerator'], rule))
+            ratio_denominators.append(row(rule['denominator'], rule))
+
+        elif rule['rule'] == 'movement':
+            checked[:, MOVEMENT] = True
+
+        elif rule['rule'] == 'percentage_movement':
+            checked[:, MOVEMENT_PCT] = True
+
+        else:
+            raise ValueError(f"Unknown validation rule {rule['rule']!r}.")
+
+    sum_targets   = np.array(sum_targets, dtype = int)
+    ratio_targets = np.array(ratio_targets, dtype = int)
+    checked[sum_targets, CURRENT:PREVIOUS + 1]   = True
+    checked[ratio_targets, CURRENT:PREVIOUS + 1] = True
+
+    return CompiledRules(labels             = labels,
+                         sum_targets        = sum_targets,
+                         sum_weights        = np.array(sum_weights).reshape(len(sum_targets), n_rows),
+                         ratio_targets      = ratio_targets,
+                         ratio_numerators   = np.array(ratio_numerators, dtype = int),
+                         ratio_denominators = np.array(ratio_denominators, dtype = int),
+                         checked            = checked)
+
+
+def compile_validation_rules(labels, rules = None, aliases = None):
+
+    """Function to compile the validation rules for the line items of an SCR table.
+
+    Args:
+        labels (list): Names of the line items, in the order of the table rows.
+        rules (list): Validation rules (defaults to validation_rules of the catalog).
+        aliases (dict): Other names of line items (defaults to line_item_aliases of the catalog).
+    Returns:
+        CompiledRules: The compiled rules (cached by table layout for the rules of the catalog).
+    Raises:
+        ValueError: If a rule refers to a line item which is not in the table or the rule is unknown.
+    """
+
+    labels = tuple(canonical_label(label, aliases) for label in labels)
+
+    if rules is not None or aliases is not None:
+        return _compile(labels, validation_rules if rules is None else rules, aliases)
+
+    with _compiled_rules_lock:
+        compiled = _compiled_rules.get(labels)
+    if compiled is None:
+        compiled = _compile(labels, validation_rules, line_item_aliases)
+        with _compiled_rules_lock:
+            _compiled_rules[labels] = compiled
+
+    return compiled
+
+
+def evaluate_validation_rules(values, compiled):
+
+    """Function to evaluate the compiled validation rules on one or many SCR tables at once.
+
+    Args:
+        values (np.ndarray): Values of shape (..., rows, 4), e.g. (rows, 4) for one table or
+                             (entities, years, rows, 4) for a stack of tables with the same layout.
+        compiled (CompiledRules): The compiled rules of the table layout.
+    Returns:
+        np.ndarray: Absolute differences between the expected and input values, same shape as values,
+                    NaN for the cells which are not checked (raw inputs).
+    """
+
+    values = np.asarray(values, dtype = float)
+    if values.shape[-2:] != compiled.checked.shape:
+        raise ValueError(f"Values of shape {values.shape} do not match the {len(compiled.labels)} rows of the rules.")
+
+    expected = values.copy()
+    years    = values[..., CURRENT:PREVIOUS + 1]
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+
+        # Totals:
+        if compiled.sum_targets.size:
+            expected[..., compiled.sum_targets, CURRENT:PREVIOUS + 1] = compiled.sum_weights @ years
+
+        # Ratios (e.g. solvency ratio):
+        if compiled.ratio_targets.size:
+            expected[..., compiled.ratio_targets, CURRENT:PREVIOUS + 1] = (years[..., compiled.ratio_numerators, :] /
+                                                                           years[..., compiled.ratio_denominators, :])
+
+        # Movements:
+        expected[..., MOVEMENT]     = values[..., CURRENT] - values[..., PREVIOUS]
+        expected[..., MOVEMENT_PCT] = values[..., CURRENT] / values[..., PREVIOUS] - 1
+
+        differences = np.abs(expected - values)
+
+    return np.where(compiled.checked, differences, np.nan)
+
+
+def validation_status(differences, threshold):
+
+    """Function to classify the checked cells as passed or failed.
+
+    Args:
+        differences (np.ndarray): Absolute differences (NaN for the cells which are not checked).
+        threshold (float): Threshold for the validation checks (a difference above it fails).
+    Returns:
+        tuple: Boolean masks of the passed and the failed cells, same shape as differences.
+    """
+
+    differences = np.asarray(differences, dtype = float)
+    checked     = ~np.isnan(differences)
+    failed      = checked & (differences > threshold)
+
+    return checked & ~failed, failed
+
+
+def validate_scr_tables(scr_tables):
+
+    """Function to validate many SCR tables with the same layout in one vectorised pass.
+
+    Args:
+        scr_tables (list): SCR tables (ScrTable).
+    Returns:
+        tuple: Absolute differences of shape (tables, rows, 4) (NaN for unchecked cells) and the compiled rules.
+    Raises:
+        ValueError: If the tables do not all have the same line items.
+    """
+
+    compiled = compile_validation_rules(scr_tables[0].labels)
+    for scr_table in scr_tables[1:]:
+        if compile_validation_rules(scr_table.labels) is not compiled:
+            raise ValueError(f"SCR tables have different line items: {list(compiled.labels)} and {scr_table.labels.tolist()}.")
+
+    values = np.stack([scr_table.values for scr_table in scr_tables])
+
+    return evaluate_validation_rules(values, compiled), compiled
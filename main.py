@@ -1,14 +1,29 @@
 # Import python libraries:
 import os
-import pandas as pd
+import re
+import glob
+import json
+import argparse
+import traceback
 import warnings
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Import catalog and helper functions:
-from catalog.catalog import folders, filenames
+from catalog.catalog import folders, filenames, pipeline_settings, llm_settings, report_settings, stress_settings
 from helpers.formatting import format_scr_table
-from helpers.utils import create_pie_charts, perform_validation
-from helpers.create_reports import create_html_report, create_pdf_report, create_word_report, create_validation_report
+from helpers.utils import create_pie_charts, create_entity_pie_chart, create_tornado_chart, perform_validation
+from helpers.create_reports import create_report_model, create_html_report, create_pdf_report, create_word_report, create_validation_report
+from helpers.create_reports import report_llm_prompts, render_report_html, create_group_report_model, create_group_html_report
+from helpers.consolidation import load_group_tables, consolidate_scr_tables
+from helpers.stress import run_stress_tests
+from helpers.pdf_service import get_pdf_service
+from helpers.pipeline import Stage, run_stages
+from helpers.build_manifest import BuildManifest
+from helpers.ingestion import read_scr_table
+from helpers.history_store import get_history_store
+from helpers.templates import preload_templates
+from helpers.tracing import Tracer, activate, span
 
 # Turn off all FutureWarnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
@@ -16,7 +31,10 @@ warnings.simplefilter(action='ignore', category=FutureWarning)
 # Function to generate SCR report in HTML and PDF formats:
 def generate_report(current_year, target_solvency_ratio = 1.25, conclusion_wording = '', 
                     llm_flag = 'No', llm_provider = 'Gemini', llm_nr_of_sentences = 2,
-                    output_formats = ['html', 'pdf', 'docx'],  validation_threshold = 0.001):
+                    output_formats = ['html', 'pdf', 'docx'],  validation_threshold = 0.001,
+                    scr_table_path = None, entity = None, llm_use_cache = True, force_rebuild = False,
+                    export_images = True, export_trace = True, llm_response_mode = None, entity_name = None,
+                    llm_cache_only = False):
 
     """Function to generate the SCR and validation reports.
     
@@ -29,8 +47,24 @@ def generate_report(current_year, target_solvency_ratio = 1.25, conclusion_wordi
         llm_nr_of_sentences (int): The number of sentences to generate with the LLM.
         output_formats (list): The desired output formats for the report.
         validation_threshold (float): The threshold for validation checks.
+        scr_table_path (str): Path to the input SCR table (defaults to input/tables/scr_table_<year>YE.xlsx).
+        entity (str): Entity name, reports are saved in an entity subfolder of the output folders if set.
+        llm_use_cache (bool): Flag to reuse cached LLM responses (set to False to request fresh responses).
+        force_rebuild (bool): Flag to rebuild all outputs, also those whose inputs are unchanged since the last run.
+        export_images (bool): Flag to also save the charts as png files in the images folder (the reports use the charts in memory).
+        export_trace (bool): Flag to save the trace of the run as JSON lines and OpenMetrics text files in the reports folder.
+        llm_response_mode (str): 'structured' for one LLM request for all AI sections, 'sections' for one request per section
+                                 (defaults to the response mode in llm_settings).
+        entity_name (str): Name of the entity in the reports (defaults to the entity, or to entity_name in report_settings).
+        llm_cache_only (bool): Flag to take the AI commentary from the LLM cache only, without asking the providers (e.g.
+                               when they have just failed to answer in the app; code wording is used if not cached).
     Returns:
         report_paths (dict): Paths to the generated reports.
+        validation_report_html_path (str): Path to the HTML validation report.
+        run_details (dict): Total runtime, runtime of each stage run in seconds, the skipped stages,
+                            the HTML of the SCR and validation reports, the trace (spans as dictionaries),
+                            the sources of the AI commentary and a flag set if the commentary is provisional
+                            (from another provider than the selected one or generated by code, see Report.provisional).
     """
 
     # Start runtime measurement:
@@ -39,42 +73,174 @@ def generate_report(current_year, target_solvency_ratio = 1.25, conclusion_wordi
     # Calculate previous year from current:
     previous_year = current_year - 1
 
-    # Import data:
-    input_tables_folder    = folders['input_tables']
-    scr_table_df           = pd.read_excel(f"{input_tables_folder}scr_table_{current_year}YE.xlsx", usecols = "A:E")
-    scr_table_df_formatted = format_scr_table(scr_table_df, previous_year, current_year)
+    # LLM response mode (one request for all AI sections or one per section):
+    llm_response_mode = llm_response_mode or llm_settings['response_mode']
 
-    # Set output images folder:
-    output_images_folder                    = folders['output_images'] + str(current_year) + '/'
+    # Name of the entity in the reports:
+    entity_name = entity_name or entity or report_settings['entity_name']
 
-    # Create pie charts for the composition of the Basic SCR and save in the images folder - current year:
+    # Set output folders (one subfolder per entity if an entity is specified):
+    report_folders = entity_folders(entity)
+
+    # Set output images folder and make sure the output folders exist:
+    output_images_folder                    = report_folders['output_images'] + str(current_year) + '/'
+    output_reports_folder                   = report_folders['output_reports'] + str(current_year) + '/'
+    if export_images:
+        os.makedirs(output_images_folder, exist_ok = True)
+    os.makedirs(output_reports_folder, exist_ok = True)
+
+    # Set input and chart paths:
+    if scr_table_path is None:
+        scr_table_path                      = folders['input_tables'] + filenames['scr_table'].format(year = current_year)
     bscr_current_chart_filename             = str(current_year) + '_' + filenames['bscr_current_chart'] 
     bscr_current_chart_path                 = os.path.join(output_images_folder, bscr_current_chart_filename)
-    create_pie_charts(scr_table_df, current_year, bscr_current_chart_path)
-
-    # Create pie charts for the composition of the Basic SCR and save in the images folder - previous year:
     bscr_previous_chart_filename            = str(previous_year) + '_' + filenames['bscr_previous_chart'] 
     bscr_previous_chart_path                = os.path.join(output_images_folder, bscr_previous_chart_filename)
-    create_pie_charts(scr_table_df, previous_year, bscr_previous_chart_path)
 
-    # Create html report:
-    report_paths, report_html  = create_html_report(folders, filenames, current_year, previous_year, scr_table_df_formatted, 
-                                                    llm_flag, llm_provider, llm_nr_of_sentences,
-                                                    target_solvency_ratio, conclusion_wording)
+    # PDF conversions are queued on the pdf service, which caps the number of wkhtmltopdf processes:
+    pdf_service = get_pdf_service()
 
-    # Convert HTML Report to pdf if pdf output format selected by the user and updater output paths:
-    if 'pdf' in output_formats:
-        report_paths = create_pdf_report(folders, report_paths, current_year)
+    # Output paths of the stages:
+    html_path                   = f'./{output_reports_folder}scr_report_{current_year}.html'
+    pdf_path                    = f'./{output_reports_folder}scr_report_{current_year}.pdf'
+    docx_path                   = f'./{output_reports_folder}scr_report {current_year}.docx'
+    validation_report_html_path = f'./{output_reports_folder}validation_report_{current_year}.html'
+    validation_report_pdf_path  = f'./{output_reports_folder}validation_report_{current_year}.pdf'
+    scr_report_layout_path      = os.path.join(folders['layout'], filenames['scr_report_layout'])
+    validation_layout_path      = os.path.join(folders['layout'], filenames['validation_report_layout_filename'])
 
-    # Convert HTML Report to pdf if pdf output format selected by the user and update output paths:
-    if 'docx' in output_formats:
-        report_paths = create_word_report(folders, report_paths, report_html, current_year)
+    # Stages of the pipeline:
+
+    # Import data (all stages use the formatted table):
+    def load_table():
+        scr_table = read_scr_table(scr_table_path)
+        return format_scr_table(scr_table, previous_year, current_year)
+
+    # Create pie charts for the composition of the Basic SCR in memory (saved in the images folder if selected) - current year:
+    def chart_current(scr_table):
+        return create_pie_charts(scr_table, current_year, bscr_current_chart_path if export_images else None)
+
+    # Create pie charts for the composition of the Basic SCR in memory (saved in the images folder if selected) - previous year:
+    def chart_previous(scr_table):
+        return create_pie_charts(scr_table, previous_year, bscr_previous_chart_path if export_images else None)
+
+    # Reuse an exported chart:
+    def reuse_chart(chart_path):
+        with open(chart_path, 'rb') as chart_file:
+            return chart_file.read()
+
+    # Stress tests of the solvency ratio (sensitivities and stress grid, all scenarios at once):
+    def stress(scr_table):
+        return run_stress_tests(scr_table, target_solvency_ratio)
+
+    # Create the tornado chart of the sensitivities in memory:
+    def chart_tornado(stress_results):
+        return create_tornado_chart(stress_results)
+
+    # Create the content of the SCR report (with the charts from memory), keeping the sources of its AI commentary:
+    def report_model(scr_table, bscr_current_chart, bscr_previous_chart, stress_results, tornado_chart):
+        report = create_report_model(current_year, previous_year, scr_table, 
+                                     llm_flag, llm_provider, llm_nr_of_sentences,
+                                     target_solvency_ratio, conclusion_wording, llm_use_cache,
+                                     charts = {'current': bscr_current_chart, 'previous': bscr_previous_chart,
+                                               'tornado': tornado_chart},
+                                     llm_response_mode = llm_response_mode, entity_name = entity_name,
+                                     stress = stress_results, llm_cache_only = llm_cache_only)
+        llm_commentary.update(sources = report.llm_sources, provisional = report.provisional)
+        return report
+
+    # Render html report (the path and the HTML are returned):
+    def html_report(report):
+        report_paths, report_html = create_html_report(report_folders, filenames, current_year, previous_year, None, 
+                                                       llm_flag, llm_provider, llm_nr_of_sentences,
+                                                       target_solvency_ratio, conclusion_wording, report = report)
+        return report_paths['html'], report_html
+
+    # Reuse an existing HTML report:
+    def reuse_html(html_path):
+        with open(html_path, 'r', encoding = 'utf-8') as html_file:
+            return html_path, html_file.read()
+
+    # Convert HTML Report to pdf:
+    def pdf_report(html_report):
+        report_paths = create_pdf_report(report_folders, {'html': html_report[0]}, current_year, pdf_service)
+        return report_paths['pdf']
+
+    # Render Word report:
+    def word_report(report):
+        return create_word_report(report_folders, {}, report, current_year)['docx']
 
     # Perform validation:
-    df_check = perform_validation(scr_table_df, current_year, previous_year)
+    def validation(scr_table):
+        return perform_validation(scr_table, current_year, previous_year)
+
+    # Create validation report (HTML and pdf, the path and the HTML are returned):
+    def validation_report(df_check):
+        html_path, _, html = create_validation_report(df_check, report_folders, current_year, previous_year, 
+                                                      validation_threshold, pdf_service, entity_name)
+        return html_path, html
+
+    # Parameters of the report content (fresh AI commentary is requested if the LLM cache is not used):
+    report_params = {'current_year': current_year, 'target_solvency_ratio': target_solvency_ratio,
+                     'conclusion_wording': conclusion_wording, 'llm_flag': llm_flag, 'llm_provider': llm_provider,
+                     'llm_nr_of_sentences': llm_nr_of_sentences, 'llm_response_mode': llm_response_mode,
+                     'entity_name': entity_name}
+    llm_refresh   = llm_flag == 'Yes' and not llm_use_cache
 
-    # Create validation report:
-    validation_report_html_path, _  = create_validation_report(df_check, folders, current_year, previous_year, validation_threshold)
+    # Reports with provisional AI commentary (from the failover provider or generated by code as no provider answered)
+    # are not recorded in the build manifest, so they are built again with the commentary of the selected provider:
+    llm_commentary   = {'sources': set(), 'provisional': False}
+    final_commentary = lambda: not llm_commentary['provisional']
+
+    stages = [Stage('load_table',        load_table,
+                    params = {'current_year': current_year}, input_files = [scr_table_path]),
+              Stage('chart_current',     chart_current,     ['load_table'],
+                    params = {'export_images': export_images}, outputs = [bscr_current_chart_path] if export_images else [],
+                    reuse = lambda: reuse_chart(bscr_current_chart_path)),
+              Stage('chart_previous',    chart_previous,    ['load_table'],
+                    params = {'export_images': export_images}, outputs = [bscr_previous_chart_path] if export_images else [],
+                    reuse = lambda: reuse_chart(bscr_previous_chart_path)),
+              Stage('stress',            stress,            ['load_table'],
+                    params = {'target_solvency_ratio': target_solvency_ratio, **stress_settings}),
+              Stage('chart_tornado',     chart_tornado,     ['stress']),
+              Stage('report_model',      report_model,      ['load_table', 'chart_current', 'chart_previous', 'stress', 'chart_tornado'],
+                    params = report_params),
+              Stage('html_report',       html_report,       ['report_model'],
+                    input_files = [scr_report_layout_path], outputs = [html_path],
+                    reuse = lambda: reuse_html(html_path), always_run = llm_refresh, recordable = final_commentary),
+              Stage('validation',        validation,        ['load_table']),
+              Stage('validation_report', validation_report, ['validation'],
+                    params = {'validation_threshold': validation_threshold, 'entity_name': entity_name},
+                    input_files = [validation_layout_path],
+                    outputs = [validation_report_html_path, validation_report_pdf_path],
+                    reuse = lambda: reuse_html(validation_report_html_path))]
+
+    # Add pdf and Word conversions if selected by the user:
+    if 'pdf' in output_formats:
+        stages.append(Stage('pdf_report', pdf_report, ['html_report'], outputs = [pdf_path],
+                            reuse = lambda: pdf_path, always_run = llm_refresh, recordable = final_commentary))
+    if 'docx' in output_formats:
+        stages.append(Stage('word_report', word_report, ['report_model'], outputs = [docx_path],
+                            reuse = lambda: docx_path, always_run = llm_refresh, recordable = final_commentary))
+
+    # Run the stages (independent stages at the same time), skipping stages with unchanged inputs.
+    # The stages and the helpers they call are traced as spans nested in the span of the run:
+    manifest = BuildManifest(output_reports_folder + filenames['build_manifest'])
+    tracer   = Tracer('generate_report')
+    with activate(tracer), span('generate_report', current_year = current_year, entity = entity or '',
+                                llm_flag = llm_flag, force_rebuild = force_rebuild):
+        results, stage_timings, skipped_stages = run_stages(stages, max_workers = pipeline_settings['max_workers'],
+                                                            manifest = manifest, force = force_rebuild)
+    if skipped_stages:
+        print('Stages skipped (inputs unchanged): ', ', '.join(skipped_stages))
+
+    # Collect output paths:
+    report_paths = {'html': results['html_report'][0]}
+    if 'pdf' in output_formats:
+        report_paths['pdf']  = results['pdf_report']
+    if 'docx' in output_formats:
+        report_paths['docx'] = results['word_report']
+    validation_report_html_path = results['validation_report'][0]
 
     # Stop runtime measurement:
     end_time = time.time()    
@@ -83,5 +249,385 @@ def generate_report(current_year, target_solvency_ratio = 1.25, conclusion_wordi
     # Print runtime:
     print('Runtime of generating reports: ', round(runtime, 2), 'seconds')    
 
+    # Save the trace (spans as JSON lines, durations and sizes as OpenMetrics text):
+    if export_trace:
+        labels = {'year': current_year, 'entity': entity or ''}
+        tracer.write_jsonl(output_reports_folder + filenames['trace'].format(year = current_year))
+        tracer.write_openmetrics(output_reports_folder + filenames['metrics'].format(year = current_year), labels)
+
+    # Runtime of the whole pipeline and of each stage run, and the HTML reports (to display them without reading the files):
+    run_details = {'runtime': runtime, 'stage_timings': stage_timings, 'skipped_stages': skipped_stages,
+                   'html': {'scr_report': results['html_report'][1], 'validation_report': results['validation_report'][1]},
+                   'trace': tracer.to_dicts(), 'llm_sources': sorted(llm_commentary['sources']),
+                   'provisional': llm_commentary['provisional']}
+
     # Return the HTML and PDF reports:
-    return report_paths, validation_report_html_path
+    return report_paths, validation_report_html_path, run_details
+
+
+# Function to preview the SCR report straight away (before the AI commentary is generated):
+def generate_report_preview(current_year, target_solvency_ratio = 1.25, conclusion_wording = '',
+                            llm_nr_of_sentences = 2, scr_table_path = None, llm_response_mode = None, entity_name = None):
+
+    """Function to render the SCR report with the wording generated by code, without calling an LLM or saving files.
+
+    The preview is shown while the AI commentary is streamed with the returned prompts (the same prompts as used
+    by generate_report, so the streamed responses are found in the LLM cache when the full report is generated).
+
+    Args:
+        current_year (int): The current year for the report.
+        target_solvency_ratio (float): The target solvency ratio.
+        conclusion_wording (str): Text to be inserted at the end of the report.
+        llm_nr_of_sentences (int): The number of sentences to generate with the LLM.
+        scr_table_path (str): Path to the input SCR table (defaults to input/tables/scr_table_<year>YE.xlsx).
+        llm_response_mode (str): 'structured' or 'sections' (defaults to the response mode in llm_settings).
+        entity_name (str): Name of the entity in the report (defaults to entity_name in report_settings).
+    Returns:
+        preview_html (str): HTML of the report with the wording generated by code.
+        llm_prompts (dict): LLM prompts of the report ('report' in the structured mode, otherwise by section:
+                            'background' and 'results_analysis').
+    """
+
+    previous_year = current_year - 1
+
+    if scr_table_path is None:
+        scr_table_path = folders['input_tables'] + filenames['scr_table'].format(year = current_year)
+
+    # Import and format the table, run the stress tests and draw the charts in memory:
+    scr_table = format_scr_table(read_scr_table(scr_table_path), previous_year, current_year)
+    stress_results = run_stress_tests(scr_table, target_solvency_ratio)
+    charts       = {'current':  create_pie_charts(scr_table, current_year),
+                    'previous': create_pie_charts(scr_table, previous_year),
+                    'tornado':  create_tornado_chart(stress_results)}
+
+    report = create_report_model(current_year, previous_year, scr_table,
+                                 'No', None, llm_nr_of_sentences,
+                                 target_solvency_ratio, conclusion_wording, charts = charts, entity_name = entity_name,
+                                 stress = stress_results)
+
+    return render_report_html(report), report_llm_prompts(scr_table, previous_year, llm_nr_of_sentences, llm_response_mode)
+
+
+# Function to generate the consolidated report of a group of entities:
+def generate_group_report(current_year, table_paths, group_name = None, target_solvency_ratio = 1.25, conclusion_wording = '',
+                          output_formats = ['html', 'pdf', 'docx'], validation_threshold = 0.001, export_trace = True):
+
+    """Function to generate the group SCR report from the SCR tables of its entities.
+
+    The entity tables are consolidated in one pass (see helpers/consolidation.py) instead of running the
+    report pipeline for each entity. The reports are saved in the group subfolder of the output folders.
+
+    Args:
+        current_year (int): The current year for the report.
+        table_paths (list): Entity table files or entity folders with scr_table_<year>YE.xlsx files (as for the batch).
+        group_name (str): Name of the group in the report (defaults to group_name in report_settings).
+        target_solvency_ratio (float): The target solvency ratio.
+        conclusion_wording (str): Text to be inserted at the end of the report.
+        output_formats (list): The desired output formats for the report.
+        validation_threshold (float): The threshold for the validation checks of the entity tables.
+        export_trace (bool): Flag to save the trace of the run as JSON lines and OpenMetrics text files in the reports folder.
+    Returns:
+        report_paths (dict): Paths to the generated reports.
+        run_details (dict): Total runtime, the entities, the HTML of the report and the trace (spans as dictionaries).
+    Raises:
+        ValueError: If no entity tables are found for the year, an entity has several tables, or the tables do not match.
+    """
+
+    start_time = time.time()
+
+    # Entity tables of the year (the tables of the default input folder belong to the default entity):
+    jobs = build_batch_jobs([current_year], table_paths)
+    if not jobs:
+        raise ValueError(f"No SCR tables found for {current_year} in {table_paths}.")
+
+    table_paths_by_entity = {}
+    for job in jobs:
+        entity = job['entity'] or report_settings['entity_name']
+        if entity in table_paths_by_entity:
+            raise ValueError(f"Entity {entity} has several SCR tables for {current_year}: "
+                             f"{table_paths_by_entity[entity]} and {job['scr_table_path']}.")
+        table_paths_by_entity[entity] = job['scr_table_path']
+
+    # Output folders of the group:
+    group_folders         = entity_folders(report_settings['group_folder'])
+    output_reports_folder = group_folders['output_reports'] + str(current_year) + '/'
+    os.makedirs(output_reports_folder, exist_ok = True)
+
+    tracer = Tracer('generate_group_report')
+    with activate(tracer), span('generate_group_report', current_year = current_year, entities = len(table_paths_by_entity)):
+
+        # Load and consolidate the entity tables:
+        scr_tables    = load_group_tables(table_paths_by_entity)
+        consolidation = consolidate_scr_tables(scr_tables, list(table_paths_by_entity))
+
+        # Charts (composition of the group Basic SCR and group SCR by entity) and content of the report:
+        group_table = format_scr_table(consolidation.group)
+        charts      = {'current':  create_pie_charts(group_table, current_year),
+                       'previous': create_pie_charts(group_table, current_year - 1),
+                       'entities': create_entity_pie_chart(consolidation)}
+        report      = create_group_report_model(consolidation, target_solvency_ratio, conclusion_wording, group_name,
+                                                validation_threshold, charts)
+
+        # Render the report:
+        report_paths, report_html = create_group_html_report(group_folders, consolidation, target_solvency_ratio,
+                                                             conclusion_wording, group_name, validation_threshold,
+                                                             report = report)
+        if 'pdf' in output_formats:
+            report_paths = create_pdf_report(group_folders, report_paths, current_year, get_pdf_service())
+        if 'docx' in output_formats:
+            report_paths = create_word_report(group_folders, report_paths, report, current_year)
+
+    runtime = time.time() - start_time
+    print('Runtime of generating the group report: ', round(runtime, 2), 'seconds')
+
+    # Save the trace (spans as JSON lines, durations and sizes as OpenMetrics text):
+    if export_trace:
+        labels = {'year': current_year, 'entity': report_settings['group_folder']}
+        tracer.write_jsonl(output_reports_folder + filenames['trace'].format(year = current_year))
+        tracer.write_openmetrics(output_reports_folder + filenames['metrics'].format(year = current_year), labels)
+
+    run_details = {'runtime': runtime, 'entities': list(table_paths_by_entity), 'html': {'scr_report': report_html},
+                   'trace': tracer.to_dicts()}
+
+    return report_paths, run_details
+
+
+# Function to set the output folders of an entity:
+def entity_folders(entity = None):
+
+    """Function to set the output folders for an entity.
+
+    Args:
+        entity (str): Entity name, None for the default (single entity) folders.
+    Returns:
+        dict: Copy of the folders catalog with entity specific output folders.
+    """
+
+    report_folders = dict(folders)
+
+    if entity:
+        report_folders['output_reports'] = folders['output_reports'] + entity + '/'
+        report_folders['output_images']  = folders['output_images'] + entity + '/'
+
+    return report_folders
+
+
+# Function to build the list of batch jobs from years and entity table files:
+def build_batch_jobs(years = None, table_paths = None):
+
+    """Function to build the batch jobs (one per year and entity table).
+
+    Args:
+        years (list): Years to generate reports for. All years found are used if None.
+        table_paths (list): Entity table files or entity folders containing scr_table_<year>YE.xlsx files.
+                            The default input tables are used if None.
+    Returns:
+        list: Jobs as dictionaries with keys 'current_year', 'scr_table_path' and 'entity'.
+    """
+
+    year_pattern = re.compile(re.escape(filenames['scr_table']).replace(re.escape('{year}'), r'(\d{4})'))
+
+    # Default input tables (single entity):
+    if not table_paths:
+        if not years:
+            table_paths = [folders['input_tables']]
+        else:
+            return [{'current_year': int(year),
+                     'scr_table_path': folders['input_tables'] + filenames['scr_table'].format(year = year),
+                     'entity': None} for year in years]
+
+    jobs = []
+    for table_path in table_paths:
+
+        # A folder holds the tables of one entity, a file is a single table:
+        if os.path.isdir(table_path):
+            files  = sorted(glob.glob(os.path.join(table_path, filenames['scr_table'].format(year = '*'))))
+            folder = os.path.normpath(table_path)
+        else:
+            files  = [table_path]
+            folder = os.path.normpath(os.path.dirname(table_path) or '.')
+
+        # Tables in the default input folder belong to the default entity:
+        entity = None if folder == os.path.normpath(folders['input_tables']) else os.path.basename(folder)
+
+        for file in files:
+            match = year_pattern.search(os.path.basename(file))
+            if match is None:
+                raise ValueError(f"Cannot derive the year from the table file name: {file}")
+
+            year = int(match.group(1))
+            if years and year not in [int(y) for y in years]:
+                continue
+
+            jobs.append({'current_year': year, 'scr_table_path': file, 'entity': entity})
+
+    return jobs
+
+
+# Function to run a single batch job (top level so that it can be sent to worker processes):
+def run_batch_job(job, report_kwargs):
+
+    """Function to run one batch job and catch its failure.
+
+    Args:
+        job (dict): Job with keys 'current_year', 'scr_table_path' and 'entity'.
+        report_kwargs (dict): Keyword arguments passed on to generate_report.
+    Returns:
+        dict: Manifest entry of the job with its status, output paths and runtime or error.
+    """
+
+    start_time = time.time()
+    result     = dict(job)
+
+    try:
+        report_paths, validation_report_html_path, run_details = generate_report(job['current_year'],
+                                                                                 scr_table_path = job['scr_table_path'],
+                                                                                 entity = job['entity'],
+                                                                                 **report_kwargs)
+        result['status']                      = 'ok'
+        result['report_paths']                = report_paths
+        result['validation_report_html_path'] = validation_report_html_path
+        result['stage_timings']               = run_details['stage_timings']
+
+    except Exception as e:
+        result['status']    = 'failed'
+        result['error']     = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+
+    result['runtime'] = round(time.time() - start_time, 2)
+
+    return result
+
+
+# Function to generate reports for many years and entities in parallel:
+def generate_reports_batch(jobs, max_workers = None, manifest_path = None, **report_kwargs):
+
+    """Function to generate reports for a batch of jobs over a pool of worker processes.
+
+    A failed job is recorded in the manifest and does not stop the other jobs.
+
+    Args:
+        jobs (list): Jobs as returned by build_batch_jobs.
+        max_workers (int): Number of worker processes (defaults to the number of CPUs).
+        manifest_path (str): Path of the JSON manifest file, not saved if None.
+        **report_kwargs: Keyword arguments passed on to generate_report (e.g. llm_flag, output_formats).
+    Returns:
+        list: Manifest with one entry per job in the order of the jobs.
+    """
+
+    start_time = time.time()
+    manifest   = [None] * len(jobs)
+
+    # Compile the layouts once, so the workers load them from the bytecode cache:
+    preload_templates()
+
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+        futures = {executor.submit(run_batch_job, job, report_kwargs): i for i, job in enumerate(jobs)}
+
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                manifest[i] = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. out of memory):
+                manifest[i] = dict(jobs[i], status = 'failed', error = f"{type(e).__name__}: {e}")
+
+            status = manifest[i]['status']
+            print(f"{'✅' if status == 'ok' else '❌'}Batch job {manifest[i]['current_year']} "
+                  f"{manifest[i]['entity'] or ''} {status}")
+
+    # Save manifest:
+    if manifest_path:
+        with open(manifest_path, 'w', encoding = "utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, indent = 2, default = str)
+        print(f"✅Batch manifest saved at: {manifest_path}")
+
+    print('Runtime of batch: ', round(time.time() - start_time, 2), 'seconds')
+
+    return manifest
+
+
+# Command line entry point:
+def main(argv = None):
+
+    """Command line entry point to generate reports for many years and entities in one go.
+
+    Args:
+        argv (list): Command line arguments (defaults to sys.argv).
+    Returns:
+        int: Exit code, 1 if any job failed.
+    """
+
+    parser = argparse.ArgumentParser(description = "Generate SCR and validation reports in batch.")
+    parser.add_argument('--years', nargs = '+', type = int, help = "Current years to report on (default: all years found).")
+    parser.add_argument('--tables', nargs = '+', help = "Entity table files or entity folders with scr_table_<year>YE.xlsx files.")
+    parser.add_argument('--workers', type = int, default = None, help = "Number of worker processes (default: number of CPUs).")
+    parser.add_argument('--formats', nargs = '+', default = ['html', 'pdf', 'docx'], choices = ['html', 'pdf', 'docx'])
+    parser.add_argument('--target-solvency-ratio', type = float, default = 1.25)
+    parser.add_argument('--conclusion', default = '', help = "Text inserted at the end of the report.")
+    parser.add_argument('--llm', choices = ['Yes', 'No'], default = 'No', help = "Use AI commentary.")
+    parser.add_argument('--llm-provider', default = 'Gemini')
+    parser.add_argument('--llm-sentences', type = int, default = 2)
+    parser.add_argument('--no-llm-cache', action = 'store_true', help = "Request fresh AI commentary instead of cached responses.")
+    parser.add_argument('--llm-response-mode', choices = ['structured', 'sections'], default = None,
+                        help = "One LLM request for all AI sections or one per section (default: response mode in llm_settings).")
+    parser.add_argument('--validation-threshold', type = float, default = 0.001)
+    parser.add_argument('--force', action = 'store_true', help = "Rebuild all outputs, also those whose inputs are unchanged.")
+    parser.add_argument('--no-images', action = 'store_true', help = "Do not save the charts as png files in the images folder.")
+    parser.add_argument('--no-trace', action = 'store_true', help = "Do not save the trace and metrics files of each report.")
+    parser.add_argument('--manifest', default = folders['output_reports'] + filenames['batch_manifest'],
+                        help = "Path of the JSON result manifest.")
+    parser.add_argument('--group', action = 'store_true',
+                        help = "Generate the consolidated group report of the entity tables for each year (instead of the entity reports).")
+    parser.add_argument('--group-name', default = None, help = "Name of the group in the group report.")
+    parser.add_argument('--sync-history', action = 'store_true',
+                        help = "Load the new and changed input tables into the history store (then generate no reports).")
+    args = parser.parse_args(argv)
+
+    # History store of all entities and years (only the new and changed tables are loaded):
+    if args.sync_history:
+        counts = get_history_store().sync()
+        print(f"✅History store synced: {counts['loaded']} tables loaded, {counts['unchanged']} unchanged, "
+              f"{counts['removed']} removed.")
+        return 0
+
+    jobs = build_batch_jobs(args.years, args.tables)
+    if not jobs:
+        parser.error("No SCR tables found for the selected years.")
+
+    # Group reports (one per year, from the tables of all entities of the year):
+    if args.group:
+        failed = False
+        for year in sorted({job['current_year'] for job in jobs}):
+            try:
+                generate_group_report(year, [job['scr_table_path'] for job in jobs if job['current_year'] == year],
+                                      group_name = args.group_name,
+                                      target_solvency_ratio = args.target_solvency_ratio,
+                                      conclusion_wording = args.conclusion,
+                                      output_formats = args.formats,
+                                      validation_threshold = args.validation_threshold,
+                                      export_trace = not args.no_trace)
+            except Exception as e:
+                failed = True
+                print(f"❌Group report {year} failed: {type(e).__name__}: {e}")
+        return 1 if failed else 0
+
+    manifest = generate_reports_batch(jobs, max_workers = args.workers, manifest_path = args.manifest,
+                                      target_solvency_ratio = args.target_solvency_ratio,
+                                      conclusion_wording = args.conclusion,
+                                      llm_flag = args.llm,
+                                      llm_provider = args.llm_provider,
+                                      llm_nr_of_sentences = args.llm_sentences,
+                                      llm_use_cache = not args.no_llm_cache,
+                                      llm_response_mode = args.llm_response_mode,
+                                      output_formats = args.formats,
+                                      validation_threshold = args.validation_threshold,
+                                      force_rebuild = args.force,
+                                      export_images = not args.no_images,
+                                      export_trace = not args.no_trace)
+
+    return 0 if all(entry['status'] == 'ok' for entry in manifest) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
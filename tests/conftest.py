@@ -0,0 +1,33 @@
+import os
+import sys
+import pytest
+
+# Root folder of the app (where main.py is), so the catalog and helpers import as in the app:
+root_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_folder)
+
+from catalog.catalog import folders
+
+# Input tables shipped with the app:
+input_tables_folder = os.path.join(root_folder, folders['input_tables'])
+shipped_years       = [2024, 2025, 2026]
+
+
+@pytest.fixture(autouse = True)
+def table_cache(tmp_path, monkeypatch):
+
+    """Save the snapshots of the input tables in a temporary folder and start without tables loaded in memory."""
+
+    from helpers import ingestion
+
+    monkeypatch.setitem(folders, 'table_cache', str(tmp_path / 'tables') + os.sep)
+    monkeypatch.setattr(ingestion, '_loaded_tables', {})
+
+    return tmp_path / 'tables'
+
+
+def shipped_table_path(year):
+
+    """Path of the input table of a year shipped with the app."""
+
+    return os.path.join(input_tables_folder, f'scr_table_{year}YE.xlsx')
@@ -0,0 +1,83 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+
+from helpers.history_store import HistoryStore
+from conftest import shipped_table_path
+
+
+@pytest.fixture
+def input_folder(tmp_path):
+
+    """Input tables folder of an entity with the 2024 and 2025 tables, the Market Risk of 2024 in the 2024 table
+    differing from the previous year column of the 2025 table (so the source of the 2024 values is known)."""
+
+    folder = tmp_path / 'input' / 'entity_a'
+    folder.mkdir(parents = True)
+
+    df = pd.read_excel(shipped_table_path(2024))
+    df.iloc[0, 1] += 100
+    df.to_excel(folder / 'scr_table_2024YE.xlsx', index = False)
+    shutil.copy(shipped_table_path(2025), folder / 'scr_table_2025YE.xlsx')
+
+    return folder
+
+
+@pytest.fixture
+def store(tmp_path):
+    history_store = HistoryStore(str(tmp_path / 'history' / 'scr_history.sqlite'))
+    yield history_store
+    history_store.close()
+
+
+def market_risk_2024(store):
+    history = store.window('entity_a', end_year = 2025, n_years = 3)
+    return history.series('Market Risk')[history.years.index(2024)]
+
+
+def test_removed_table_falls_back_and_comes_back(store, input_folder):
+    input_root  = str(input_folder.parent)
+    table_2024  = input_folder / 'scr_table_2024YE.xlsx'
+    own_2024    = pd.read_excel(table_2024).iloc[0, 1]
+    next_2024   = pd.read_excel(input_folder / 'scr_table_2025YE.xlsx').iloc[0, 2]
+    assert own_2024 != next_2024
+
+    # The 2024 values are taken from the 2024 table, not from the previous year column of the 2025 table:
+    assert store.sync(input_root) == {'loaded': 2, 'unchanged': 0, 'removed': 0}
+    assert store.years('entity_a') == [2023, 2024, 2025]
+    assert market_risk_2024(store) == pytest.approx(own_2024)
+
+    # Without the 2024 table, 2024 falls back to the previous year column of the 2025 table and 2023 is gone:
+    saved_2024 = table_2024.read_bytes()
+    os.remove(table_2024)
+    assert store.sync(input_root)['removed'] == 1
+    assert store.years('entity_a') == [2024, 2025]
+    assert market_risk_2024(store) == pytest.approx(next_2024)
+
+    # With the 2024 table back, its values replace the fallback again:
+    table_2024.write_bytes(saved_2024)
+    counts = store.sync(input_root)
+    assert counts['loaded'] == 1 and counts['removed'] == 0
+    assert store.years('entity_a') == [2023, 2024, 2025]
+    assert market_risk_2024(store) == pytest.approx(own_2024)
+
+
+def test_sync_is_incremental(store, input_folder):
+    input_root = str(input_folder.parent)
+
+    store.sync(input_root)
+    assert store.sync(input_root) == {'loaded': 0, 'unchanged': 2, 'removed': 0}
+
+
+def test_window_scr_table_takes_each_year_from_its_own_table(store, input_folder):
+    store.sync(str(input_folder.parent))
+
+    table_2024 = pd.read_excel(input_folder / 'scr_table_2024YE.xlsx')
+    table_2025 = pd.read_excel(input_folder / 'scr_table_2025YE.xlsx')
+    scr_table  = store.window('entity_a', end_year = 2025, n_years = 2).scr_table(2025)
+
+    np.testing.assert_allclose(scr_table.column(2025), table_2025.iloc[:, 1].to_numpy(float))
+    np.testing.assert_allclose(scr_table.column(2024), table_2024.iloc[:, 1].to_numpy(float))
+    np.testing.assert_allclose(scr_table.column('Movement'), scr_table.column(2025) - scr_table.column(2024))
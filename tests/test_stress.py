@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from catalog.catalog import stress_settings
+from helpers.ingestion import read_scr_table
+from helpers.formatting import format_scr_table
+from helpers.stress import stress_base, stress_solvency, shock_grid, sensitivity_analysis, run_stress_tests
+from conftest import shipped_table_path, shipped_years
+
+
+def base_of(year):
+    scr_table = format_scr_table(read_scr_table(shipped_table_path(year)))
+    return scr_table, stress_base(scr_table)
+
+
+@pytest.mark.parametrize('year', shipped_years)
+def test_base_scenario_reproduces_the_table(year):
+    scr_table, base = base_of(year)
+    results         = stress_solvency(base, np.zeros((1, len(base.modules) + 1)))
+
+    assert results['basic_scr'][0] == pytest.approx(scr_table.value('Basic SCR', year))
+    assert results['total_scr'][0] == pytest.approx(scr_table.value('Total SCR', year))
+    assert results['own_funds'][0] == pytest.approx(scr_table.value('Own Funds', year))
+    assert results['solvency_ratio'][0] == pytest.approx(scr_table.value('Own Funds', year) / scr_table.value('Total SCR', year))
+
+
+def test_grid_matches_scenarios_one_by_one():
+    _, base = base_of(2025)
+    shocks  = shock_grid(len(base.modules) + 1, levels = 3)
+    ratios  = stress_solvency(base, shocks)['solvency_ratio']
+
+    assert shocks.shape == (3 ** 5, 5)
+    for i in [0, 17, 121, len(shocks) - 1]:
+        assert ratios[i] == pytest.approx(stress_solvency(base, shocks[i])['solvency_ratio'][0])
+
+
+def test_shocks_move_the_ratio_in_the_expected_direction():
+    _, base = base_of(2025)
+    factors = stress_settings['risk_modules'] + ['Own Funds']
+
+    base_ratio, sensitivities = sensitivity_analysis(base, factors, shock = 0.1)
+
+    for sensitivity in sensitivities:
+        if sensitivity['factor'] == 'Own Funds':
+            assert sensitivity['low'] < base_ratio < sensitivity['high']
+        else:
+            assert sensitivity['high'] < base_ratio < sensitivity['low']
+
+    ranges = [sensitivity['range'] for sensitivity in sensitivities]
+    assert ranges == sorted(ranges, reverse = True)
+
+
+def test_uncorrelated_modules_give_square_root_of_sum_of_squares():
+    scr_table, _ = base_of(2025)
+    base         = stress_base(scr_table, correlations = np.eye(4))
+    shocks       = np.array([[0.2, 0.0, -0.1, 0.0, 0.0]])
+    modules      = base.modules * (1 + shocks[0, :4])
+
+    undiversified = modules.sum()
+    expected_bscr = undiversified + (np.sqrt((modules ** 2).sum()) - undiversified) * base.diversification_scale
+
+    assert stress_solvency(base, shocks)['basic_scr'][0] == pytest.approx(expected_bscr)
+
+
+def test_stress_tests_summary():
+    scr_table, _ = base_of(2025)
+    results      = run_stress_tests(scr_table, 1.25)
+    grid         = results['grid']
+
+    assert grid['scenarios'] == stress_settings['grid_levels'] ** 5
+    assert grid['min'] <= grid['p5'] <= grid['median'] <= grid['max']
+    assert grid['min'] <= results['base'] <= grid['max']
+    assert 0 <= grid['below_100'] <= grid['below_target'] <= 1
+
+
+def test_module_correlations_are_the_standard_formula_values():
+    standard_formula = {('Market Risk', 'Counterparty Default Risk'): 0.25,
+                        ('Market Risk', 'Life Risk'):                 0.25,
+                        ('Market Risk', 'Health Risk'):               0.25,
+                        ('Counterparty Default Risk', 'Life Risk'):   0.25,
+                        ('Counterparty Default Risk', 'Health Risk'): 0.25,
+                        ('Life Risk', 'Health Risk'):                 0.00}
+    modules      = stress_settings['risk_modules']
+    correlations = np.array(stress_settings['module_correlations'])
+
+    assert np.array_equal(correlations, correlations.T)
+    assert np.array_equal(np.diag(correlations), np.ones(len(modules)))
+    for (row, column), correlation in standard_formula.items():
+        assert correlations[modules.index(row), modules.index(column)] == correlation
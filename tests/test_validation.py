@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from helpers.ingestion import read_scr_table
+from helpers.scr_table import CURRENT, PREVIOUS, MOVEMENT, MOVEMENT_PCT
+from helpers.utils import perform_validation
+from helpers.validation import validate_scr_tables, validation_status
+from conftest import shipped_table_path, shipped_years
+
+
+def baseline_differences(values):
+
+    """Differences of the validation checks as computed before the rules were declared in the catalog
+    (hard-coded rows of the SCR table layout), NaN for the input cells."""
+
+    years    = slice(CURRENT, PREVIOUS + 1)
+    expected = values.copy()
+
+    expected[5, years]  = values[:5, years].sum(axis = 0)          # Basic SCR
+    expected[8, years]  = values[5:8, years].sum(axis = 0)         # Total SCR
+    expected[10, years] = values[9, years] / values[8, years]      # Solvency Ratio
+    expected[:, MOVEMENT]     = values[:, CURRENT] - values[:, PREVIOUS]
+    expected[:, MOVEMENT_PCT] = values[:, CURRENT] / values[:, PREVIOUS] - 1
+
+    differences = np.abs(expected - values)
+    differences[[0, 1, 2, 3, 4, 6, 7, 9], years] = np.nan
+
+    return differences
+
+
+def check_values(df_check):
+
+    """Differences of the check table of perform_validation as floats (NaN for the unchecked cells)."""
+
+    return df_check.iloc[:, 1:].apply(lambda column: column.map(lambda value: np.nan if value == '' else value)).to_numpy(float)
+
+
+@pytest.mark.parametrize('year', shipped_years)
+def test_shipped_tables_match_baseline(year):
+    scr_table = read_scr_table(shipped_table_path(year))
+    df_check  = perform_validation(scr_table, year, year - 1)
+
+    np.testing.assert_allclose(check_values(df_check), baseline_differences(scr_table.values), rtol = 0, atol = 1e-12)
+    assert df_check['€m'].tolist() == scr_table.labels.tolist()
+
+
+@pytest.mark.parametrize('year', shipped_years)
+def test_shipped_tables_pass(year):
+    differences, _ = validate_scr_tables([read_scr_table(shipped_table_path(year))])
+    _, failed      = validation_status(differences, 0.001)
+
+    assert not failed.any()
+
+
+@pytest.mark.parametrize('year', shipped_years)
+def test_errors_fail_the_same_checks_as_baseline(year):
+    scr_table = read_scr_table(shipped_table_path(year))
+
+    # Wrong Market Risk (input), Total SCR (total) and Solvency Ratio (ratio) in the current year:
+    values = scr_table.values.copy()
+    values[0, CURRENT]  += 5.0
+    values[8, CURRENT]  += 1.0
+    values[10, CURRENT] += 0.02
+    wrong_table = scr_table.with_values(values)
+
+    differences = check_values(perform_validation(wrong_table, year, year - 1))
+    np.testing.assert_allclose(differences, baseline_differences(values), rtol = 0, atol = 1e-12)
+
+    _, failed = validation_status(differences, 0.001)
+    assert failed[5, CURRENT] and failed[8, CURRENT] and failed[10, CURRENT]
+    assert failed[0, MOVEMENT] and failed[0, MOVEMENT_PCT]
+
+
+def test_stack_of_tables_matches_single_tables():
+    scr_tables     = [read_scr_table(shipped_table_path(year)) for year in shipped_years]
+    differences, _ = validate_scr_tables(scr_tables)
+
+    assert differences.shape == (len(scr_tables), len(scr_tables[0]), 4)
+    for i, scr_table in enumerate(scr_tables):
+        np.testing.assert_allclose(differences[i], baseline_differences(scr_table.values), rtol = 0, atol = 1e-12)